@@ -0,0 +1,148 @@
+"""
+Cold-start benchmark: time to first rendered page per role
+
+Each sample runs in a fresh Python process (like a worker after a restart
+or autoscaling) and renders the page headlessly with streamlit.testing.
+
+    python benchmarks/cold_start.py --runs 5
+    python benchmarks/cold_start.py --runs 5 --json out.json --baseline old.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ROLE_PAGES = {
+    'Home': 'app.py',
+    'Login': 'pages/1_Login.py',
+    'Student': 'pages/2_Student.py',
+    'Professor': 'pages/3_Professor.py',
+    'Staff': 'pages/4_Staff.py'
+}
+
+
+def session_for(role, user_id):
+    """Session state of a logged-in user, as 1_Login.py leaves it"""
+    if role == 'Home':
+        return {}
+    if role == 'Login':
+        return {'role': 'Student'}
+
+    user_data = {'UserID': user_id, 'FName': 'Bench', 'LName': role, 'Email_Address': 'bench@edu'}
+    if role == 'Professor':
+        user_data['Department'] = 'N/A'
+    if role == 'Staff':
+        user_data['Role'] = 'Admin'
+
+    return {
+        'logged_in': True,
+        'role': role,
+        'user_id': user_id,
+        'user_data': user_data,
+        'full_name': f"Bench {role}"
+    }
+
+
+def run_child(role, user_id):
+    """Render one page in this (fresh) process and print timings as JSON"""
+    started = time.perf_counter()
+
+    sys.path.insert(0, APP_DIR)
+    os.chdir(APP_DIR)
+
+    from streamlit.testing.v1 import AppTest
+    import database  # noqa: F401  (dependency check + driver imports)
+
+    imported = time.perf_counter()
+
+    at = AppTest.from_file(ROLE_PAGES[role], default_timeout=120)
+    for key, value in session_for(role, user_id).items():
+        at.session_state[key] = value
+    at.run()
+
+    rendered = time.perf_counter()
+
+    print(json.dumps({
+        'import_s': imported - started,
+        'render_s': rendered - imported,
+        'errors': len(at.exception),
+        'modules': len(sys.modules)
+    }))
+
+
+def sample(role, user_id, env):
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', role, '--user-id', str(user_id)],
+        capture_output=True, text=True, env=env, check=True
+    ).stdout
+    total = time.perf_counter() - started
+
+    result = json.loads(output.strip().splitlines()[-1])
+    result['total_s'] = total
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--roles', nargs='+', default=list(ROLE_PAGES), choices=list(ROLE_PAGES))
+    parser.add_argument('--user-id', type=int, default=1)
+    parser.add_argument('--skip-dep-check', action='store_true', help='set LMS_SKIP_DEP_CHECK=1')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--baseline', help='compare against a previous --json file')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown vs baseline (0.2 = 20%%)')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.user_id)
+        return 0
+
+    env = dict(os.environ)
+    if args.skip_dep_check:
+        env['LMS_SKIP_DEP_CHECK'] = '1'
+
+    results = {}
+    print(f"{'Role':<10} {'total p50':>10} {'import p50':>11} {'render p50':>11} {'max':>8}")
+
+    for role in args.roles:
+        samples = [sample(role, args.user_id, env) for _ in range(args.runs)]
+        totals = [s['total_s'] for s in samples]
+        results[role] = {
+            'total_p50': statistics.median(totals),
+            'total_max': max(totals),
+            'import_p50': statistics.median(s['import_s'] for s in samples),
+            'render_p50': statistics.median(s['render_s'] for s in samples),
+            'errors': sum(s['errors'] for s in samples)
+        }
+        r = results[role]
+        print(f"{role:<10} {r['total_p50']:>9.2f}s {r['import_p50']:>10.2f}s {r['render_p50']:>10.2f}s {r['total_max']:>7.2f}s")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+        regressions = [
+            role for role, r in results.items()
+            if role in baseline and r['total_p50'] > baseline[role]['total_p50'] * (1 + args.tolerance)
+        ]
+        for role in regressions:
+            print(f"⚠️  {role}: {baseline[role]['total_p50']:.2f}s → {results[role]['total_p50']:.2f}s")
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
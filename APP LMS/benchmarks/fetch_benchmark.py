@@ -0,0 +1,156 @@
+"""
+Benchmark: pd.read_sql vs the fetchmany materialization in database.py
+
+Times both paths on Activities extracts of 10k, 100k and 1M rows.
+
+    python benchmarks/fetch_benchmark.py                 # configured database
+    python benchmarks/fetch_benchmark.py --synthetic     # generated rows, no database
+    python benchmarks/fetch_benchmark.py --sizes 10000 100000
+"""
+
+import argparse
+import datetime
+import decimal
+import os
+import random
+import sys
+import time
+import warnings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+import database
+
+EXTRACT_QUERY = """
+    SELECT TOP {rows}
+        A.ActivityID,
+        A.StudentID,
+        A.CourseID,
+        A.SemesterID,
+        A.ActivityType,
+        A.RequestStatus,
+        A.Submission_Date,
+        A.Credit
+    FROM Activities A
+    ORDER BY A.ActivityID
+"""
+
+SYNTHETIC_DESCRIPTION = [
+    ('ActivityID', int), ('StudentID', int), ('CourseID', int), ('SemesterID', int),
+    ('ActivityType', str), ('RequestStatus', str), ('Submission_Date', datetime.date),
+    ('Credit', decimal.Decimal)
+]
+
+
+class SyntheticCursor:
+    """DBAPI cursor over generated Activities rows (pyodbc-style description)"""
+
+    def __init__(self, rows):
+        rng = random.Random(rows)
+        start = datetime.date(2024, 1, 1)
+        self._rows = [
+            (i, rng.randint(1, 5000), rng.randint(1, 400), rng.randint(1, 8),
+             rng.choice(('Enrollment', 'Withdrawal', 'Exam_Delay')),
+             rng.choice(('Approved', 'Pending', 'Rejected')),
+             start + datetime.timedelta(days=rng.randint(0, 700)),
+             decimal.Decimal(rng.randint(1, 4)))
+            for i in range(1, rows + 1)
+        ]
+        self._pos = 0
+        self.description = [(name, type_code, None, None, None, None, True) for name, type_code in SYNTHETIC_DESCRIPTION]
+
+    def execute(self, *args):
+        self._pos = 0
+        return self
+
+    def fetchmany(self, size):
+        block = self._rows[self._pos:self._pos + size]
+        self._pos += len(block)
+        return block
+
+    def fetchall(self):
+        return self.fetchmany(len(self._rows))
+
+    def nextset(self):
+        return False
+
+    def close(self):
+        pass
+
+
+class SyntheticConnection:
+    def __init__(self, rows):
+        self._cursor = SyntheticCursor(rows)
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def time_call(fn, repeat):
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def bench_size(rows, synthetic, repeat):
+    query = EXTRACT_QUERY.format(rows=rows)
+
+    if synthetic:
+        conn = SyntheticConnection(rows)
+    else:
+        conn = database.get_connection()
+        if conn is None:
+            raise SystemExit("❌ Không thể kết nối database")
+
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', UserWarning)   # pandas' "only SQLAlchemy is supported" warning
+            read_sql_s, old = time_call(lambda: pd.read_sql(query, conn), repeat)
+
+        fast_s, new = time_call(lambda: database.fetch_dataframe(conn, query), repeat)
+    finally:
+        if not synthetic:
+            database.release_connection(conn)
+
+    return {
+        'rows': len(new),
+        'read_sql_s': read_sql_s,
+        'fast_s': fast_s,
+        'speedup': read_sql_s / fast_s if fast_s else float('inf'),
+        'same_values': old.shape == new.shape and old.astype(str).equals(new.astype(str))
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--synthetic', action='store_true')
+    parser.add_argument('--block-size', type=int, default=database.FETCH_CONFIG['block_size'])
+    args = parser.parse_args()
+
+    database.FETCH_CONFIG['block_size'] = args.block_size
+
+    print(f"{'rows':>10} {'read_sql':>10} {'fetchmany':>10} {'speedup':>8}  same")
+    for size in args.sizes:
+        r = bench_size(size, args.synthetic, args.repeat)
+        print(f"{r['rows']:>10} {r['read_sql_s']:>9.3f}s {r['fast_s']:>9.3f}s {r['speedup']:>7.1f}x  {r['same_values']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,378 @@
+"""
+Registration-rush load test: concurrent students and staff on the real pages
+
+N simulated students log in through 1_Login.py, open 📚 Đăng ký môn, pick a
+course and enroll, withdraw from an approved course and request an exam
+delay, while M simulated staff approve pending enrollments in 4_Staff.py.
+Every user is a headless streamlit.testing AppTest session running in its
+own thread of this process, i.e. sharing one connection pool, query cache
+and executor exactly like sessions of one Streamlit server.
+
+Reported per flow step: rerun latency p50/p95/p99, database round trips
+per rerun (cache hits excluded, a batch counts once), error rate (an
+exception on the page) and rejection rate (an st.error from a business
+rule such as the credit limits, which is expected during a rush).
+
+    python benchmarks/loadtest.py --init --students 50 --staff 3
+    python benchmarks/loadtest.py --students 200 --staff 5 --iterations 3 --json rush.json
+    LMS_DB_BACKEND=mssql python benchmarks/loadtest.py --students 50   # real server
+"""
+
+import argparse
+import collections
+import datetime
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRYPOINT = 'app.py'
+STUDENT_PAGE = 'pages/2_Student.py'
+STAFF_PAGE = 'pages/4_Staff.py'
+LOGIN_PAGE = 'pages/1_Login.py'
+
+
+# Thread-local virtual user, read when AppTest builds a script runner
+_current = threading.local()
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile (values need not be sorted)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class Stats:
+    """Rerun samples per (flow, step), shared by every virtual user"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = collections.defaultdict(list)
+
+    def add(self, flow, step, seconds, round_trips, error, rejected):
+        with self._lock:
+            self._samples[(flow, step)].append((seconds, round_trips, error, rejected))
+
+    def report(self):
+        rows = []
+        for (flow, step), samples in sorted(self._samples.items()):
+            latencies = [s[0] for s in samples]
+            rows.append({
+                'flow': flow,
+                'step': step,
+                'reruns': len(samples),
+                'p50_ms': percentile(latencies, 50) * 1000,
+                'p95_ms': percentile(latencies, 95) * 1000,
+                'p99_ms': percentile(latencies, 99) * 1000,
+                'max_ms': max(latencies) * 1000,
+                'round_trips': sum(s[1] for s in samples) / len(samples),
+                'error_rate': sum(1 for s in samples if s[2]) / len(samples),
+                'reject_rate': sum(1 for s in samples if s[3]) / len(samples),
+                'first_error': next((str(s[2]) for s in samples if s[2]), None),
+                'first_reject': next((str(s[3]) for s in samples if s[3]), None)
+            })
+        return rows
+
+
+class VirtualUser:
+    """One browser session: an AppTest plus its own Streamlit session id"""
+
+    def __init__(self, name, stats, round_trips, timeout):
+        self.name = name
+        self.session_id = f"loadtest-{name}"
+        self.stats = stats
+        self.round_trips = round_trips
+        self.timeout = timeout
+        self.at = None
+
+    def open(self, page, **session):
+        """Navigate to a page the way the sidebar does, keeping session_state"""
+        from streamlit.testing.v1 import AppTest
+
+        if self.at is None:
+            self.at = AppTest.from_file(os.path.join(APP_DIR, ENTRYPOINT), default_timeout=self.timeout)
+        for key, value in session.items():
+            self.at.session_state[key] = value
+        return self.step('open', page, lambda at: at.switch_page(page))
+
+    def step(self, flow, step, action=None):
+        """Apply a widget action (or none) and time the resulting rerun"""
+        _current.session_id = self.session_id
+        before = self.round_trips[self.session_id]
+        started = time.perf_counter()
+        error = rejected = None
+        try:
+            if action is not None:
+                action(self.at)
+            self.at.run()
+            if self.at.exception:
+                error = self.at.exception[0].value
+            elif self.at.error:
+                rejected = self.at.error[0].value
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - started
+
+        self.stats.add(flow, step, elapsed, self.round_trips[self.session_id] - before, error, rejected)
+        return error is None and rejected is None
+
+
+def widget(elements, label):
+    """First widget of an AppTest element list with the given label"""
+    return next(e for e in elements if e.label == label)
+
+
+def login(user, role, user_id):
+    """Submit the login form; True once 1_Login.py has set up the session"""
+    user.open(LOGIN_PAGE, role=role)
+
+    def submit(at):
+        at.number_input[0].set_value(user_id)
+        widget(at.button, '🔓 Đăng nhập').click()
+
+    user.step('login', 'submit', submit)
+    return 'logged_in' in user.at.session_state and user.at.session_state['logged_in']
+
+
+def student_flow(user, student_id, rng, think):
+    """Login → register a course → withdraw → request an exam delay"""
+    if not login(user, 'Student', student_id):
+        return
+    time.sleep(think)
+
+    # Bước điều hướng lỗi thì các bước sau không còn ý nghĩa
+    if not user.open(STUDENT_PAGE):
+        return
+    if not user.step('register', 'open menu', lambda at: at.sidebar.radio[0].set_value("📚 Đăng ký môn")):
+        return
+    time.sleep(think)
+
+    search = [s for s in user.at.selectbox if s.key == "course_search"]
+    options = search[0].options[1:] if search else []
+    if options:
+        choice = rng.choice(options)
+        user.step('register', 'search', lambda at: at.selectbox(key="course_search").set_value(choice))
+        enroll = [b for b in user.at.button if b.label == "📝 Đăng ký môn này"]
+        if enroll:
+            user.step('register', 'enroll', lambda at: enroll[0].click())
+    time.sleep(think)
+
+    if not user.step('withdraw', 'open menu', lambda at: at.sidebar.radio[0].set_value("🚫 Rút môn")):
+        return
+    withdraw = [b for b in user.at.button if (b.key or '').startswith('wd_')]
+    if withdraw:
+        target = rng.choice(withdraw)
+        user.step('withdraw', 'submit', lambda at: target.click())
+    time.sleep(think)
+
+    if not user.step('exam_delay', 'open menu', lambda at: at.sidebar.radio[0].set_value("📅 Hoãn thi")):
+        return
+    forms = [b for b in user.at.button if b.label == "✅ Gửi yêu cầu"]
+    if forms and len(user.at.date_input) >= 2:
+        index = rng.randrange(len(forms))
+
+        def fill(at):
+            old_date, new_date = at.date_input[2 * index], at.date_input[2 * index + 1]
+            first = old_date.min or datetime.date.today()
+            old_date.set_value(first)
+            new_date.set_value(first + datetime.timedelta(days=7))
+            at.text_area[index].input("Trùng lịch thi với môn khác (load test)")
+            [b for b in at.button if b.label == "✅ Gửi yêu cầu"][index].click()
+
+        user.step('exam_delay', 'submit', fill)
+
+
+def staff_flow(user, staff_id, rng, think, approvals):
+    """Open the pending enrollment queue and approve a few requests"""
+    if not login(user, 'Staff', staff_id):
+        return
+    time.sleep(think)
+
+    if not user.open(STAFF_PAGE):
+        return
+    if not user.step('approve', 'open queue', lambda at: at.sidebar.radio[0].set_value("📋 Duyệt yêu cầu")):
+        return
+    if not user.step('approve', 'filter pending', lambda at: widget(at.selectbox, "Lọc trạng thái").set_value("Pending")):
+        return
+
+    for _ in range(approvals):
+        time.sleep(think)
+        buttons = [b for b in user.at.button if (b.key or '').startswith('app_e_')]
+        if not buttons:
+            break
+        target = rng.choice(buttons[:20])
+        user.step('approve', 'approve', lambda at: target.click())
+
+
+def patch_apptest():
+    """Make AppTest usable from many threads at once
+
+    AppTest hard-codes one session id for every instance, and each run
+    installs a mock Runtime singleton that it resets to None on exit, which
+    pulls the runtime from under the other users' runs. It also resets the
+    class-wide "app uses a pages/ directory" flag before every run, so a
+    concurrent run can fall back to rendering app.py. Page compilation is
+    serialized too: concurrent ast.parse calls trip CPython 3.11's
+    "AST constructor recursion depth mismatch" check.
+    """
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.pages_manager import PagesManager
+    from streamlit.runtime.scriptrunner import script_runner
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import local_script_runner
+
+    runner_init = local_script_runner.LocalScriptRunner.__init__
+
+    def init(self, *args, **kwargs):
+        runner_init(self, *args, **kwargs)
+        self._session_id = getattr(_current, 'session_id', self._session_id)
+
+    local_script_runner.LocalScriptRunner.__init__ = init
+
+    last_runtime = []
+
+    def instance(cls):
+        if cls._instance is not None:
+            last_runtime[:] = [cls._instance]
+        elif not last_runtime:
+            raise RuntimeError("Runtime hasn't been created!")
+        return cls._instance or last_runtime[0]
+
+    def exists(cls):
+        return cls._instance is not None or bool(last_runtime)
+
+    Runtime.instance = classmethod(instance)
+    Runtime.exists = classmethod(exists)
+
+    # This app is a pages/ directory app; keep the flag pinned for the runner
+    script_runner.PagesManager = type('PagesDirectoryManager', (PagesManager,), {'uses_pages_directory': True})
+
+    get_bytecode = ScriptCache.get_bytecode
+    compile_lock = threading.Lock()
+
+    def locked_get_bytecode(self, script_path):
+        with compile_lock:
+            return get_bytecode(self, script_path)
+
+    ScriptCache.get_bytecode = locked_get_bytecode
+
+
+def print_report(rows, elapsed, users):
+    print(f"\n{users} users, {elapsed:.1f}s wall clock\n")
+    print(f"{'flow':<11} {'step':<18} {'reruns':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}"
+          f" {'trips':>6} {'errors':>7} {'rejected':>8}")
+    for r in rows:
+        print(
+            f"{r['flow']:<11} {r['step']:<18} {r['reruns']:>6} "
+            f"{r['p50_ms']:>6.0f}ms {r['p95_ms']:>6.0f}ms {r['p99_ms']:>6.0f}ms {r['max_ms']:>6.0f}ms "
+            f"{r['round_trips']:>6.1f} {r['error_rate']:>7.1%} {r['reject_rate']:>8.1%}"
+        )
+
+    # Lỗi = exception trên trang; bị từ chối = st.error do ràng buộc nghiệp vụ
+    for key, title in (('first_error', 'errors'), ('first_reject', 'rejections')):
+        samples = [r for r in rows if r[key]]
+        if samples:
+            print(f"\nfirst {title} per step:")
+            for r in samples:
+                print(f"  {r['flow']}/{r['step']}: {r[key].splitlines()[0][:160]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=20, help='concurrent simulated students')
+    parser.add_argument('--staff', type=int, default=2, help='concurrent simulated staff')
+    parser.add_argument('--iterations', type=int, default=1, help='flows per simulated user')
+    parser.add_argument('--approvals', type=int, default=5, help='approvals per staff iteration')
+    parser.add_argument('--think', type=float, default=0.0, help='seconds between steps')
+    parser.add_argument('--db', default=os.path.join(APP_DIR, 'loadtest.db'), help='SQLite file')
+    parser.add_argument('--init', action='store_true', help='recreate and seed the SQLite file first')
+    parser.add_argument('--seed-students', type=int, default=None, help='students in the seeded data')
+    parser.add_argument('--timeout', type=float, default=120, help='per-rerun AppTest timeout')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='write the report to this file')
+    args = parser.parse_args()
+
+    os.environ.setdefault('LMS_DB_BACKEND', 'sqlite')
+    os.environ.setdefault('LMS_SKIP_DEP_CHECK', '1')
+    os.environ['LMS_SQLITE_PATH'] = args.db
+    sys.path.insert(0, APP_DIR)
+    os.chdir(APP_DIR)
+
+    if args.init and os.environ['LMS_DB_BACKEND'] == 'sqlite':
+        import sqlite_backend
+        sqlite_backend.init_database(args.db, students=max(args.seed_students or 0, args.students, 300))
+
+    import database
+
+    round_trips = collections.Counter()
+    counter_lock = threading.Lock()
+
+    def count_round_trip(entry):
+        if not entry['cache_hit'] and entry['session']:
+            with counter_lock:
+                round_trips[entry['session']] += 1
+
+    database.add_query_listener(count_round_trip)
+    patch_apptest()
+
+    student_ids = database.run_query("SELECT UserID FROM Students ORDER BY UserID")['UserID'].tolist()
+    staff_ids = database.run_query("SELECT UserID FROM Staff ORDER BY UserID")['UserID'].tolist()
+    if len(student_ids) < args.students or (args.staff and not staff_ids):
+        print(f"❌ Not enough users in the database (students={len(student_ids)}, staff={len(staff_ids)}); use --init")
+        return 1
+
+    stats = Stats()
+    rng = random.Random(args.seed)
+    students = rng.sample(student_ids, args.students)
+    start = threading.Barrier(args.students + args.staff)
+
+    def run_student(i, student_id):
+        user_rng = random.Random(args.seed * 1000 + i)
+        start.wait()
+        for n in range(args.iterations):
+            student_flow(VirtualUser(f"sv{student_id}-{n}", stats, round_trips, args.timeout),
+                         int(student_id), user_rng, args.think)
+
+    def run_staff(i):
+        user_rng = random.Random(args.seed * 7000 + i)
+        staff_id = int(staff_ids[i % len(staff_ids)])
+        start.wait()
+        for n in range(args.iterations):
+            staff_flow(VirtualUser(f"staff{i}-{n}", stats, round_trips, args.timeout),
+                       staff_id, user_rng, args.think, args.approvals)
+
+    threads = [threading.Thread(target=run_student, args=(i, sid)) for i, sid in enumerate(students)]
+    threads += [threading.Thread(target=run_staff, args=(i,)) for i in range(args.staff)]
+
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    rows = stats.report()
+    print_report(rows, elapsed, len(threads))
+
+    pool = database.get_pool_stats()
+    cache = database.get_cache_stats()
+    print(f"\npool: {pool['creates']} connections, {pool['waits']} waits, {pool['timeouts']} timeouts"
+          f" | cache hit rate {cache['hit_rate']:.0%}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'elapsed_s': elapsed, 'users': len(threads), 'steps': rows,
+                       'pool': pool, 'cache': cache}, f, indent=2, default=str)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
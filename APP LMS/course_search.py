@@ -0,0 +1,127 @@
+"""
+In-process search over the course catalog (🔍 Tìm và đăng ký môn học)
+
+Matches a typed query against Course_Code, Title and Department without
+the browser receiving the whole catalog:
+  - Vietnamese diacritics are folded ("lap trinh" finds "Lập trình", đ -> d)
+  - every query word must be a prefix of some word of the course,
+    weighted by field (code > title > department)
+  - trigram overlap tolerates typos and missing spaces ("laptrinh")
+and returns only the top-k CourseIDs. Pure Python, no extra dependency;
+database.get_course_index() builds one per catalog version.
+"""
+
+import heapq
+import re
+import unicodedata
+from bisect import bisect_left
+
+SEARCH_CONFIG = {
+    'limit': 30,              # options sent to the browser per query
+    'min_similarity': 0.5,    # trigram overlap accepted without a prefix match
+}
+
+# Field weights for prefix matches; an exact word scores double
+FIELD_WEIGHTS = {
+    'Course_Code': 3,
+    'Title': 2,
+    'Department': 1,
+}
+
+_NON_WORD = re.compile(r'[^0-9a-z]+')
+
+def fold(text):
+    """Lowercase ASCII form of text: 'Đại số Tuyến tính' -> 'dai so tuyen tinh'"""
+    if text is None:
+        return ''
+    text = str(text).replace('đ', 'd').replace('Đ', 'D')
+    text = unicodedata.normalize('NFD', text)
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch))
+    return _NON_WORD.sub(' ', text.lower()).strip()
+
+def trigrams(folded):
+    """Character trigrams of a folded string, spaces removed and ends padded"""
+    compact = ' ' + folded.replace(' ', '') + ' '
+    return {compact[i:i + 3] for i in range(len(compact) - 2)}
+
+
+class CourseSearchIndex:
+    """Prefix + trigram index over the rows of a course DataFrame"""
+
+    def __init__(self, courses, limit=None, min_similarity=None):
+        self.limit = limit or SEARCH_CONFIG['limit']
+        self.min_similarity = min_similarity if min_similarity is not None else SEARCH_CONFIG['min_similarity']
+
+        self.courses = courses.set_index('CourseID', drop=False).rename_axis(None)
+        self._ids = []                # position -> CourseID, in catalog order
+        self._codes = []              # position -> folded course code (tie-break)
+        self._words = {}              # word -> {position: field weight}
+        self._grams = {}              # trigram -> set of positions
+
+        for row in courses.itertuples(index=False):
+            position = len(self._ids)
+            self._ids.append(int(row.CourseID))
+            self._codes.append(fold(row.Course_Code))
+
+            for field, weight in FIELD_WEIGHTS.items():
+                for word in fold(getattr(row, field, None)).split():
+                    postings = self._words.setdefault(word, {})
+                    postings[position] = max(postings.get(position, 0), weight)
+
+            for gram in trigrams(fold(row.Course_Code)) | trigrams(fold(row.Title)):
+                self._grams.setdefault(gram, set()).add(position)
+
+        self._sorted_words = sorted(self._words)
+
+    def __len__(self):
+        return len(self._ids)
+
+    def rows(self, course_ids):
+        """Catalog rows for course_ids, in the given order"""
+        return self.courses.loc[list(course_ids)]
+
+    def search(self, query, limit=None):
+        """CourseIDs best matching query, at most limit; catalog order when query is empty"""
+        limit = limit or self.limit
+        folded = fold(query)
+        if not folded:
+            return self._ids[:limit]
+
+        words = folded.split()
+        scores = {}
+        matched = {}
+
+        for word in words:
+            for position, score in self._prefix_matches(word).items():
+                scores[position] = scores.get(position, 0) + score
+                matched[position] = matched.get(position, 0) + 1
+
+        query_grams = trigrams(folded)
+        shared = {}
+        for gram in query_grams:
+            for position in self._grams.get(gram, ()):
+                shared[position] = shared.get(position, 0) + 1
+
+        ranked = []
+        for position in scores.keys() | shared.keys():
+            similarity = shared.get(position, 0) / len(query_grams)
+            all_words = matched.get(position, 0) == len(words)
+            if not all_words and similarity < self.min_similarity:
+                continue
+            score = (100 if all_words else 0) + scores.get(position, 0) + 10 * similarity
+            ranked.append((score, position))
+
+        best = heapq.nsmallest(limit, ranked, key=lambda item: (-item[0], self._codes[item[1]]))
+        return [self._ids[position] for _, position in best]
+
+    def _prefix_matches(self, prefix):
+        """{position: score} for every indexed word starting with prefix"""
+        matches = {}
+        for i in range(bisect_left(self._sorted_words, prefix), len(self._sorted_words)):
+            word = self._sorted_words[i]
+            if not word.startswith(prefix):
+                break
+            exact = 2 if word == prefix else 1
+            for position, weight in self._words[word].items():
+                matches[position] = max(matches.get(position, 0), weight * exact)
+        return matches
@@ -2,30 +2,88 @@
 Database operations and queries
 """
 
+import datetime
+import decimal
+import importlib.util
+import json
+import os
 import sys
 import subprocess
 
+REQUIRED_PACKAGES = ["pyodbc", "pandas", "streamlit", "plotly"]
+
+# Written once dependencies are known to be present for this interpreter;
+# later worker processes only compare it instead of probing pip
+DEPS_MARKER = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".deps_ok")
+
 def install_if_missing(package):
-    try:
-        __import__(package)
-    except ImportError:
+    if importlib.util.find_spec(package) is None:
         print(f"📦 Installing {package}...")
         subprocess.check_call([sys.executable, "-m", "pip", "install", package, "-q"])
 
-install_if_missing("pyodbc")
-install_if_missing("pandas")
-install_if_missing("streamlit")
-install_if_missing("plotly")
+def _deps_signature():
+    return {'python': sys.executable, 'version': sys.version, 'packages': _required_packages()}
+
+def _required_packages():
+    # The local SQLite backend needs no ODBC driver
+    if os.environ.get("LMS_DB_BACKEND") == "sqlite":
+        return [p for p in REQUIRED_PACKAGES if p != "pyodbc"]
+    return REQUIRED_PACKAGES
+
+def ensure_dependencies(force=False):
+    """Install missing packages once, then trust the marker file
+
+    Set LMS_SKIP_DEP_CHECK=1 when dependencies are installed at deploy
+    time (python database.py --install-deps) to skip even the marker read.
+    """
+    if not force:
+        try:
+            with open(DEPS_MARKER, encoding="utf-8") as f:
+                if json.load(f) == _deps_signature():
+                    return
+        except (OSError, ValueError):
+            pass
+
+    for package in _required_packages():
+        install_if_missing(package)
+
+    try:
+        with open(DEPS_MARKER, "w", encoding="utf-8") as f:
+            json.dump(_deps_signature(), f)
+    except OSError:
+        pass
+
+if os.environ.get("LMS_SKIP_DEP_CHECK") != "1":
+    ensure_dependencies()
+
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from operator import itemgetter
 
-import pyodbc
 import pandas as pd
 import streamlit as st
 import numpy as np
 
+from course_search import CourseSearchIndex
+from prerequisites import PrerequisiteGraph, PrerequisiteCycleError
+from registration_rules import RegistrationRules, StudentState
+
 # =============================================================================
 # DATABASE CONNECTION
 # =============================================================================
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
 DB_CONFIG = {
+    # 'mssql' (SQL Server through pyodbc) or 'sqlite' (local stand-in, see sqlite_backend.py)
+    'backend': os.environ.get("LMS_DB_BACKEND", "mssql"),
+    'sqlite_path': os.environ.get("LMS_SQLITE_PATH", os.path.join(APP_DIR, "lms_local.db")),
     'server': 'localhost',
     'database': 'UniversityDB',
     'username': 'sa',
@@ -33,21 +91,279 @@ DB_CONFIG = {
     'driver': '{ODBC Driver 17 for SQL Server}'
 }
 
+# Both drivers expose connect() and an Error class carrying the SQLSTATE in args[0]
+if DB_CONFIG['backend'] == 'sqlite':
+    import sqlite_backend as driver
+else:
+    import pyodbc as driver
+
+DatabaseError = driver.Error
+
+# Pool sizing and health checks (shared by every Streamlit session in the process)
+POOL_CONFIG = {
+    'min_size': 2,            # idle connections kept open even when unused
+    'max_size': 10,           # hard cap on open connections
+    'idle_timeout': 300,      # seconds before an idle connection above min_size is closed
+    'checkout_timeout': 30,   # seconds to wait for a free connection
+    'ping_after': 30,         # idle seconds after which a connection is pinged before reuse
+    'ping_query': 'SELECT 1'
+}
+
+# SQLSTATEs meaning the connection itself is dead and must not go back to the pool
+DISCONNECT_SQLSTATES = ('08S01', '08003', '08007')
+TIMEOUT_SQLSTATE = 'HYT00'
+CANCELLED_SQLSTATE = 'HY008'
+
+def _connection_string():
+    return (
+        f"DRIVER={DB_CONFIG['driver']};"
+        f"SERVER={DB_CONFIG['server']};"
+        f"DATABASE={DB_CONFIG['database']};"
+        f"UID={DB_CONFIG['username']};"
+        f"PWD={DB_CONFIG['password']}"
+    )
+
+def _open_connection():
+    """Open a new physical connection (full ODBC login)"""
+    # Autocommit keeps pooled connections free of open read transactions;
+    # writes switch it off explicitly (see execute_procedure)
+    if DB_CONFIG['backend'] == 'sqlite':
+        return driver.connect(DB_CONFIG['sqlite_path'], autocommit=True)
+    return driver.connect(_connection_string(), autocommit=True)
+
+def _sqlstate(error):
+    args = getattr(error, 'args', ())
+    return str(args[0]) if args else None
+
+def is_disconnect_error(error):
+    """True if a driver error means the connection is no longer usable"""
+    return _sqlstate(error) in DISCONNECT_SQLSTATES
+
+def is_timeout_error(error):
+    """True if a statement hit its query timeout"""
+    return _sqlstate(error) == TIMEOUT_SQLSTATE
+
+def is_cancelled_error(error):
+    """True if a statement was cancelled (see cancel_session_queries)"""
+    return _sqlstate(error) == CANCELLED_SQLSTATE
+
+
+class ConnectionPool:
+    """Thread-safe pool of database connections with idle eviction and liveness checks"""
+
+    def __init__(self, connect, min_size=2, max_size=10, idle_timeout=300,
+                 checkout_timeout=30, ping_after=30, ping_query='SELECT 1'):
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.ping_after = ping_after
+        self.ping_query = ping_query
+
+        self._idle = deque()      # (conn, last_used), most recently used on the right
+        self._size = 0            # open connections, idle + checked out
+        self._cond = threading.Condition()
+        self._stats = {
+            'checkouts': 0,
+            'creates': 0,
+            'waits': 0,
+            'wait_time': 0.0,
+            'timeouts': 0,
+            'ping_failures': 0,
+            'discards': 0,
+            'evictions': 0
+        }
+
+    def acquire(self):
+        """Check out a live connection, opening one if below max_size"""
+        while True:
+            conn, last_used = self._checkout()
+
+            if conn is None:
+                return self._create()
+
+            if time.monotonic() - last_used < self.ping_after or self._ping(conn):
+                return conn
+
+            with self._cond:
+                self._stats['ping_failures'] += 1
+            self._close(conn)
+
+    def release(self, conn, discard=False):
+        """Return a connection to the pool, or close it if discard is set"""
+        if conn is None:
+            return
+
+        if discard:
+            with self._cond:
+                self._stats['discards'] += 1
+            self._close(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def close_all(self):
+        """Close every idle connection (checked-out ones close on release)"""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+
+        for conn, _ in idle:
+            self._safe_close(conn)
+
+    def stats(self):
+        """Snapshot of pool counters"""
+        with self._cond:
+            stats = dict(self._stats)
+            stats['size'] = self._size
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._size - len(self._idle)
+        return stats
+
+    def _checkout(self):
+        with self._cond:
+            self._stats['checkouts'] += 1
+            self._evict_idle()
+
+            deadline = None
+            waited_since = None
+
+            while True:
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                    break
+
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn, last_used = None, None
+                    break
+
+                now = time.monotonic()
+                if deadline is None:
+                    deadline = now + self.checkout_timeout
+                    waited_since = now
+                    self._stats['waits'] += 1
+
+                if now >= deadline:
+                    self._stats['timeouts'] += 1
+                    self._stats['wait_time'] += now - waited_since
+                    raise TimeoutError(
+                        f"No database connection available after {self.checkout_timeout}s"
+                    )
+
+                self._cond.wait(deadline - now)
+
+            if waited_since is not None:
+                self._stats['wait_time'] += time.monotonic() - waited_since
+
+        return conn, last_used
+
+    def _create(self):
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+
+        with self._cond:
+            self._stats['creates'] += 1
+        return conn
+
+    def _ping(self, conn):
+        try:
+            cursor = conn.cursor()
+            try:
+                cursor.execute(self.ping_query)
+                cursor.fetchall()
+            finally:
+                cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _evict_idle(self):
+        # Oldest idle connections sit on the left; keep at least min_size open
+        cutoff = time.monotonic() - self.idle_timeout
+
+        while self._idle and self._size > self.min_size and self._idle[0][1] < cutoff:
+            conn, _ = self._idle.popleft()
+            self._size -= 1
+            self._stats['evictions'] += 1
+            self._safe_close(conn)
+
+    def _close(self, conn):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+        self._safe_close(conn)
+
+    @staticmethod
+    def _safe_close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool():
+    """Process-wide connection pool, created on first use"""
+    global _pool
+
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(_open_connection, **POOL_CONFIG)
+    return _pool
+
+def get_pool_stats():
+    """Pool counters: checkouts, creates, waits, timeouts, size..."""
+    return get_pool().stats()
+
+class DatabaseUnavailable(Exception):
+    """No connection could be obtained from the pool"""
+
+def acquire_connection():
+    """Check out a pooled connection, raising DatabaseUnavailable on failure"""
+    try:
+        return get_pool().acquire()
+    except (DatabaseError, TimeoutError) as e:
+        raise DatabaseUnavailable(str(e)) from e
+
 def get_connection():
-    """Get database connection"""
-    try:
-        conn_str = (
-            f"DRIVER={DB_CONFIG['driver']};"
-            f"SERVER={DB_CONFIG['server']};"
-            f"DATABASE={DB_CONFIG['database']};"
-            f"UID={DB_CONFIG['username']};"
-            f"PWD={DB_CONFIG['password']}"
-        )
-        return pyodbc.connect(conn_str)
-    except pyodbc. Error as e:
-        st. error(f"❌ Không thể kết nối database: {e}")
+    """Get a pooled database connection (return it with release_connection)"""
+    try:
+        return acquire_connection()
+    except DatabaseUnavailable as e:
+        st.error(f"❌ Không thể kết nối database: {e}")
         return None
 
+def release_connection(conn, discard=False):
+    """Return a connection obtained from get_connection to the pool"""
+    get_pool().release(conn, discard=discard)
+
+@contextmanager
+def pooled_connection():
+    """Context manager around get_connection/release_connection"""
+    conn = get_connection()
+    discard = False
+    try:
+        yield conn
+    except DatabaseError as e:
+        discard = is_disconnect_error(e)
+        raise
+    finally:
+        if conn is not None:
+            release_connection(conn, discard=discard)
+
 # =============================================================================
 # HELPER FUNCTIONS
 # =============================================================================
@@ -78,6 +394,8 @@ def parse_sql_error(error_str):
         '50003': 'Chưa hoàn thành môn tiên quyết',
         '50004': 'Ngày thi không hợp lệ (ngoài học kỳ)',
         '50020': 'Activity không tồn tại',
+        'HYT00': 'Truy vấn quá thời gian cho phép, vui lòng thử lại',
+        'HY008': 'Truy vấn đã bị hủy',
         'unique_student_course_activity': 'Đã có activity này cho môn học này rồi',
     }
     
@@ -87,62 +405,1051 @@ def parse_sql_error(error_str):
     
     return f"❌ Lỗi: {error_str[:200]}"
 
+# =============================================================================
+# QUERY CACHE
+# =============================================================================
+CACHE_CONFIG = {
+    'enabled': True,          # master switch; individual queries still opt in with cache=True
+    'max_entries': 512,       # LRU limit on cached result sets
+    'default_ttl': 300,       # seconds, for tags without their own TTL
+    'tag_ttl': {              # an entry lives for the shortest TTL among its tags
+        'Activities': 30,
+        'Exam_Delays': 30,
+        'Professor_Course': 120,
+        'Student_Program': 120,
+        'Users': 300,
+        'Students': 300,
+        'Professors': 300,
+        'Staff': 300,
+        'Courses': 600,
+        'CoursePrerequisites': 600,
+        'Semesters': 3600,
+        'Departments': 3600,
+        'Education_Centers': 3600,
+        'Degree_Programs': 3600,
+        'Specializations': 3600
+    }
+}
+
+# Tables read by the scalar functions and read-only procedures the pages call
+FUNCTION_TABLES = {
+    'GetFullName': ['Users'],
+    'GetTotalCredits': ['Activities', 'Courses'],
+    'GetStudentCountByCourse': ['Activities'],
+    'GetCoursesWithStudentCount': ['Courses', 'Activities'],
+    'GetStudentsCreditsBySemester': ['Activities', 'Courses', 'Students', 'Users']
+}
+
+# Tables written by each stored procedure; execute_procedure invalidates them.
+# Procedures missing from this map flush the whole cache.
+PROCEDURE_TABLES = {
+    'InsertActivity': ['Activities'],
+    'UpdateActivityStatus': ['Activities'],
+    'InsertExamDelay': ['Exam_Delays'],
+    'InsertCourse': ['Courses'],
+    'UpdateCourse': ['Courses'],
+    'DeleteCourse': ['Courses', 'CoursePrerequisites'],
+    'InsertCoursePrerequisite': ['CoursePrerequisites'],
+    'DeleteCoursePrerequisite': ['CoursePrerequisites'],
+    'InsertSemester': ['Semesters'],
+    'DeleteSemester': ['Semesters'],
+    'InsertUser': ['Users'],
+    'UpdateUser': ['Users'],
+    'DeleteUser': ['Users'],
+    'InsertStudent': ['Students'],
+    'UpdateStudent': ['Students'],
+    'DeleteStudent': ['Students', 'Student_Program'],
+    'InsertProfessor': ['Professors'],
+    'UpdateProfessor': ['Professors'],
+    'DeleteProfessor': ['Professors', 'Professor_Course'],
+    'InsertStaff': ['Staff'],
+    'UpdateStaff': ['Staff'],
+    'DeleteStaff': ['Staff'],
+    'AssignProfessorToCourse': ['Professor_Course'],
+    'EnrollStudentInProgram': ['Student_Program'],
+    'InsertDegreeProgram': ['Degree_Programs'],
+    'DeleteDegreeProgram': ['Degree_Programs', 'Student_Program', 'Specializations'],
+    'InsertSpecialization': ['Specializations'],
+    'DeleteSpecialization': ['Specializations'],
+    'InsertDepartment': ['Departments'],
+    'DeleteDepartment': ['Departments'],
+    'InsertEducationCenter': ['Education_Centers'],
+    'DeleteEducationCenter': ['Education_Centers']
+}
+
+# Procedures whose writes touch one slice of a table, named by an argument:
+# (table, column) is invalidated as the scoped tag "table:column=<@p_column>"
+PROCEDURE_SCOPES = {
+    'InsertActivity': ('Activities', 'StudentID'),
+    'AssignProfessorToCourse': ('Professor_Course', 'ProfessorID')
+}
+
+_TABLE_PATTERN = re.compile(r'\b(?:FROM|JOIN)\s+(?:dbo\s*\.\s*)?\[?(\w+)\]?', re.IGNORECASE)
+_FUNCTION_PATTERN = re.compile(r'\b(?:dbo\s*\.\s*)?(\w+)\s*\(')
+_EXEC_PATTERN = re.compile(r'^\s*EXEC(?:UTE)?\s+(?:dbo\s*\.\s*)?(\w+)', re.IGNORECASE)
+_ARG_PATTERN = re.compile(r'@(\w+)\s*=\s*\?')
+
+def normalize_sql(query):
+    """Collapse whitespace so formatting differences share a cache key"""
+    return ' '.join(query.split())
+
+def procedure_name(query):
+    """Name of the procedure in an 'EXEC Proc ...' statement, or None"""
+    match = _EXEC_PATTERN.match(query)
+    return match.group(1) if match else None
+
+def query_tables(query):
+    """Tables a SELECT (or read-only EXEC) depends on, used as cache tags"""
+    tables = {name for name in _TABLE_PATTERN.findall(query)}
+
+    for name in _FUNCTION_PATTERN.findall(query):
+        tables.update(FUNCTION_TABLES.get(name, []))
+
+    proc = procedure_name(query)
+    if proc:
+        tables.update(FUNCTION_TABLES.get(proc, []))
+
+    return tables
+
+def scoped_tag(table, column, value):
+    """Cache tag for the rows of table where column = value
+
+    A result tagged 'Activities:StudentID=7' survives writes to other
+    students' activities; a write to the whole table still drops it.
+    """
+    return f"{table}:{column}={value}"
+
+def base_table(tag):
+    """Table a (possibly scoped) cache tag belongs to"""
+    return tag.split(':', 1)[0]
+
+def procedure_args(query, params):
+    """Map the @name=? arguments of an EXEC statement to their values"""
+    return dict(zip(_ARG_PATTERN.findall(query), params or []))
+
+
+class QueryCache:
+    """Thread-safe LRU of query results, tagged by the tables they read"""
+
+    def __init__(self, max_entries=512, default_ttl=300, tag_ttl=None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.tag_ttl = tag_ttl or {}
+
+        self._entries = OrderedDict()   # key -> (value, tags, expires_at)
+        self._by_tag = {}               # tag -> set of keys
+        self._generations = {}          # tag -> invalidation counter
+        self._lock = threading.Lock()
+        self._stats = {
+            'hits': 0,
+            'misses': 0,
+            'stores': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'invalidations': 0
+        }
+
+    @staticmethod
+    def make_key(query, params=None):
+        return normalize_sql(query), tuple(params) if params else ()
+
+    def generation(self, tags):
+        """Snapshot of invalidation counters; pass it back to put()"""
+        # A scoped tag is also stale once its whole table is invalidated,
+        # which bumps the table's "table:*" counter
+        tags = set(tags) | {base_table(tag) + ':*' for tag in tags if base_table(tag) != tag}
+        tags.add('*')               # bumped by clear()
+        with self._lock:
+            return {tag: self._generations.get(tag, 0) for tag in tags}
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+
+            value, tags, expires_at = entry
+            if time.monotonic() >= expires_at:
+                self._remove(key)
+                self._stats['expirations'] += 1
+                self._stats['misses'] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return value
+
+    def ttl(self, tags):
+        """Lifetime of an entry: the shortest TTL among its tables"""
+        return min((self.tag_ttl.get(base_table(tag), self.default_ttl) for tag in tags), default=self.default_ttl)
+
+    def put(self, key, value, tags, generation=None):
+        """Store a result unless one of its tags was invalidated since generation"""
+        ttl = self.ttl(tags)
+
+        with self._lock:
+            if generation and any(self._generations.get(tag, 0) != gen for tag, gen in generation.items()):
+                return False
+
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, frozenset(tags), time.monotonic() + ttl)
+            for tag in tags:
+                self._by_tag.setdefault(tag, set()).add(key)
+            self._stats['stores'] += 1
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats['evictions'] += 1
+
+        return True
+
+    def invalidate(self, tags):
+        """Drop every entry carrying one of the tags
+
+        A table tag also drops every scoped tag of that table; a scoped tag
+        drops its own slice plus the entries that read the whole table.
+        """
+        with self._lock:
+            affected = set()
+            for tag in tags:
+                table = base_table(tag)
+                affected.add(table)
+                if tag == table:
+                    prefix = table + ':'
+                    affected.add(prefix + '*')
+                    affected.update(t for t in self._by_tag if t.startswith(prefix))
+                else:
+                    affected.add(tag)
+
+            for tag in affected:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+                for key in self._by_tag.pop(tag, set()):
+                    if key in self._entries:
+                        self._remove(key)
+                        self._stats['invalidations'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._generations['*'] = self._generations.get('*', 0) + 1
+            for tag in self._by_tag:
+                self._generations[tag] = self._generations.get(tag, 0) + 1
+            self._entries.clear()
+            self._by_tag.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def _remove(self, key):
+        _, tags, _ = self._entries.pop(key)
+        for tag in tags:
+            keys = self._by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_tag[tag]
+
+
+_query_cache = QueryCache(
+    max_entries=CACHE_CONFIG['max_entries'],
+    default_ttl=CACHE_CONFIG['default_ttl'],
+    tag_ttl=CACHE_CONFIG['tag_ttl']
+)
+
+def get_cache_stats():
+    """Cache counters: hits, misses, evictions, invalidations, hit_rate..."""
+    return _query_cache.stats()
+
+def invalidate_tables(*tables):
+    """Invalidate cached results that read any of the given tables"""
+    _query_cache.invalidate(tables)
+
+def clear_query_cache():
+    """Drop every cached result"""
+    _query_cache.clear()
+
+def memoized(store, key, tags, load):
+    """Keep load()'s result in store (e.g. st.session_state) until a tag is invalidated
+
+    Unlike cache=True there is no lookup or DataFrame copy on a hit, so
+    callers must not modify the returned value. Entries also expire after
+    the tags' cache TTL; nothing is stored when load() raises.
+    """
+    generation = _query_cache.generation(tags)
+    entry = store.get(key)
+    if entry is not None and entry['generation'] == generation and time.monotonic() < entry['expires']:
+        return entry['value']
+
+    value = load()
+    store[key] = {
+        'generation': generation,
+        'expires': time.monotonic() + _query_cache.ttl(tags),
+        'value': value
+    }
+    return value
+
+# =============================================================================
+# TIMEOUTS & CANCELLATION
+# =============================================================================
+QUERY_CONFIG = {
+    'timeout': 30,            # default per-statement timeout in seconds (0 = none)
+    'procedure_timeout': 60,  # default timeout for stored procedures
+    # seconds a page rerun may spend before optional panels are skipped (None = no budget)
+    'rerun_budget': float(os.environ.get("LMS_RERUN_BUDGET", 0)) or None,
+    'watchdog_interval': 1.0  # how often abandoned statements are looked for
+}
+
+# Statements currently executing: cursor -> session id of the page that issued them
+_inflight = {}
+_inflight_lock = threading.Lock()
+_watchdog = None
+
+# Per script-run state; Streamlit runs every rerun on its own thread
+_rerun = threading.local()
+
+def current_session_id():
+    """Streamlit session id of the calling script thread, or None"""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return None
+
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx else None
+
+def _session_active(session_id):
+    try:
+        from streamlit.runtime import Runtime
+        return Runtime.instance().is_active_session(session_id)
+    except Exception:
+        return True
+
+def _set_timeout(conn, timeout):
+    """Apply a statement timeout to a (pooled) connection"""
+    if timeout is None:
+        timeout = QUERY_CONFIG['timeout']
+    conn.timeout = int(timeout or 0)
+
+@contextmanager
+def track_statement(cursor, session_id=None):
+    """Register a running statement so it can be cancelled"""
+    session_id = session_id or current_session_id()
+    with _inflight_lock:
+        _inflight[cursor] = session_id
+    _ensure_watchdog()
+    try:
+        yield cursor
+    finally:
+        with _inflight_lock:
+            _inflight.pop(cursor, None)
+
+def cancel_session_queries(session_id):
+    """Cancel every in-flight statement issued by a session; returns the count"""
+    with _inflight_lock:
+        cursors = [c for c, sid in _inflight.items() if sid == session_id]
+
+    for cursor in cursors:
+        try:
+            cursor.cancel()
+        except Exception:
+            pass
+    return len(cursors)
+
+def _watch_inflight():
+    # Cancels statements whose browser session has gone away
+    while True:
+        time.sleep(QUERY_CONFIG['watchdog_interval'])
+
+        with _inflight_lock:
+            sessions = {sid for sid in _inflight.values() if sid}
+
+        for session_id in sessions:
+            if not _session_active(session_id):
+                cancel_session_queries(session_id)
+
+def _ensure_watchdog():
+    global _watchdog
+
+    if _watchdog is None:
+        with _inflight_lock:
+            if _watchdog is None:
+                _watchdog = threading.Thread(target=_watch_inflight, name="lms-query-watchdog", daemon=True)
+                _watchdog.start()
+
+def begin_rerun(budget=None):
+    """Call at the top of a page: cancels statements left over from the
+    session's previous run and starts this run's time budget"""
+    session_id = current_session_id()
+    if session_id:
+        cancel_session_queries(session_id)
+
+    budget = QUERY_CONFIG['rerun_budget'] if budget is None else budget
+    _rerun.deadline = time.monotonic() + budget if budget else None
+
+def begin_fragment_rerun(budget=None):
+    """Call at the top of an @st.fragment function
+
+    A fragment-only rerun skips the page's begin_rerun, so this does it
+    instead: statements from the fragment's previous run are cancelled and
+    the fragment gets its own budget. During a full page run it does
+    nothing, the page's begin_rerun already covers the fragment.
+    """
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+    except ImportError:
+        return
+
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx and getattr(ctx, 'fragment_ids_this_run', None):
+        begin_rerun(budget)
+
+def budget_remaining():
+    """Seconds left in this rerun's budget (None when no budget is set)"""
+    deadline = getattr(_rerun, 'deadline', None)
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+def within_budget(panel_name=None):
+    """False once the rerun budget is spent; shows a placeholder for panel_name"""
+    remaining = budget_remaining()
+    if remaining is None or remaining > 0:
+        return True
+
+    if panel_name:
+        st.info(f"⏭️ Đã bỏ qua **{panel_name}** để trang tải nhanh hơn. Tải lại trang để xem.")
+    return False
+
+# =============================================================================
+# QUERY INSTRUMENTATION
+# =============================================================================
+METRICS_CONFIG = {
+    'enabled': True,
+    'buffer_size': 5000,      # most recent calls kept in memory
+    'slow_threshold': float(os.environ.get("LMS_SLOW_QUERY_MS", 500)),  # ms; slower calls go to the slow log
+    'slow_log_path': os.environ.get("LMS_SLOW_LOG", os.path.join(APP_DIR, "logs", "slow_queries.jsonl")),
+    'slow_log_max_bytes': 5 * 1024 * 1024,
+    'slow_log_backups': 3
+}
+
+_LITERAL_PATTERN = re.compile(r"N?'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST_PATTERN = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+def fingerprint_sql(query):
+    """Normalized statement text with literals replaced by '?' and its short hash"""
+    text = _LITERAL_PATTERN.sub('?', normalize_sql(query))
+    text = _IN_LIST_PATTERN.sub('(?)', text)
+    return hashlib.md5(text.encode('utf-8')).hexdigest()[:12], text
+
+def _calling_module():
+    """First page/module outside this file on the current thread's stack"""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename != __file__ and filename.startswith(APP_DIR):
+            return os.path.relpath(filename, APP_DIR).replace(os.sep, '/')
+        frame = frame.f_back
+    return None
+
+def _result_size(result):
+    """Rows and (shallow) in-memory bytes of a DataFrame or list of DataFrames"""
+    frames = result if isinstance(result, list) else [result]
+    rows = sum(len(df) for df in frames)
+    nbytes = sum(int(df.memory_usage(index=False).sum()) for df in frames if len(df.columns))
+    return rows, nbytes
+
+
+class QueryLog:
+    """Ring buffer of recent database calls plus a rotating JSONL slow log"""
+
+    def __init__(self, capacity, slow_threshold, slow_log_path, max_bytes, backups):
+        self.slow_threshold = slow_threshold
+        self.slow_log_path = slow_log_path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._records = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+        self._slow_logger = None
+        self.listeners = []
+
+    def record(self, entry):
+        with self._lock:
+            self._records.append(entry)
+
+        for listener in self.listeners:
+            listener(entry)
+
+        if entry['duration_ms'] >= self.slow_threshold:
+            try:
+                self._get_slow_logger().warning(json.dumps(entry, ensure_ascii=False, default=str))
+            except OSError:
+                pass
+
+    def records(self):
+        with self._lock:
+            return list(self._records)
+
+    def clear(self):
+        with self._lock:
+            self._records.clear()
+
+    def summary(self):
+        """One row per fingerprint: calls, total/avg/p95 time, rows, bytes, cache hits"""
+        records = self.records()
+        if not records:
+            return pd.DataFrame()
+
+        df = pd.DataFrame(records)
+        grouped = df.groupby('fingerprint')
+        summary = grouped.agg(
+            kind=('kind', 'first'),
+            sql=('sql', 'first'),
+            calls=('duration_ms', 'size'),
+            total_ms=('duration_ms', 'sum'),
+            avg_ms=('duration_ms', 'mean'),
+            p95_ms=('duration_ms', lambda d: d.quantile(0.95)),
+            max_ms=('duration_ms', 'max'),
+            rows=('rows', 'sum'),
+            bytes=('bytes', 'sum'),
+            cache_hit_rate=('cache_hit', 'mean'),
+            errors=('error', 'count'),
+            sources=('source', lambda s: ', '.join(sorted({x for x in s if isinstance(x, str)})))
+        )
+        return summary.reset_index().round({'total_ms': 1, 'avg_ms': 1, 'p95_ms': 1, 'max_ms': 1, 'cache_hit_rate': 2})
+
+    def _get_slow_logger(self):
+        if self._slow_logger is None:
+            with self._lock:
+                if self._slow_logger is None:
+                    os.makedirs(os.path.dirname(self.slow_log_path), exist_ok=True)
+                    handler = RotatingFileHandler(
+                        self.slow_log_path, maxBytes=self.max_bytes,
+                        backupCount=self.backups, encoding='utf-8'
+                    )
+                    handler.setFormatter(logging.Formatter('%(message)s'))
+                    logger = logging.getLogger("lms.slow_queries")
+                    logger.addHandler(handler)
+                    logger.propagate = False
+                    self._slow_logger = logger
+        return self._slow_logger
+
+
+_query_log = QueryLog(
+    capacity=METRICS_CONFIG['buffer_size'],
+    slow_threshold=METRICS_CONFIG['slow_threshold'],
+    slow_log_path=METRICS_CONFIG['slow_log_path'],
+    max_bytes=METRICS_CONFIG['slow_log_max_bytes'],
+    backups=METRICS_CONFIG['slow_log_backups']
+)
+
+@contextmanager
+def instrumented(kind, query, source=None, session_id=None):
+    """Time one database call and add it to the query log
+
+    The body fills in the yielded dict: rows/bytes of the result and
+    cache_hit (left True when the loader never ran).
+    """
+    metrics = {'rows': 0, 'bytes': 0, 'cache_hit': True}
+    if not METRICS_CONFIG['enabled']:
+        yield metrics
+        return
+
+    error = None
+    started = time.perf_counter()
+    try:
+        yield metrics
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        fingerprint, text = fingerprint_sql(query)
+        _query_log.record({
+            'ts': datetime.datetime.now().isoformat(timespec='seconds'),
+            'kind': kind,
+            'fingerprint': fingerprint,
+            'sql': text[:500],
+            'duration_ms': round((time.perf_counter() - started) * 1000, 2),
+            'rows': metrics['rows'],
+            'bytes': metrics['bytes'],
+            'cache_hit': metrics['cache_hit'],
+            'source': source or _calling_module(),
+            'session': session_id or current_session_id(),
+            'error': error
+        })
+
+def get_query_summary():
+    """Per-fingerprint statistics for the calls still in the ring buffer"""
+    return _query_log.summary()
+
+def get_recent_queries(limit=100):
+    """Most recent instrumented calls, newest first"""
+    return list(reversed(_query_log.records()))[:limit]
+
+def add_query_listener(callback):
+    """Call callback(entry) for every instrumented call (e.g. load tests)"""
+    _query_log.listeners.append(callback)
+
+def remove_query_listener(callback):
+    """Stop calling a callback registered with add_query_listener"""
+    if callback in _query_log.listeners:
+        _query_log.listeners.remove(callback)
+
+def reset_query_metrics():
+    """Empty the in-memory ring buffer (the slow log file is kept)"""
+    _query_log.clear()
+
+def read_slow_log(limit=200):
+    """Last entries of the current slow-query log file, newest first"""
+    path = METRICS_CONFIG['slow_log_path']
+    if not os.path.exists(path):
+        return []
+
+    with open(path, encoding='utf-8') as f:
+        lines = deque(f, maxlen=limit)
+
+    entries = []
+    for line in reversed(lines):
+        try:
+            entries.append(json.loads(line))
+        except ValueError:
+            continue
+    return entries
+
+# =============================================================================
+# RESULT MATERIALIZATION
+# =============================================================================
+FETCH_CONFIG = {
+    'block_size': 10000       # rows per fetchmany call
+}
+
+def _build_column(values, type_code):
+    """Turn one column of fetched values into an array with a known dtype
+
+    Mirrors what pd.read_sql produces (ints with NULLs become float64,
+    Decimal is coerced to float) without inferring from every object.
+    """
+    has_nulls = None in values
+
+    if type_code is int and not has_nulls:
+        return np.fromiter(values, dtype=np.int64, count=len(values))
+
+    if type_code is bool and not has_nulls:
+        return np.fromiter(values, dtype=np.bool_, count=len(values))
+
+    if type_code in (int, float, decimal.Decimal):
+        if has_nulls:
+            values = [np.nan if v is None else v for v in values]
+        return np.fromiter(map(float, values), dtype=np.float64, count=len(values))
+
+    if type_code is datetime.datetime:
+        return pd.to_datetime(pd.Series(values, dtype=object))
+
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+def _frame_from_cursor(cursor, block_size=None):
+    """Read the current result set of a cursor into a DataFrame"""
+    block_size = block_size or FETCH_CONFIG['block_size']
+    description = cursor.description
+    columns = [col[0] for col in description]
+
+    rows = []
+    while True:
+        block = cursor.fetchmany(block_size)
+        if not block:
+            break
+        rows.extend(block)
+
+    if not rows:
+        return pd.DataFrame(columns=columns)
+
+    # Column-at-a-time extraction; zip(*rows) is far slower on large results
+    data = {}
+    for index, col in enumerate(description):
+        values = list(map(itemgetter(index), rows))
+        data[index] = _build_column(values, col[1])
+
+    df = pd.DataFrame(data, copy=False)
+    df.columns = columns
+    return df
+
+def _first_result_set(cursor):
+    """Skip row-count-only results (e.g. from procedures without NOCOUNT)"""
+    while cursor.description is None:
+        if not cursor.nextset():
+            return False
+    return True
+
+def fetch_dataframe(conn, query, params=None, timeout=None, session_id=None):
+    """Run a query on a connection and return its first result set as a DataFrame
+
+    timeout is in seconds (QUERY_CONFIG['timeout'] when None); the statement
+    is registered under session_id so a rerun or disconnect can cancel it.
+    """
+    _set_timeout(conn, timeout)
+    cursor = conn.cursor()
+    try:
+        with track_statement(cursor, session_id):
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+
+            if not _first_result_set(cursor):
+                return pd.DataFrame()
+            return _frame_from_cursor(cursor)
+    finally:
+        cursor.close()
+
 # =============================================================================
 # QUERY FUNCTIONS
 # =============================================================================
-def execute_query(query, params=None):
-    """Execute SELECT query and return DataFrame"""
-    conn = get_connection()
-    if conn is None:
-        return pd. DataFrame()
-    
+def _copy_result(result):
+    if isinstance(result, list):
+        return [df.copy() for df in result]
+    return result.copy()
+
+def _cached(cache, key_sql, params, tags, load):
+    """Serve load() through the query cache when the caller opted in"""
+    if not (cache and CACHE_CONFIG['enabled'] and tags):
+        return load()
+
+    key = QueryCache.make_key(key_sql, params)
+    cached = _query_cache.get(key)
+    if cached is not None:
+        return _copy_result(cached)
+
+    generation = _query_cache.generation(tags)
+    result = load()
+    _query_cache.put(key, _copy_result(result), tags, generation)
+    return result
+
+def _report_query_error(e):
+    """Show a query failure on the script thread (cancelled statements stay quiet)"""
+    if isinstance(e, DatabaseUnavailable):
+        st.error(f"❌ Không thể kết nối database: {e}")
+    elif is_timeout_error(e):
+        st.error(f"⏱️ {parse_sql_error(str(e))[2:]}")
+    elif not is_cancelled_error(e):
+        st.error(f"❌ Query error: {e}")
+
+def run_query(query, params=None, cache=False, tags=None, timeout=None, session_id=None, source=None):
+    """execute_query without Streamlit output: errors are raised, not shown"""
+    converted_params = convert_params(params)
+    session_id = session_id or current_session_id()
+
+    def load():
+        metrics['cache_hit'] = False
+        conn = acquire_connection()
+        discard = False
+        try:
+            return fetch_dataframe(conn, query, converted_params, timeout, session_id)
+        except Exception as e:
+            discard = is_disconnect_error(e)
+            raise
+        finally:
+            release_connection(conn, discard=discard)
+
+    cache_tags = (set(tags) if tags else query_tables(query)) if cache else None
+    with instrumented('query', query, source, session_id) as metrics:
+        result = _cached(cache, query, converted_params, cache_tags, load)
+        metrics['rows'], metrics['bytes'] = _result_size(result)
+    return result
+
+def execute_query(query, params=None, cache=False, tags=None, timeout=None):
+    """Execute SELECT query and return DataFrame
+
+    cache=True serves the result from the process-wide query cache when
+    possible; tags overrides the tables detected in the query. timeout is
+    in seconds and defaults to QUERY_CONFIG['timeout'].
+    """
     try:
-        converted_params = convert_params(params)
-        if converted_params:
-            df = pd.read_sql(query, conn, params=converted_params)
-        else:
-            df = pd.read_sql(query, conn)
-        return df
+        return run_query(query, params, cache=cache, tags=tags, timeout=timeout)
     except Exception as e:
-        st.error(f"❌ Query error: {e}")
-        return pd.DataFrame()
-    finally:
-        conn.close()
+        _report_query_error(e)
+    return pd.DataFrame()
 
-def execute_procedure(proc_query, params=None):
-    """Execute stored procedure"""
+def execute_procedure(proc_query, params=None, invalidate=None, timeout=None):
+    """Execute stored procedure
+
+    Cached results for the tables the procedure writes (PROCEDURE_TABLES)
+    and any extra invalidate tags are dropped once it has run; a scoped tag
+    such as scoped_tag('Activities', 'StudentID', 7) narrows the
+    invalidation of its table to that slice. Writes are never cancelled on
+    rerun; they only stop at their timeout.
+    """
     conn = get_connection()
     if conn is None:
         return False, "Không thể kết nối database"
     
+    discard = False
+    _set_timeout(conn, QUERY_CONFIG['procedure_timeout'] if timeout is None else timeout)
     cursor = conn.cursor()
     try:
-        converted_params = convert_params(params)
-        if converted_params:
-            cursor. execute(proc_query, converted_params)
-        else:
-            cursor.execute(proc_query)
-        
-        conn.commit()
+        with instrumented('procedure', proc_query) as metrics:
+            metrics['cache_hit'] = False
+            conn.autocommit = False
+            converted_params = convert_params(params)
+            if converted_params:
+                cursor. execute(proc_query, converted_params)
+            else:
+                cursor.execute(proc_query)
+            
+            conn.commit()
+            metrics['rows'] = max(cursor.rowcount, 0)
         return True, "Success"
-    except pyodbc.Error as e:
-        conn.rollback()
+    except DatabaseError as e:
+        discard = is_disconnect_error(e)
+        if not discard:
+            conn.rollback()
         return False, parse_sql_error(str(e))
     finally:
         cursor.close()
-        conn.close()
+        if not discard:
+            conn.autocommit = True
+        release_connection(conn, discard=discard)
+        _invalidate_after(proc_query, params, invalidate)
 
-# =============================================================================
-# USER AUTHENTICATION
-# =============================================================================
-def authenticate_user(user_id, role):
-    """Authenticate user by ID and role"""
-    if role == "Student":
-        query = """
-            SELECT s.UserID, u.FName, u.LName, u. Email_Address
-            FROM Students s
-            JOIN Users u ON s.UserID = u.UserID
-            WHERE s. UserID = ?
+class Transaction:
+    """Statements sent on one connection inside one transaction (see execute_transaction)"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self.procedures = []      # (proc_query, params) to invalidate once it ends
+
+    def execute(self, query, params=None):
+        """Run a statement or batch; returns its first result set (empty DataFrame if none)"""
+        results = self.execute_all(query, params)
+        return results[0] if results else pd.DataFrame()
+
+    def execute_all(self, query, params=None):
+        """Run a statement or batch and return every result set that has rows
+
+        Every result set is read, not only the first: with pyodbc an error
+        raised by a later statement of the batch only surfaces on nextset(),
+        and it has to reach execute_transaction before the commit.
+        """
+        kind = 'procedure' if procedure_name(query) else 'query'
+        if kind == 'procedure':
+            self.procedures.append((query, params))
+
+        with instrumented(kind, query) as metrics:
+            metrics['cache_hit'] = False
+            converted_params = convert_params(params)
+            if converted_params:
+                self._cursor.execute(query, converted_params)
+            else:
+                self._cursor.execute(query)
+
+            results = []
+            while True:
+                if self._cursor.description is not None:
+                    results.append(_frame_from_cursor(self._cursor))
+                if not self._cursor.nextset():
+                    break
+
+            metrics['rows'], metrics['bytes'] = _result_size(results)
+            return results
+
+def execute_transaction(work, invalidate=None, timeout=None):
+    """Run work(transaction) on one connection and commit it as one transaction
+
+    Returns (True, work's return value), or (False, error message) after
+    rolling everything back. Procedures run through transaction.execute()
+    invalidate the cache afterwards exactly as execute_procedure does.
+    """
+    conn = get_connection()
+    if conn is None:
+        return False, "Không thể kết nối database"
+
+    discard = False
+    _set_timeout(conn, QUERY_CONFIG['procedure_timeout'] if timeout is None else timeout)
+    cursor = conn.cursor()
+    transaction = Transaction(cursor)
+    try:
+        conn.autocommit = False
+        result = work(transaction)
+        conn.commit()
+        return True, result
+    except DatabaseError as e:
+        discard = is_disconnect_error(e)
+        if not discard:
+            conn.rollback()
+        return False, parse_sql_error(str(e))
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+        if not discard:
+            conn.autocommit = True
+        release_connection(conn, discard=discard)
+        for proc_query, params in transaction.procedures:
+            _invalidate_after(proc_query, params, invalidate)
+
+def _batch_statements(queries):
+    statements = [(q, None) if isinstance(q, str) else (q[0], q[1]) for q in queries]
+    # Separators on their own line so a trailing "-- comment" cannot swallow them
+    batch_sql = "SET NOCOUNT ON\n;\n" + "\n;\n".join(sql.strip().rstrip(';') for sql, _ in statements)
+    batch_params = []
+    for _, params in statements:
+        batch_params.extend(convert_params(params) or [])
+    return statements, batch_sql, batch_params
+
+def run_batch(queries, cache=False, tags=None, timeout=None, session_id=None, source=None):
+    """execute_batch without Streamlit output: errors are raised, not shown"""
+    statements, batch_sql, batch_params = _batch_statements(queries)
+    session_id = session_id or current_session_id()
+
+    def load():
+        metrics['cache_hit'] = False
+        conn = acquire_connection()
+        discard = False
+        _set_timeout(conn, timeout)
+        cursor = conn.cursor()
+        try:
+            with track_statement(cursor, session_id):
+                if batch_params:
+                    cursor.execute(batch_sql, batch_params)
+                else:
+                    cursor.execute(batch_sql)
+
+                results = []
+                while True:
+                    if cursor.description is not None:
+                        results.append(_frame_from_cursor(cursor))
+                    if not cursor.nextset():
+                        break
+        except Exception as e:
+            discard = is_disconnect_error(e)
+            raise
+        finally:
+            cursor.close()
+            release_connection(conn, discard=discard)
+
+        if len(results) != len(statements):
+            raise ValueError(f"Batch trả về {len(results)} result set, cần {len(statements)}")
+        return results
+
+    if cache:
+        cache_tags = set(tags) if tags else set().union(*(query_tables(sql) for sql, _ in statements))
+    else:
+        cache_tags = None
+    with instrumented('batch', batch_sql, source, session_id) as metrics:
+        results = _cached(cache, batch_sql, batch_params, cache_tags, load)
+        metrics['rows'], metrics['bytes'] = _result_size(results)
+    return results
+
+def execute_batch(queries, cache=False, tags=None, timeout=None):
+    """Execute several SELECTs in one round trip and return one DataFrame each
+
+    queries is a list of SQL strings or (sql, params) pairs; the statements
+    are sent as a single batch and the result sets read with cursor.nextset().
+    With cache=True the whole batch is one cache entry; tags overrides the
+    tables detected in the statements.
+    """
+    try:
+        return run_batch(queries, cache=cache, tags=tags, timeout=timeout)
+    except Exception as e:
+        _report_query_error(e)
+    return [pd.DataFrame() for _ in queries]
+
+def _invalidate_after(proc_query, params=None, extra_tags=None):
+    # Invalidate even on failure: the procedure may have written before raising
+    proc = procedure_name(proc_query)
+    written = PROCEDURE_TABLES.get(proc)
+
+    if written is None:
+        _query_cache.clear()
+        return
+
+    tags = list(extra_tags or [])
+    scope = PROCEDURE_SCOPES.get(proc)
+    if scope:
+        value = procedure_args(proc_query, params).get(f"p_{scope[1]}")
+        if value is not None:
+            tags.append(scoped_tag(*scope, value))
+
+    # A scoped tag replaces the whole-table tag of the table it belongs to
+    scoped = {base_table(tag) for tag in tags if base_table(tag) != tag}
+    _query_cache.invalidate([t for t in written if t not in scoped] + tags)
+
+# =============================================================================
+# CONCURRENT QUERIES
+# =============================================================================
+EXECUTOR_CONFIG = {
+    'max_workers': 8          # threads shared by all sessions; keep below POOL_CONFIG['max_size']
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor():
+    """Process-wide bounded thread pool for independent page queries"""
+    global _executor
+
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=EXECUTOR_CONFIG['max_workers'],
+                    thread_name_prefix="lms-query"
+                )
+    return _executor
+
+def submit_query(query, params=None, cache=False, tags=None, timeout=None):
+    """Start execute_query in the background and return a future for gather()"""
+    # Worker threads have no script context: capture the session and caller here
+    future = get_executor().submit(
+        run_query, query, params, cache, tags, timeout, current_session_id(), _calling_module()
+    )
+    future.empty_result = pd.DataFrame()
+    return future
+
+def submit_batch(queries, cache=False, tags=None, timeout=None):
+    """Start execute_batch in the background and return a future for gather()"""
+    future = get_executor().submit(
+        run_batch, queries, cache, tags, timeout, current_session_id(), _calling_module()
+    )
+    future.empty_result = [pd.DataFrame() for _ in queries]
+    return future
+
+def gather(*futures, timeout=None):
+    """Wait for submitted queries and return their results in order
+
+    Failures are reported with st.error on the calling (script) thread and
+    replaced by empty DataFrames, like execute_query does.
+    """
+    results = []
+    for future in futures:
+        try:
+            results.append(future.result(timeout=timeout))
+        except Exception as e:
+            _report_query_error(e)
+            results.append(future.empty_result)
+    return results
+
+# =============================================================================
+# USER AUTHENTICATION
+# =============================================================================
+def authenticate_user(user_id, role):
+    """Authenticate user by ID and role"""
+    if role == "Student":
+        query = """
+            SELECT s.UserID, u.FName, u.LName, u. Email_Address
+            FROM Students s
+            JOIN Users u ON s.UserID = u.UserID
+            WHERE s. UserID = ?
         """
     elif role == "Professor":
         query = """
@@ -175,36 +1482,39 @@ def get_student_stats(student_id, semester_id=None):
     """Get statistics for a student"""
     
     # ✅ Nếu không truyền semester_id, đếm tất cả
-    semester_filter = f"AND A.SemesterID = {semester_id}" if semester_id else ""
-    
-    # Enrolled courses (Approved)
-    enrolled = execute_query(f"""
-        SELECT COUNT(*) as cnt
-        FROM Activities A
-        WHERE A.StudentID = ?  
-        AND A.ActivityType = 'Enrollment'
-        AND A.RequestStatus = 'Approved'
-        {semester_filter}
-    """, [student_id])
+    semester_filter = "AND A.SemesterID = ?" if semester_id else ""
+    semester_params = [semester_id] if semester_id else []
     
-    # Total credits (Approved only)
-    total_credits = execute_query(f"""
-        SELECT ISNULL(SUM(C.Credit), 0) as total
-        FROM Activities A
-        JOIN Courses C ON A.CourseID = C.CourseID
-        WHERE A.StudentID = ?   
-        AND A.ActivityType = 'Enrollment'
-        AND A.RequestStatus = 'Approved'
-        {semester_filter}
-    """, [student_id])
-    
-    # Pending activities (all types)
-    pending = execute_query("""
-        SELECT COUNT(*) as cnt
-        FROM Activities
-        WHERE StudentID = ?   
-        AND RequestStatus = 'Pending'
-    """, [student_id])
+    enrolled, total_credits, pending = execute_batch([
+        # Enrolled courses (Approved)
+        (f"""
+            SELECT COUNT(*) as cnt
+            FROM Activities A
+            WHERE A.StudentID = ?
+            AND A.ActivityType = 'Enrollment'
+            AND A.RequestStatus = 'Approved'
+            {semester_filter}
+        """, [student_id] + semester_params),
+        
+        # Total credits (Approved only)
+        (f"""
+            SELECT ISNULL(SUM(C.Credit), 0) as total
+            FROM Activities A
+            JOIN Courses C ON A.CourseID = C.CourseID
+            WHERE A.StudentID = ?
+            AND A.ActivityType = 'Enrollment'
+            AND A.RequestStatus = 'Approved'
+            {semester_filter}
+        """, [student_id] + semester_params),
+        
+        # Pending activities (all types)
+        ("""
+            SELECT COUNT(*) as cnt
+            FROM Activities
+            WHERE StudentID = ?
+            AND RequestStatus = 'Pending'
+        """, [student_id])
+    ])
     
     return {
         'enrolled': enrolled. iloc[0]['cnt'] if not enrolled.empty else 0,
@@ -212,10 +1522,1259 @@ def get_student_stats(student_id, semester_id=None):
         'pending': pending. iloc[0]['cnt'] if not pending.empty else 0
     }
 
+def get_student_snapshot(student_id):
+    """Everything the Student dashboard reads, memoized for the session
+
+    Returns {'semesters', 'pending', 'recent'}: the semester catalog
+    (newest first) with the student's enrollment count, approved courses
+    and approved credits per semester, the number of pending requests of
+    any type, and the 10 most recent activities. One round trip when it
+    has to be loaded; kept in st.session_state until that student submits
+    a request or has one approved/rejected, not when other students do.
+    """
+    tags = ['Semesters', 'Courses', scoped_tag('Activities', 'StudentID', student_id)]
+
+    def load():
+        counts, pending, recent = run_batch([
+            # Số môn đăng ký, môn đã duyệt, tín chỉ đã duyệt theo học kỳ
+            ("""
+                SELECT
+                    A.SemesterID,
+                    COUNT(*) as ActivityCount,
+                    COUNT(CASE WHEN A.RequestStatus = 'Approved' THEN 1 END) as Enrolled,
+                    ISNULL(SUM(CASE WHEN A.RequestStatus = 'Approved' THEN C.Credit END), 0) as Credits
+                FROM Activities A
+                JOIN Courses C ON A.CourseID = C.CourseID
+                WHERE A.StudentID = ?
+                AND A.ActivityType = 'Enrollment'
+                GROUP BY A.SemesterID
+            """, [student_id]),
+
+            # Yêu cầu chờ duyệt (mọi loại)
+            ("""
+                SELECT COUNT(*) as cnt
+                FROM Activities
+                WHERE StudentID = ?
+                AND RequestStatus = 'Pending'
+            """, [student_id]),
+
+            # Hoạt động gần đây
+            ("""
+                SELECT TOP 10
+                    A.ActivityID,
+                    A.ActivityType,
+                    C.Course_Code,
+                    C.Title as CourseTitle,
+                    A.Credit,
+                    CONVERT(VARCHAR, A.Submission_Date, 23) as SubmitDate,
+                    S.Semester_Name,
+                    A.RequestStatus
+                FROM Activities A
+                JOIN Courses C ON A.CourseID = C.CourseID
+                JOIN Semesters S ON A.SemesterID = S.SemesterID
+                WHERE A.StudentID = ?
+                ORDER BY A.Submission_Date DESC
+            """, [student_id])
+        ], cache=True, tags=tags)
+
+        return {
+            'semesters': semester_catalog(counts, ['ActivityCount', 'Enrolled', 'Credits']),
+            'pending': pending.iloc[0]['cnt'] if not pending.empty else 0,
+            'recent': recent
+        }
+
+    try:
+        return memoized(st.session_state, f"_student_snapshot_{student_id}", tags, load)
+    except Exception as e:
+        _report_query_error(e)
+    return {'semesters': pd.DataFrame(), 'pending': 0, 'recent': pd.DataFrame()}
+
+def get_student_profile(student_id, semester_id):
+    """Everything the professor's student panel shows, in one round trip
+
+    Returns {'total_credits', 'enrolled', 'pending', 'courses', 'current',
+    'status', 'programs', 'activities'}: GetTotalCredits and the approved
+    enrollment count for semester_id, pending requests of any type, the
+    student's enrollments in every semester and in semester_id, their
+    status distribution, degree programs, and counts per (ActivityType,
+    RequestStatus). Cached per (student, semester) until that student's
+    activities or programs change.
+    """
+    tags = [
+        'Courses', 'Semesters', 'Student_Program', 'Degree_Programs',
+        scoped_tag('Activities', 'StudentID', student_id)
+    ]
+
+    try:
+        total, courses, programs, activities = run_batch([
+            ("SELECT dbo.GetTotalCredits(?, ?) as Total", [student_id, semester_id]),
+
+            # Mọi yêu cầu đăng ký, mọi học kỳ (học kỳ đang chọn và phân bố trạng thái tính từ đây)
+            ("""
+                SELECT
+                    A.SemesterID,
+                    C.Course_Code,
+                    C.Title,
+                    C.Credit,
+                    S.Semester_Name,
+                    A.RequestStatus,
+                    A.Submission_Date,
+                    CONVERT(VARCHAR, A.Submission_Date, 23) as EnrollDate
+                FROM Activities A
+                JOIN Courses C ON A.CourseID = C.CourseID
+                JOIN Semesters S ON A.SemesterID = S.SemesterID
+                WHERE A.StudentID = ? AND A.ActivityType = 'Enrollment'
+                ORDER BY S.Start_Date DESC, C.Course_Code
+            """, [student_id]),
+
+            ("""
+                SELECT
+                    DP.Name as ProgramName,
+                    DP.Code as ProgramCode,
+                    CONVERT(VARCHAR, SP.Enrollment_Date, 23) as EnrollmentDate
+                FROM Student_Program SP
+                JOIN Degree_Programs DP ON SP.ProgramID = DP.ProgramID
+                WHERE SP.StudentID = ?
+            """, [student_id]),
+
+            ("""
+                SELECT
+                    ActivityType,
+                    RequestStatus,
+                    COUNT(*) as Count
+                FROM Activities
+                WHERE StudentID = ?
+                GROUP BY ActivityType, RequestStatus
+                ORDER BY ActivityType, RequestStatus
+            """, [student_id])
+        ], cache=True, tags=tags)
+    except Exception as e:
+        _report_query_error(e)
+        return None
+
+    current = courses[courses['SemesterID'] == semester_id].sort_values('Submission_Date', ascending=False, kind='stable')
+    return {
+        'total_credits': total.iloc[0]['Total'] if not total.empty else 0,
+        'enrolled': int((current['RequestStatus'] == 'Approved').sum()),
+        'pending': int(activities.loc[activities['RequestStatus'] == 'Pending', 'Count'].sum()),
+        'courses': courses[['Course_Code', 'Title', 'Credit', 'Semester_Name', 'RequestStatus', 'EnrollDate']],
+        'current': current[['Course_Code', 'Title', 'Credit', 'RequestStatus', 'EnrollDate']],
+        'status': courses.groupby('RequestStatus').size().rename('Count').reset_index(),
+        'programs': programs,
+        'activities': activities
+    }
+
+def get_professor_semesters(professor_id):
+    """Semester catalog with the professor's course and student counts
+
+    Newest first; CourseCount/StudentCount are 0 for semesters without
+    teaching assignments. The assignments are memoized in st.session_state
+    until they change; student counts come from the section summary.
+    """
+    tags = ['Semesters', scoped_tag('Professor_Course', 'ProfessorID', professor_id)]
+
+    def load():
+        assignments = run_query("""
+            SELECT SemesterID, CourseID
+            FROM Professor_Course
+            WHERE ProfessorID = ?
+        """, [professor_id], cache=True, tags=tags)
+        counts = assignments.groupby('SemesterID').size().rename('CourseCount').reset_index()
+        return semester_catalog(counts, ['CourseCount']), assignments
+
+    try:
+        catalog, assignments = memoized(st.session_state, f"_professor_semesters_{professor_id}", tags, load)
+        sections = {
+            semester_id: list(zip(group['CourseID'], group['SemesterID']))
+            for semester_id, group in assignments.groupby('SemesterID')
+        }
+        catalog = catalog.copy()
+        catalog['StudentCount'] = [
+            count_section_students(sections[semester_id], 'Approved') if semester_id in sections else 0
+            for semester_id in catalog['SemesterID']
+        ]
+        return catalog
+    except Exception as e:
+        _report_query_error(e)
+    return pd.DataFrame()
+
+# =============================================================================
+# SEMESTER CATALOG
+# =============================================================================
+def get_semesters():
+    """All semesters, newest first; one cached copy shared by every session"""
+    return run_query("""
+        SELECT SemesterID, Semester_Name, Start_Date, End_Date
+        FROM Semesters
+        ORDER BY Start_Date DESC
+    """, cache=True)
+
+def semester_catalog(counts, columns):
+    """Every semester joined with per-semester counts (missing counts become 0)"""
+    catalog = get_semesters().merge(counts, on='SemesterID', how='left')
+    for column in columns:
+        catalog[column] = catalog[column].fillna(0).astype(int)
+    return catalog
+
 def get_current_semester():
     """Get current active semester"""
-    result = execute_query("SELECT TOP 1 SemesterID, Semester_Name FROM Semesters ORDER BY Start_Date DESC")
+    result = execute_query(
+        "SELECT TOP 1 SemesterID, Semester_Name FROM Semesters ORDER BY Start_Date DESC",
+        cache=True
+    )
     if not result.empty:
         return result.iloc[0]['SemesterID'], result.iloc[0]['Semester_Name']
 
     return None, None
+
+# =============================================================================
+# SECTION SUMMARY
+# =============================================================================
+SUMMARY_CONFIG = {
+    'reconcile_interval': 300     # seconds between full rebuilds that correct drift
+}
+
+# (ActivityType, RequestStatus) -> summary column
+SUMMARY_COLUMNS = {
+    ('Enrollment', 'Approved'): 'Approved',
+    ('Enrollment', 'Pending'): 'Pending',
+    ('Enrollment', 'Rejected'): 'Rejected',
+    ('Withdrawal', 'Approved'): 'Withdrawn',
+}
+
+class _SummaryState:
+    """Requests and the distinct-student tallies derived from them
+
+    Every tally maps a scope key to {column: Counter(student -> requests)},
+    where column is a SUMMARY_COLUMNS value or None for "any request". The
+    same tallies are kept per section, per course, per semester and in
+    total, so each read touches only the scopes it asks about.
+    """
+
+    def __init__(self):
+        self.requests = {}        # (course, semester) -> {(student, type): status}
+        self.sections = {}        # (course, semester) -> {column: Counter}
+        self.courses = {}         # course -> {column: Counter}
+        self.semesters = {}       # semester -> {column: Counter}
+        self.total = {}           # None -> {column: Counter}
+        self.semester_courses = {}  # semester -> {course, ...} with at least one request
+
+    def apply(self, change):
+        student_id, course_id, semester_id, activity_type, status = change
+        key = (course_id, semester_id)
+        section = self.requests.get(key, {})
+        old = section.get((student_id, activity_type))
+        if old == status:
+            return
+
+        if old is not None:
+            self._tally(student_id, course_id, semester_id, SUMMARY_COLUMNS.get((activity_type, old)), -1)
+        if status is None:
+            section.pop((student_id, activity_type), None)
+        else:
+            section[(student_id, activity_type)] = status
+            self._tally(student_id, course_id, semester_id, SUMMARY_COLUMNS.get((activity_type, status)), 1)
+
+        if section and key not in self.requests:
+            self.requests[key] = section
+            self.semester_courses.setdefault(semester_id, set()).add(course_id)
+        elif not section and key in self.requests:
+            del self.requests[key]
+            self.semester_courses[semester_id].discard(course_id)
+            if not self.semester_courses[semester_id]:
+                del self.semester_courses[semester_id]
+
+    def _tally(self, student_id, course_id, semester_id, column, delta):
+        scopes = (
+            (self.sections, (course_id, semester_id)),
+            (self.courses, course_id),
+            (self.semesters, semester_id),
+            (self.total, None),
+        )
+        for tally, key in scopes:
+            columns = tally.setdefault(key, {})
+            for name in (None, column) if column else (None,):
+                students = columns.setdefault(name, Counter())
+                students[student_id] += delta
+                if students[student_id] <= 0:
+                    del students[student_id]
+                if not students:
+                    del columns[name]
+            if not columns:
+                del tally[key]
+
+    def students(self, tally, key, column):
+        """Students counted under column (None: any request) for one scope"""
+        return tally.get(key, {}).get(column, ())
+
+    def section_counts(self, key):
+        return {column: len(self.students(self.sections, key, column)) for column in SUMMARY_COLUMNS.values()}
+
+    def snapshot(self):
+        """{(course, semester): {column: count}} of every section with a counted request"""
+        snapshot = {}
+        for key in self.sections:
+            counts = self.section_counts(key)
+            if any(counts.values()):
+                snapshot[key] = counts
+        return snapshot
+
+
+class SectionSummary:
+    """Request counts per section (course, semester), maintained in memory
+
+    Replaces the correlated COUNT(DISTINCT StudentID) subqueries that the
+    professor and staff lists ran for every Professor_Course row. Each
+    section keeps the status of every (student, activity type) request;
+    distinct-student tallies per section, course and semester are updated
+    with it, so reads never walk the requests. It is loaded once, updated
+    through record_activity when the app inserts a request or changes its
+    status, and rebuilt by a background thread to pick up writes made
+    elsewhere (other processes, DeleteCourse, ...).
+    """
+
+    def __init__(self, load, reconcile_interval=300):
+        self._load = load                 # -> iterable of (StudentID, CourseID, SemesterID, ActivityType, RequestStatus)
+        self.reconcile_interval = reconcile_interval
+
+        self._state = None                # _SummaryState, None until the first load
+        self._changes = None              # changes recorded while a (re)load is running
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._thread = None
+        self._logger = logging.getLogger("lms.summary")
+
+    # -------------------------------------------------------------------------
+    # Reads
+    # -------------------------------------------------------------------------
+    def sections(self, keys=None, semester_id=None):
+        """{(course, semester): {column: count}} for the given sections
+
+        keys=None returns every section with a counted request, or only
+        that semester's when semester_id is given.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            state = self._state
+            if keys is None:
+                if semester_id is None:
+                    return state.snapshot()
+                keys = [(course_id, semester_id) for course_id in state.semester_courses.get(semester_id, ())]
+                return {
+                    key: counts for key, counts in ((key, state.section_counts(key)) for key in keys)
+                    if any(counts.values())
+                }
+            return {
+                (int(course_id), int(semester_id)): state.section_counts((int(course_id), int(semester_id)))
+                for course_id, semester_id in keys
+            }
+
+    def students(self, keys=None, column=None, semester_id=None):
+        """Distinct students over the given sections
+
+        column restricts to one summary column (e.g. 'Approved'); None counts
+        every student with any request. keys=None counts the whole semester
+        (semester_id) or every semester; with keys, semester_id keeps only
+        that semester's sections.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            state = self._state
+            if keys is None:
+                if semester_id is None:
+                    return len(state.students(state.total, None, column))
+                return len(state.students(state.semesters, int(semester_id), column))
+
+            keys = {(int(c), int(s)) for c, s in keys if semester_id is None or int(s) == semester_id}
+            if len(keys) == 1:
+                return len(state.students(state.sections, keys.pop(), column))
+            found = set()
+            for key in keys:
+                found.update(state.students(state.sections, key, column))
+            return len(found)
+
+    def counts(self, course_ids=None, semester_id=None):
+        """{course_id: approved students} for the given courses
+
+        course_ids=None returns every course with approved students.
+        semester_id=None counts distinct students over every semester, like
+        GetStudentCountByCourse.
+        """
+        self._ensure_loaded()
+        with self._lock:
+            state = self._state
+            if course_ids is None:
+                course_ids = state.courses if semester_id is None else state.semester_courses.get(semester_id, ())
+                counts = self._approved(state, course_ids, semester_id)
+                return {course_id: count for course_id, count in counts.items() if count}
+            return self._approved(state, {int(c) for c in course_ids}, semester_id)
+
+    @staticmethod
+    def _approved(state, course_ids, semester_id):
+        if semester_id is None:
+            return {c: len(state.students(state.courses, c, 'Approved')) for c in course_ids}
+        return {c: len(state.students(state.sections, (c, semester_id), 'Approved')) for c in course_ids}
+
+    # -------------------------------------------------------------------------
+    # Updates
+    # -------------------------------------------------------------------------
+    def record(self, student_id, course_id, semester_id, activity_type, status):
+        """Apply one inserted request or status change (status=None: deleted)
+
+        A change recorded while a load is running is queued and replayed on
+        the loaded state, since the load may have read the row before it.
+        """
+        change = (int(student_id), int(course_id), int(semester_id), activity_type, status)
+        with self._lock:
+            if self._state is not None:
+                self._state.apply(change)
+            if self._changes is not None:
+                self._changes.append(change)
+
+    def reconcile(self):
+        """Rebuild from the database; returns how many sections drifted"""
+        with self._reload_lock:
+            with self._lock:
+                self._changes = []
+            try:
+                state = self._build()
+            except Exception:
+                with self._lock:
+                    self._changes = None
+                raise
+
+            with self._lock:
+                # Changes made during the rebuild may be missing from it
+                for change in self._changes:
+                    state.apply(change)
+                self._changes = None
+
+                first_load = self._state is None
+                old = {} if first_load else self._state.snapshot()
+                new = state.snapshot()
+                drift = sum(1 for key in old.keys() | new.keys() if old.get(key) != new.get(key))
+                self._state = state
+
+        if drift and not first_load:
+            self._logger.warning("section summary drifted on %d (course, semester) pairs", drift)
+        return 0 if first_load else drift
+
+    def check(self):
+        """Compare with a fresh count without replacing anything
+
+        Returns [(course, semester, column, summary, live)] for every count
+        that differs; empty when the summary is consistent.
+        """
+        self._ensure_loaded()
+        live = self._build().snapshot()
+        with self._lock:
+            current = self._state.snapshot()
+
+        mismatches = []
+        for key in sorted(current.keys() | live.keys()):
+            for column in SUMMARY_COLUMNS.values():
+                have, want = current.get(key, {}).get(column, 0), live.get(key, {}).get(column, 0)
+                if have != want:
+                    mismatches.append((key[0], key[1], column, have, want))
+        return mismatches
+
+    # -------------------------------------------------------------------------
+    # Internals
+    # -------------------------------------------------------------------------
+    def _build(self):
+        state = _SummaryState()
+        for student_id, course_id, semester_id, activity_type, status in self._load():
+            state.apply((int(student_id), int(course_id), int(semester_id), activity_type, status))
+        return state
+
+    def _ensure_loaded(self):
+        if self._state is None:
+            self.reconcile()
+
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="lms-summary-reconcile", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.reconcile_interval)
+            try:
+                self.reconcile()
+            except Exception as e:
+                self._logger.warning("section summary reconciliation failed: %s", e)
+
+
+def _load_section_requests():
+    result = run_query("""
+        SELECT StudentID, CourseID, SemesterID, ActivityType, RequestStatus
+        FROM Activities
+    """)
+    return result.itertuples(index=False, name=None)
+
+_section_summary = SectionSummary(
+    _load_section_requests,
+    reconcile_interval=SUMMARY_CONFIG['reconcile_interval']
+)
+
+def record_activity(student_id, course_id, semester_id, activity_type, status='Pending'):
+    """Keep the section summary in step with a request the app just wrote
+
+    Call after InsertActivity (status='Pending') or a status change;
+    reconciliation corrects anything missed.
+    """
+    _section_summary.record(student_id, course_id, semester_id, activity_type, status)
+
+def get_section_summary(sections=None, semester_id=None):
+    """Approved/Pending/Rejected enrollments and Withdrawn per section
+
+    sections is an iterable of (CourseID, SemesterID); None returns every
+    section with at least one counted request (in semester_id, if given).
+    """
+    summary = _section_summary.sections(sections, semester_id)
+    return pd.DataFrame(
+        [(course_id, semester_id, *columns.values()) for (course_id, semester_id), columns in summary.items()],
+        columns=['CourseID', 'SemesterID', *SUMMARY_COLUMNS.values()]
+    )
+
+def add_section_summary(sections, semester_id=None):
+    """Return sections (a DataFrame with CourseID, and SemesterID unless
+    semester_id is given) plus the summary columns"""
+    sections = sections.copy()
+    columns = list(SUMMARY_COLUMNS.values())
+    try:
+        semesters = [semester_id] * len(sections) if semester_id is not None else sections['SemesterID']
+        keys = list(zip(sections['CourseID'].astype(int), pd.Series(semesters).astype(int)))
+        summary = _section_summary.sections(keys)
+        for column in columns:
+            sections[column] = [summary[key][column] for key in keys]
+    except Exception as e:
+        _report_query_error(e)
+        for column in columns:
+            sections[column] = 0
+    return sections
+
+def count_section_students(sections=None, column=None, semester_id=None):
+    """Distinct students over several sections (see SectionSummary.students)
+
+    count_section_students(semester_id=...) is every student with a request
+    of any type in the semester, whether or not the course has a professor.
+    """
+    try:
+        return _section_summary.students(sections, column, semester_id)
+    except Exception as e:
+        _report_query_error(e)
+    return 0
+
+def rebuild_section_summary():
+    """Recount every section from Activities; returns how many had drifted"""
+    return _section_summary.reconcile()
+
+def check_section_summary():
+    """Sections whose maintained counts differ from a live recount"""
+    return pd.DataFrame(
+        _section_summary.check(),
+        columns=['CourseID', 'SemesterID', 'Column', 'Summary', 'Live']
+    )
+
+def get_enrollment_counts(course_ids=None, semester_id=None):
+    """Approved students per course, {course_id: count}, without a query per row"""
+    return _section_summary.counts(course_ids, semester_id)
+
+def add_enrollment_counts(courses, semester_id=None, column='StudentCount'):
+    """Return courses (a DataFrame with CourseID) plus a student count column"""
+    courses = courses.copy()
+    try:
+        counts = get_enrollment_counts(courses['CourseID'].tolist(), semester_id)
+        courses[column] = courses['CourseID'].map(lambda course_id: counts.get(int(course_id), 0))
+    except Exception as e:
+        _report_query_error(e)
+        courses[column] = None
+    return courses
+
+# =============================================================================
+# COURSE SEARCH
+# =============================================================================
+# One index per process, rebuilt when Courses or Departments are invalidated
+_course_indexes = {}
+
+def get_course_catalog():
+    """Every course with its department name, ordered by code (cached)"""
+    return run_query("""
+        SELECT 
+            C.CourseID,
+            C.Course_Code,
+            C.Title,
+            C.Credit,
+            C.Passing_Score,
+            D.Name as Department
+        FROM Courses C
+        LEFT JOIN Departments D ON C.DepartmentID = D.DepartmentID
+        ORDER BY C.Course_Code
+    """, cache=True)
+
+def get_course_index():
+    """CourseSearchIndex over get_course_catalog(); shared, do not modify"""
+    return memoized(
+        _course_indexes, 'courses', ['Courses', 'Departments'],
+        lambda: CourseSearchIndex(get_course_catalog())
+    )
+
+def search_courses(query, limit=None):
+    """Top matching courses for a typed query, as catalog rows in rank order"""
+    try:
+        index = get_course_index()
+        return index.rows(index.search(query, limit))
+    except Exception as e:
+        _report_query_error(e)
+        return pd.DataFrame()
+
+# =============================================================================
+# PREREQUISITES
+# =============================================================================
+# One graph per process: updated in place by add/delete_course_prerequisite,
+# reloaded after the CoursePrerequisites cache TTL to pick up other writers
+_prerequisite_graph = None
+_prerequisite_lock = threading.Lock()
+
+def get_prerequisite_graph():
+    """Process-wide PrerequisiteGraph of CoursePrerequisites; do not modify"""
+    global _prerequisite_graph
+    with _prerequisite_lock:
+        entry = _prerequisite_graph
+        if entry is None or time.monotonic() >= entry['expires']:
+            pairs = run_query("SELECT SourceCourseID, TargetCourseID FROM CoursePrerequisites")
+            entry = _prerequisite_graph = {
+                'graph': PrerequisiteGraph(pairs.itertuples(index=False, name=None)),
+                'expires': time.monotonic() + _query_cache.ttl(['CoursePrerequisites'])
+            }
+    return entry['graph']
+
+def refresh_prerequisite_graph():
+    """Reload the graph on next use (e.g. after DeleteCourse)"""
+    global _prerequisite_graph
+    with _prerequisite_lock:
+        _prerequisite_graph = None
+
+def add_course_prerequisite(source_id, target_id):
+    """Insert 'source requires target' unless it exists or would close a cycle"""
+    try:
+        graph = get_prerequisite_graph()
+    except Exception as e:
+        _report_query_error(e)
+        graph = None
+
+    if graph is not None:
+        if graph.has_edge(source_id, target_id):
+            return False, "❌ Prerequisite này đã tồn tại!"
+        if graph.creates_cycle(source_id, target_id):
+            return False, "❌ Không thể thêm: môn tiên quyết này (gián tiếp) đã cần môn nguồn, sẽ tạo vòng lặp!"
+
+    success, msg = execute_procedure(
+        "EXEC InsertCoursePrerequisite @p_SourceCourseID=?, @p_TargetCourseID=?",
+        (source_id, target_id)
+    )
+
+    if success and graph is not None:
+        try:
+            graph.add(source_id, target_id)
+        except PrerequisiteCycleError:
+            # Another process added the reverse edge meanwhile
+            refresh_prerequisite_graph()
+    return success, msg
+
+def delete_course_prerequisite(source_id, target_id):
+    """Delete 'source requires target' and update the graph"""
+    success, msg = execute_procedure(
+        "EXEC DeleteCoursePrerequisite @p_SourceCourseID=?, @p_TargetCourseID=?",
+        (source_id, target_id)
+    )
+
+    if success:
+        with _prerequisite_lock:
+            entry = _prerequisite_graph
+        if entry is not None:
+            entry['graph'].remove(source_id, target_id)
+    return success, msg
+
+# =============================================================================
+# STUDENT REQUESTS
+# =============================================================================
+# Credits a student may hold per semester (also enforced by the procedures)
+CREDIT_LIMITS = {
+    'min': 14,
+    'max': 21
+}
+
+def get_request_statuses(student_id, semester_id, activity_type):
+    """{course_id: RequestStatus} of a student's requests of one type in a semester"""
+    result = run_query("""
+        SELECT CourseID, RequestStatus
+        FROM Activities
+        WHERE StudentID = ? AND SemesterID = ? AND ActivityType = ?
+    """, [student_id, semester_id, activity_type])
+    return {int(row.CourseID): row.RequestStatus for row in result.itertuples(index=False)}
+
+def add_request_statuses(courses, student_id, semester_id, activity_type, column='ExistingStatus'):
+    """Return courses (a DataFrame with CourseID) plus the status of any existing request
+
+    One query for the whole list; courses without a request get ''.
+    """
+    courses = courses.copy()
+    try:
+        statuses = get_request_statuses(student_id, semester_id, activity_type)
+    except Exception as e:
+        _report_query_error(e)
+        statuses = {}
+    courses[column] = [statuses.get(int(course_id), '') for course_id in courses['CourseID']]
+    return courses
+
+def submit_exam_delay(student_id, course_id, semester_id, reason, old_date, new_date):
+    """Create an Exam_Delay activity and its Exam_Delays row atomically
+
+    Both procedures run in one transaction, so a failed InsertExamDelay
+    leaves no orphan activity. InsertActivity returns no id (and
+    SCOPE_IDENTITY() does not reach into a procedure's scope), so the new
+    ActivityID is the one row for this (student, course, semester,
+    Exam_Delay) above the highest id that existed before the insert; any
+    other count rolls the request back rather than guessing. Returns
+    (success, message, activity_id).
+    """
+    key = (student_id, course_id, semester_id)
+    lookup = """
+        SELECT ActivityID FROM Activities
+        WHERE StudentID = ? AND CourseID = ? AND SemesterID = ? AND ActivityType = 'Exam_Delay'
+    """
+
+    def work(transaction):
+        before = transaction.execute(f"""
+            SELECT ISNULL(MAX(ActivityID), 0) as LastID FROM ({lookup}) existing
+        """, key)
+        last_id = int(before.iloc[0]['LastID']) if not before.empty else 0
+
+        results = transaction.execute_all(f"""
+            EXEC InsertActivity @p_StudentID=?, @p_CourseID=?, @p_SubmissionDate=?, @p_SemesterID=?, @p_ActivityType=?;
+            {lookup} AND ActivityID > ?
+        """, (student_id, course_id, datetime.date.today(), semester_id, 'Exam_Delay', *key, last_id))
+        created = results[-1] if results else pd.DataFrame()
+        if len(created) != 1 or 'ActivityID' not in created.columns:
+            raise DatabaseError(
+                'HY000', f"[HY000] Không xác định được ActivityID mới ({len(created)} dòng khớp)"
+            )
+        activity_id = int(created.iloc[0]['ActivityID'])
+
+        transaction.execute(
+            "EXEC InsertExamDelay @p_ActivityID=?, @p_Reason=?, @p_Old_Exam_Date=?, @p_Requested_New_Exam_Date=?",
+            (activity_id, reason, old_date, new_date)
+        )
+        return activity_id
+
+    success, result = execute_transaction(work)
+    if success:
+        record_activity(student_id, course_id, semester_id, 'Exam_Delay')
+        return True, "Success", result
+    return False, result, None
+
+# One rule set per process, rebuilt when CoursePrerequisites is invalidated
+_registration_rules = {}
+
+def get_registration_rules():
+    """RegistrationRules over the prerequisite graph; shared, do not modify"""
+    def load():
+        return RegistrationRules(get_prerequisite_graph().direct_map(), CREDIT_LIMITS['max'])
+
+    return memoized(_registration_rules, 'rules', ['CoursePrerequisites'], load)
+
+def get_registration_state(student_id):
+    """StudentState of a student, kept in the session until their activities change"""
+    def load():
+        activities = run_query("""
+            SELECT A.SemesterID, A.CourseID, A.ActivityType, A.RequestStatus, A.Credit, S.Start_Date
+            FROM Activities A
+            JOIN Semesters S ON A.SemesterID = S.SemesterID
+            WHERE A.StudentID = ?
+        """, [student_id])
+        return StudentState(activities.itertuples(index=False))
+
+    tags = ['Semesters', scoped_tag('Activities', 'StudentID', student_id)]
+    return memoized(st.session_state, f"_registration_state_{student_id}", tags, load)
+
+def check_enrollment(student_id, course_id, credit, semester_id, semester_start, planned_credits=0):
+    """Pre-check an enrollment without calling InsertActivity
+
+    Returns the first Violation (code, message) or None. None is also
+    returned when the cached state cannot be loaded: the procedure decides.
+    """
+    try:
+        state = get_registration_state(student_id)
+        rules = get_registration_rules()
+    except Exception as e:
+        _report_query_error(e)
+        return None
+    return rules.check_enrollment(state, course_id, credit, semester_id, semester_start, planned_credits)
+
+# Credits InsertActivity counts against CREDIT_LIMITS['max'] (params: StudentID, SemesterID);
+# shared by the cart's "Còn lại" and submit_enrollments so both apply the same rule
+REQUESTED_CREDITS_SQL = """
+    (SELECT ISNULL(SUM(A.Credit), 0) FROM Activities A
+     WHERE A.StudentID = ? AND A.SemesterID = ? AND A.ActivityType = 'Enrollment'
+     AND A.RequestStatus IN ('Approved', 'Pending'))
+"""
+
+def get_credit_totals(student_id, semester_id):
+    """A student's credits in a semester: {'total', 'pending', 'requested'}
+
+    total is dbo.GetTotalCredits, pending the credits waiting for approval
+    and requested the approved + pending enrollment credits the limit is
+    checked against (REQUESTED_CREDITS_SQL). One query, cached until the
+    student's activities change.
+    """
+    result = execute_query(f"""
+        SELECT
+            dbo.GetTotalCredits(?, ?) as total,
+            (SELECT ISNULL(SUM(A.Credit), 0) FROM Activities A
+             WHERE A.StudentID = ? AND A.SemesterID = ?
+             AND A.ActivityType = 'Enrollment' AND A.RequestStatus = 'Pending') as pending,
+            {REQUESTED_CREDITS_SQL} as requested
+    """, [student_id, semester_id] * 3,
+        cache=True,
+        tags=['Courses', scoped_tag('Activities', 'StudentID', student_id)]
+    )
+    if result.empty:
+        return {'total': 0, 'pending': 0, 'requested': 0}
+    return {column: int(result.iloc[0][column] or 0) for column in ('total', 'pending', 'requested')}
+
+def submit_enrollments(student_id, semester_id, course_ids):
+    """Register a cart of courses in one transaction
+
+    Duplicates, prerequisites and the credit limit are checked for the whole
+    cart with one query; the accepted courses are then inserted as a single
+    batch of InsertActivity calls. Returns one row per course (CourseID,
+    Course_Code, Credit, Success, Message). If the batch fails, nothing is
+    written and every accepted row carries the error.
+    """
+    course_ids = list(dict.fromkeys(int(course_id) for course_id in course_ids))
+    if not course_ids:
+        return pd.DataFrame(columns=['CourseID', 'Course_Code', 'Credit', 'Success', 'Message'])
+
+    results = {}
+    accepted = []
+
+    def work(transaction):
+        placeholders = ', '.join('?' * len(course_ids))
+        checks = transaction.execute(f"""
+            SELECT
+                C.CourseID,
+                C.Course_Code,
+                C.Credit,
+                (SELECT COUNT(*) FROM Activities A
+                 WHERE A.StudentID = ? AND A.CourseID = C.CourseID AND A.SemesterID = ?
+                 AND A.ActivityType = 'Enrollment') as Existing,
+                (SELECT COUNT(*) FROM CoursePrerequisites CP
+                 WHERE CP.SourceCourseID = C.CourseID
+                 AND NOT EXISTS (
+                     SELECT 1 FROM Activities A
+                     JOIN Semesters S ON A.SemesterID = S.SemesterID
+                     WHERE A.StudentID = ? AND A.CourseID = CP.TargetCourseID
+                     AND A.ActivityType = 'Enrollment' AND A.RequestStatus = 'Approved'
+                     AND S.Start_Date < (SELECT Start_Date FROM Semesters WHERE SemesterID = ?)
+                 )) as MissingPrerequisites,
+                {REQUESTED_CREDITS_SQL} as RequestedCredits
+            FROM Courses C
+            WHERE C.CourseID IN ({placeholders})
+        """, [student_id, semester_id, student_id, semester_id, student_id, semester_id] + course_ids)
+
+        rows = {int(row.CourseID): row for row in checks.itertuples(index=False)}
+        requested = int(checks.iloc[0]['RequestedCredits']) if not checks.empty else 0
+
+        # Cart order decides which courses fit under the credit limit
+        for course_id in course_ids:
+            row = rows.get(course_id)
+            if row is None:
+                results[course_id] = ('', 0, False, "❌ Môn học không tồn tại")
+            elif row.Existing:
+                results[course_id] = (row.Course_Code, row.Credit, False, "⚠️ Đã đăng ký môn này trong học kỳ")
+            elif row.MissingPrerequisites:
+                results[course_id] = (row.Course_Code, row.Credit, False, "❌ Chưa hoàn thành môn tiên quyết")
+            elif requested + row.Credit > CREDIT_LIMITS['max']:
+                results[course_id] = (row.Course_Code, row.Credit, False, f"❌ Vượt quá {CREDIT_LIMITS['max']} tín chỉ")
+            else:
+                requested += row.Credit
+                accepted.append(course_id)
+                results[course_id] = (row.Course_Code, row.Credit, True, "✅ Đã gửi, chờ duyệt")
+
+        if accepted:
+            today = datetime.date.today()
+            transaction.execute(
+                ";\n".join(
+                    "EXEC InsertActivity @p_StudentID=?, @p_CourseID=?, @p_SubmissionDate=?, @p_SemesterID=?, @p_ActivityType=?"
+                    for _ in accepted
+                ),
+                [value for course_id in accepted for value in (student_id, course_id, today, semester_id, 'Enrollment')]
+            )
+
+    success, msg = execute_transaction(work)
+    if not success:
+        for course_id in accepted or course_ids:
+            code, credit = results.get(course_id, ('', 0, None, None))[:2]
+            results[course_id] = (code, credit, False, msg)
+    else:
+        for course_id in accepted:
+            record_activity(student_id, course_id, semester_id, 'Enrollment')
+
+    return pd.DataFrame(
+        [(course_id,) + results[course_id] for course_id in course_ids],
+        columns=['CourseID', 'Course_Code', 'Credit', 'Success', 'Message']
+    )
+
+# =============================================================================
+# ACTIVITY HISTORY
+# =============================================================================
+HISTORY_CONFIG = {
+    'page_size': 50           # activities per "load more" step, all types together
+}
+
+# Columns of each history tab, by ActivityType
+HISTORY_COLUMNS = {
+    'Enrollment': ['ActivityID', 'Course_Code', 'Title', 'RequestStatus', 'Date'],
+    'Withdrawal': ['ActivityID', 'Course_Code', 'Title', 'RequestStatus', 'Date'],
+    'Exam_Delay': ['ActivityID', 'Course_Code', 'Title', 'Reason', 'OldDate', 'NewDate', 'RequestStatus']
+}
+
+def get_history_page(student_id, before=None, limit=None):
+    """One page of a student's activities, newest first (keyset pagination)
+
+    before is the (Submission_Date, ActivityID) of the last row already
+    loaded; the page holds up to limit + 1 strictly older rows, the extra
+    row only telling that more exist. Cached until the student's
+    activities change.
+    """
+    limit = limit or HISTORY_CONFIG['page_size']
+    keyset = ""
+    params = [limit + 1, student_id]
+    if before is not None:
+        keyset = "AND (A.Submission_Date < ? OR (A.Submission_Date = ? AND A.ActivityID < ?))"
+        params += [before[0], before[0], before[1]]
+
+    return run_query(f"""
+        SELECT TOP (?)
+            A.ActivityID,
+            A.ActivityType,
+            C.Course_Code,
+            C.Title,
+            A.RequestStatus,
+            A.Submission_Date,
+            CONVERT(VARCHAR, A.Submission_Date, 23) as Date,
+            ED.Reason,
+            CONVERT(VARCHAR, ED.Old_Exam_Date, 23) as OldDate,
+            CONVERT(VARCHAR, ED.Requested_New_Exam_Date, 23) as NewDate
+        FROM Activities A
+        JOIN Courses C ON A.CourseID = C.CourseID
+        LEFT JOIN Exam_Delays ED ON A.ActivityID = ED.ActivityID
+        WHERE A.StudentID = ?
+        {keyset}
+        ORDER BY A.Submission_Date DESC, A.ActivityID DESC
+    """, params, cache=True, tags=['Courses', 'Exam_Delays', scoped_tag('Activities', 'StudentID', student_id)])
+
+def get_activity_history(student_id, pages=1):
+    """The newest pages of a student's history, split by activity type
+
+    Returns ({ActivityType: DataFrame with HISTORY_COLUMNS}, has_more).
+    Earlier pages come from the query cache, so "load more" costs one
+    query for the new page only.
+    """
+    limit = HISTORY_CONFIG['page_size']
+    frames = []
+    before = None
+    has_more = False
+
+    try:
+        for _ in range(pages):
+            page = get_history_page(student_id, before, limit)
+            has_more = len(page) > limit
+            page = page.iloc[:limit]
+            frames.append(page)
+            if not has_more:
+                break
+
+            last = page.iloc[-1]
+            submitted = last['Submission_Date']
+            if isinstance(submitted, pd.Timestamp):
+                submitted = submitted.to_pydatetime()
+            before = (submitted, int(last['ActivityID']))
+    except Exception as e:
+        _report_query_error(e)
+
+    history = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    tabs = {}
+    for activity_type, columns in HISTORY_COLUMNS.items():
+        if history.empty:
+            tabs[activity_type] = pd.DataFrame(columns=columns)
+        else:
+            tabs[activity_type] = history.loc[history['ActivityType'] == activity_type, columns].reset_index(drop=True)
+    return tabs, has_more
+
+# =============================================================================
+# PEOPLE DIRECTORY
+# =============================================================================
+DIRECTORY_CONFIG = {
+    'page_size': 25           # people per screen in every roster view
+}
+
+# Role table (aliased R) joined to Users (aliased U), plus the role's own columns
+DIRECTORY_ROLES = {
+    'Student': {
+        'table': 'Students',
+        'columns': ["CONVERT(VARCHAR, R.Birthday, 23) as Birthday"],
+        'joins': ""
+    },
+    'Professor': {
+        'table': 'Professors',
+        'columns': ["D.Name as Department", "R.Office_Location"],
+        'joins': "LEFT JOIN Departments D ON R.DepartmentID = D.DepartmentID"
+    },
+    'Staff': {
+        'table': 'Staff',
+        'columns': ["R.Role"],
+        'joins': ""
+    }
+}
+
+# Sort keys of each directory order; the last one is unique, so together they form the keyset cursor
+DIRECTORY_SORTS = {
+    'id': ['R.UserID'],
+    'name': ['U.LName', 'U.FName', 'R.UserID'],
+}
+
+def _like_escape(text):
+    """Escape LIKE wildcards in text (ESCAPE '!')"""
+    for special in ('!', '%', '_', '['):
+        text = text.replace(special, '!' + special)
+    return text
+
+def _directory_filter(search, where=None, params=()):
+    """WHERE clause and parameters for a directory search
+
+    A number matches the UserID; anything else matches an email prefix, or
+    names where every word starts a word of FName or LName ("mai ng"
+    finds "Nguyễn Thị Mai"). where/params add a page filter over R and U.
+    """
+    conditions = [f"({where})"] if where else []
+    params = list(params)
+    search = (search or '').strip()
+
+    if search.isdigit():
+        conditions.append("U.UserID = ?")
+        params.append(int(search))
+    elif search:
+        names = []
+        params.append(_like_escape(search) + '%')
+        for word in search.split():
+            word = _like_escape(word)
+            names.append(
+                "(U.FName LIKE ? ESCAPE '!' OR U.FName LIKE ? ESCAPE '!'"
+                " OR U.LName LIKE ? ESCAPE '!' OR U.LName LIKE ? ESCAPE '!')"
+            )
+            params += [word + '%', '% ' + word + '%'] * 2
+        conditions.append(f"(U.Email_Address LIKE ? ESCAPE '!' OR ({' AND '.join(names)}))")
+
+    return " AND ".join(conditions), params
+
+def _keyset_filter(keys, after, descending):
+    """WHERE condition for the rows that follow the cursor after in ORDER BY keys
+
+    Spelled out as (a > ? OR (a = ? AND (b > ? ...))) since SQL Server has
+    no row-value comparison.
+    """
+    op = '<' if descending else '>'
+    condition, params = None, []
+    for key, value in reversed(list(zip(keys, after))):
+        if condition is None:
+            condition, params = f"{key} {op} ?", [value]
+        else:
+            condition, params = f"({key} {op} ? OR ({key} = ? AND {condition}))", [value, value] + params
+    return condition, params
+
+def get_directory_page(role, search='', after=None, limit=None, descending=False,
+                       where=None, params=(), columns=(), sort='id'):
+    """One screen of people in a role (keyset pagination)
+
+    sort is a DIRECTORY_SORTS key: 'id' orders by UserID, 'name' by
+    (LName, FName, UserID). Returns (page, next_after): pass next_after as
+    after to get the following page; it is None on the last one. Rows hold
+    UserID, FullName, Email_Address, Phone_Number, the role's
+    DIRECTORY_ROLES columns and any extra columns (SQL over R and U).
+    Cached until the tables read change.
+    """
+    spec = DIRECTORY_ROLES[role]
+    keys = DIRECTORY_SORTS[sort]
+    limit = limit or DIRECTORY_CONFIG['page_size']
+    conditions, params = _directory_filter(search, where, params)
+    if after is not None:
+        keyset, keyset_params = _keyset_filter(keys, after, descending)
+        conditions = f"{conditions} AND {keyset}" if conditions else keyset
+        params += keyset_params
+
+    direction = 'DESC' if descending else 'ASC'
+    try:
+        page = run_query(f"""
+            SELECT TOP (?)
+                R.UserID,
+                dbo.GetFullName(R.UserID) as FullName,
+                U.Email_Address,
+                U.Phone_Number,
+                {', '.join([*spec['columns'], *columns])},
+                {', '.join(f"{key} as SortKey{i}" for i, key in enumerate(keys))}
+            FROM {spec['table']} R
+            JOIN Users U ON R.UserID = U.UserID
+            {spec['joins']}
+            {'WHERE ' + conditions if conditions else ''}
+            ORDER BY {', '.join(f"{key} {direction}" for key in keys)}
+        """, [limit + 1] + params, cache=True)
+    except Exception as e:
+        _report_query_error(e)
+        return pd.DataFrame(), None
+
+    sort_columns = [f"SortKey{i}" for i in range(len(keys))]
+    next_after = None
+    if len(page) > limit:
+        page = page.iloc[:limit]
+        next_after = tuple(page.iloc[-1][sort_columns])
+    return page.drop(columns=sort_columns), next_after
+
+def count_directory(role, search='', where=None, params=()):
+    """Exact number of people a directory search matches (one COUNT query)"""
+    spec = DIRECTORY_ROLES[role]
+    conditions, params = _directory_filter(search, where, params)
+    try:
+        result = run_query(f"""
+            SELECT COUNT(*) as cnt
+            FROM {spec['table']} R
+            JOIN Users U ON R.UserID = U.UserID
+            {'WHERE ' + conditions if conditions else ''}
+        """, params, cache=True)
+        return int(result.iloc[0]['cnt']) if not result.empty else 0
+    except Exception as e:
+        _report_query_error(e)
+    return None
+
+# =============================================================================
+# REPORT DISTRIBUTIONS
+# =============================================================================
+DISTRIBUTION_CONFIG = {
+    'bins': 20                # histogram bins sent to the browser
+}
+
+def histogram(values, counts, bins=None):
+    """Bin pre-aggregated (value, count) pairs with NumPy
+
+    Returns a DataFrame with From, To and Count per bin (empty when there
+    are no values), like px.histogram(nbins=bins) would draw.
+    """
+    bins = bins or DISTRIBUTION_CONFIG['bins']
+    values = np.asarray(values, dtype=float)
+    if not len(values):
+        return pd.DataFrame(columns=['From', 'To', 'Count'])
+
+    low, high = values.min(), values.max()
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    totals, edges = np.histogram(values, bins=bins, range=(low, high), weights=np.asarray(counts, dtype=float))
+    return pd.DataFrame({'From': edges[:-1], 'To': edges[1:], 'Count': totals.astype(int)})
+
+def get_semester_distributions(semester_id, bins=None):
+    """Pre-binned distributions for the semester reports
+
+    Returns {'credits', 'course_sizes', 'credit_stats'}: students binned by
+    the TotalCredits of GetStudentsCreditsBySemester (the report the chart
+    stands for), courses binned by approved students, and
+    Students/Mean/Min/Max of the credit totals. The procedure's rows are
+    reduced here and only the bins are kept; cached for the semester until
+    a request in it is approved or rejected (update_activity_status drops
+    'Activities:SemesterID=x').
+    """
+    tags = [scoped_tag('Activities', 'SemesterID', semester_id)]
+
+    try:
+        report, course_sizes = run_batch([
+            # Báo cáo tín chỉ gốc: một dòng mỗi sinh viên
+            ("EXEC GetStudentsCreditsBySemester @p_SemesterID=?", [semester_id]),
+
+            # Số môn theo số sinh viên đã duyệt
+            ("""
+                SELECT T.Students, COUNT(*) as Courses
+                FROM (
+                    SELECT CourseID, COUNT(DISTINCT StudentID) as Students
+                    FROM Activities
+                    WHERE SemesterID = ? AND ActivityType = 'Enrollment' AND RequestStatus = 'Approved'
+                    GROUP BY CourseID
+                ) T
+                GROUP BY T.Students
+            """, [semester_id])
+        ], cache=True, tags=tags)
+    except Exception as e:
+        _report_query_error(e)
+        return None
+
+    credits = report['TotalCredits'].value_counts() if not report.empty else pd.Series(dtype=float)
+    values, counts = credits.index.to_numpy(dtype=float), credits.to_numpy(dtype=float)
+    students = int(counts.sum())
+    return {
+        'credits': histogram(values, counts, bins),
+        'course_sizes': histogram(course_sizes['Students'], course_sizes['Courses'], bins),
+        'credit_stats': {
+            'Students': students,
+            'Mean': float(values @ counts / students) if students else 0.0,
+            'Min': int(values.min()) if students else 0,
+            'Max': int(values.max()) if students else 0
+        }
+    }
+
+def get_semester_status_mix(semester_id, course_ids=None):
+    """Approved/Pending/Rejected enrollments and Withdrawn of a semester
+
+    Summed from the section summary (no query); course_ids restricts it to
+    those courses. Returns a DataFrame with Status and Count.
+    """
+    summary = get_section_summary(semester_id=semester_id) if course_ids is None else get_section_summary(
+        [(course_id, semester_id) for course_id in course_ids]
+    )
+    totals = summary[list(SUMMARY_COLUMNS.values())].sum()
+    return pd.DataFrame({'Status': totals.index, 'Count': totals.to_numpy(dtype=int)})
+
+# =============================================================================
+# REQUEST APPROVAL
+# =============================================================================
+def update_activity_status(activity_id, new_status, staff_id, student_id, course_id, semester_id, activity_type):
+    """Approve or reject a request (UpdateActivityStatus)
+
+    The caller passes the request's student, course, semester and type from
+    the row it shows, so only that student's and that semester's cached
+    pages are invalidated and the section summary is updated without
+    reading the activity back.
+    """
+    success, msg = execute_procedure(
+        "EXEC UpdateActivityStatus @p_ActivityID=?, @p_NewStatus=?, @p_StaffID=?",
+        (activity_id, new_status, staff_id),
+        # Semester reports (get_semester_distributions) read approved activities
+        invalidate=[
+            scoped_tag('Activities', 'StudentID', student_id),
+            scoped_tag('Activities', 'SemesterID', semester_id)
+        ]
+    )
+
+    if success:
+        # Keep the in-memory section summary in step (reconciliation fixes misses)
+        try:
+            record_activity(student_id, course_id, semester_id, activity_type, new_status)
+        except Exception as e:
+            logging.getLogger("lms.summary").warning(
+                "section summary not updated for activity %s: %s", activity_id, e
+            )
+
+    return success, msg
+
+if __name__ == "__main__" and "--install-deps" in sys.argv:
+    ensure_dependencies(force=True)
+    print("✅ Dependencies OK")
\ No newline at end of file
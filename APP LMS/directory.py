@@ -0,0 +1,105 @@
+"""
+People directory widgets shared by the Professor and Staff pages
+
+Every roster view searches on the server (ID, name prefix, email) and
+shows one screen of people at a time, paged by UserID or by name with
+database.get_directory_page; the exact total is counted only on request.
+"""
+
+import streamlit as st
+from database import get_directory_page, count_directory
+
+SEARCH_HELP = "💡 Gõ ID (VD: 11), tên (VD: Mai) hoặc đầu email để tìm nhanh"
+
+# Sort option label -> (DIRECTORY_SORTS key, descending)
+SORT_OPTIONS = {
+    "Mới nhất": ('id', True),
+    "Cũ nhất": ('id', False),
+    "Tên A-Z": ('name', False),
+}
+
+
+def _directory_screen(role, key, where, params, columns, descending, sort='id'):
+    """Search box + the current page; the page stack resets when the search or filter changes"""
+
+    search = st.text_input("🔍 Tìm theo ID, tên hoặc email", key=f"{key}_search", help=SEARCH_HELP)
+
+    signature = (role, search.strip(), where, tuple(params), tuple(columns), descending, sort)
+    cursor = st.session_state.get(f"{key}_cursor")
+    if cursor is None or cursor['signature'] != signature:
+        cursor = st.session_state[f"{key}_cursor"] = {'signature': signature, 'pages': [None]}
+
+    page, next_after = get_directory_page(
+        role, search, cursor['pages'][-1], descending=descending,
+        where=where, params=params, columns=columns, sort=sort
+    )
+    return search, cursor, page, next_after
+
+
+def _render_navigation(key, cursor, next_after, shown):
+    """Nút trang trước / trang sau"""
+
+    col1, col2, col3 = st.columns([1, 2, 1])
+
+    with col1:
+        if st.button("⬅️ Trang trước", key=f"{key}_prev", disabled=len(cursor['pages']) == 1, use_container_width=True):
+            cursor['pages'].pop()
+            st.rerun()
+
+    with col2:
+        st.caption(f"📄 Trang {len(cursor['pages'])} · {shown} người")
+
+    with col3:
+        if st.button("Trang sau ➡️", key=f"{key}_next", disabled=next_after is None, use_container_width=True):
+            cursor['pages'].append(next_after)
+            st.rerun()
+
+
+def render_directory(role, key, where=None, params=(), columns=(), order="Mới nhất", column_config=None):
+    """Bảng một trang người dùng của một vai trò, có tìm kiếm và phân trang
+
+    where/params/columns are SQL over R (the role table) and U (Users),
+    see database.get_directory_page; order is a SORT_OPTIONS label.
+    Returns the page shown.
+    """
+
+    sort, descending = SORT_OPTIONS[order]
+    search, cursor, page, next_after = _directory_screen(role, key, where, params, columns, descending, sort)
+
+    if st.toggle("🔢 Đếm tổng số", key=f"{key}_count"):
+        total = count_directory(role, search, where, params)
+        if total is not None:
+            st.success(f"✅ Tổng số: {total}")
+
+    if page.empty:
+        st.info("📭 Không tìm thấy ai")
+    else:
+        st.dataframe(page, column_config=column_config, use_container_width=True, hide_index=True)
+
+    _render_navigation(key, cursor, next_after, len(page))
+    return page
+
+
+def render_person_picker(role, key, label, where=None, params=(), describe=None):
+    """Chọn một người trong trang kết quả tìm kiếm; returns the row as a dict, or None"""
+
+    _, cursor, page, next_after = _directory_screen(role, key, where, params, (), False)
+
+    if page.empty:
+        st.info("📭 Không tìm thấy ai")
+        return None
+
+    rows = {int(row['UserID']): row for _, row in page.iterrows()}
+    describe = describe or (lambda row: f"ID: {row['UserID']} - {row['FullName']} ({row['Email_Address']})")
+
+    selected = st.selectbox(
+        label,
+        [None] + list(rows),
+        format_func=lambda user_id: "-- Chọn --" if user_id is None else describe(rows[user_id]),
+        key=f"{key}_select"
+    )
+
+    if len(cursor['pages']) > 1 or next_after is not None:
+        _render_navigation(key, cursor, next_after, len(page))
+
+    return rows[selected].to_dict() if selected is not None else None
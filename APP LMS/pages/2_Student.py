@@ -1,6 +1,11 @@
 import streamlit as st
 from datetime import date, timedelta
-from database import execute_query, execute_procedure, get_student_stats, get_current_semester
+from database import (
+    execute_query, execute_procedure, get_student_snapshot, add_enrollment_counts,
+    add_request_statuses, search_courses, submit_exam_delay, submit_enrollments,
+    get_registration_state, check_enrollment, get_activity_history, get_credit_totals,
+    record_activity, begin_rerun, CREDIT_LIMITS
+)
 from styles import get_common_styles
 
 st.set_page_config(page_title="Student Dashboard", page_icon="👨‍🎓", layout="wide")
@@ -12,6 +17,9 @@ if 'logged_in' not in st.session_state or not st.session_state.logged_in or st.s
         st.switch_page("pages/1_Login.py")
     st.stop()
 
+# Huỷ truy vấn còn chạy từ lần rerun trước và bắt đầu ngân sách thời gian
+begin_rerun()
+
 # Apply styles
 st.markdown(get_common_styles(), unsafe_allow_html=True)
 
@@ -34,24 +42,10 @@ with st.sidebar:
         st.session_state. clear()
         st.switch_page("app.py")
 
-# Get current semester
-sem_id, sem_name = get_current_semester()
-
-# ✅ LẤY TẤT CẢ HỌC KỲ + đánh dấu có dữ liệu
-all_semesters_with_data = execute_query("""
-    SELECT 
-        S.SemesterID,
-        S. Semester_Name,
-        S. Start_Date,
-        COUNT(DISTINCT A.ActivityID) as ActivityCount
-    FROM Semesters S
-    LEFT JOIN Activities A 
-        ON S.SemesterID = A.SemesterID 
-        AND A.StudentID = ? 
-        AND A.ActivityType = 'Enrollment'
-    GROUP BY S.SemesterID, S. Semester_Name, S.Start_Date
-    ORDER BY S.Start_Date DESC
-""", [st. session_state.user_id])
+# ✅ MỘT ROUND TRIP: học kỳ + thống kê + hoạt động gần đây
+# (giữ trong session, chỉ tải lại khi hoạt động của sinh viên này thay đổi)
+snapshot = get_student_snapshot(st.session_state.user_id)
+all_semesters_with_data = snapshot['semesters']
 
 if not all_semesters_with_data. empty:
     # ✅ Tạo display với indicator
@@ -74,6 +68,7 @@ if not all_semesters_with_data. empty:
     selected_index = semester_options.index(selected_display)
     sem_id = int(all_semesters_with_data.iloc[selected_index]['SemesterID'])
     sem_name = all_semesters_with_data.iloc[selected_index]['Semester_Name']
+    selected_semester = all_semesters_with_data.iloc[selected_index]
 else:
     st.error("❌ Không có học kỳ nào")
     st.stop()
@@ -91,8 +86,12 @@ if menu == "🏠 Dashboard":
     </div>
     """, unsafe_allow_html=True)
     
-    # Statistics
-    stats = get_student_stats(st.session_state.user_id, sem_id)
+    # Statistics (lấy từ snapshot, không truy vấn thêm)
+    stats = {
+        'enrolled': selected_semester['Enrolled'],
+        'credits': selected_semester['Credits'],
+        'pending': snapshot['pending']
+    }
     
     col1, col2, col3 = st.columns(3)
     
@@ -123,22 +122,7 @@ if menu == "🏠 Dashboard":
     # Recent activities
     st.markdown("## 📋 Hoạt động gần đây")
     
-    activities = execute_query("""
-        SELECT TOP 10
-            A.ActivityID,
-            A.ActivityType,
-            C.Course_Code,
-            C.Title as CourseTitle,
-            A.Credit,
-            CONVERT(VARCHAR, A. Submission_Date, 23) as SubmitDate,
-            S. Semester_Name,
-            A.RequestStatus
-        FROM Activities A
-        JOIN Courses C ON A.CourseID = C.CourseID
-        JOIN Semesters S ON A.SemesterID = S. SemesterID
-        WHERE A.StudentID = ? 
-        ORDER BY A.Submission_Date DESC
-    """, [st.session_state.user_id])
+    activities = snapshot['recent']
     
     if not activities.empty:
         st.dataframe(activities, use_container_width=True, hide_index=True)
@@ -153,64 +137,77 @@ if menu == "🏠 Dashboard":
 elif menu == "📚 Đăng ký môn":
     st.title("📚 Đăng ký môn học")
     
-    # Current credits
-    current_credits = execute_query(
-        "SELECT dbo. GetTotalCredits(?, ?) as total",
-        [st.session_state.user_id, sem_id]
-    )
-    credits = current_credits. iloc[0]['total'] if not current_credits.empty else 0
-    remaining = 21 - credits
+    # Tín chỉ hiện tại, đang chờ duyệt và tổng tính vào giới hạn (cache theo sinh viên,
+    # chỉ tính lại khi sinh viên này gửi hoặc được duyệt yêu cầu)
+    credit_totals = get_credit_totals(st.session_state.user_id, sem_id)
+    credits = credit_totals['total']
+    pending_credits = credit_totals['pending']
     
-    col1, col2, col3 = st.columns(3)
+    # ✅ GIỎ ĐĂNG KÝ: giữ trong session theo học kỳ, chưa ghi gì xuống database
+    carts = st.session_state.setdefault('enrollment_cart', {})
+    cart = carts.setdefault(sem_id, {})
+    cart_credits = sum(item['Credit'] for item in cart.values())
+    # Cùng cách tính với kiểm tra khi gửi giỏ (đã duyệt + chờ duyệt + trong giỏ)
+    new_total = credit_totals['requested'] + cart_credits
+    
+    col1, col2, col3, col4 = st.columns(4)
     with col1:
         st.metric("📆 Học kỳ", sem_name)
     with col2:
-        st.metric("📊 Tổng tín chỉ", f"{credits}/21")
+        st.metric("📊 Tổng tín chỉ", f"{credits}/{CREDIT_LIMITS['max']}", help=f"⏳ Đang chờ duyệt: {pending_credits} TC")
     with col3:
-        st.metric("✨ Còn lại", f"{remaining} tín chỉ")
+        st.metric("🛒 Trong giỏ", f"{len(cart)} môn ({cart_credits} TC)")
+    with col4:
+        st.metric("✨ Còn lại", f"{CREDIT_LIMITS['max'] - new_total} tín chỉ")
+    
+    # Kết quả lần gửi giỏ trước (hiển thị một lần sau rerun)
+    submit_results = st.session_state.pop('enrollment_cart_results', None)
+    if submit_results is not None:
+        sent = int(submit_results['Success'].sum())
+        if sent:
+            st.success(f"✅ Đã gửi {sent}/{len(submit_results)} môn, chờ Staff duyệt")
+        if sent < len(submit_results):
+            st.error(f"❌ {len(submit_results) - sent} môn không gửi được")
+        st.dataframe(submit_results, use_container_width=True, hide_index=True)
     
     st.markdown("---")
     
     # ✅ TÌM KIẾM MÔN HỌC VỚI GỢI Ý
     st.subheader("🔍 Tìm và đăng ký môn học")
     
-    # Lấy tất cả môn học
-    all_courses = execute_query("""
-        SELECT 
-            C.CourseID,
-            C.Course_Code,
-            C.Title,
-            C. Credit,
-            C.Passing_Score,
-            D.Name as Department,
-            dbo. GetStudentCountByCourse(C.CourseID) as StudentCount
-        FROM Courses C
-        LEFT JOIN Departments D ON C.DepartmentID = D. DepartmentID
-        ORDER BY C.Course_Code
-    """)
-    
-    if all_courses.empty:
-        st. warning("⚠️ Không có môn học nào")
+    # ✅ Ô TÌM KIẾM: lọc trên server, trình duyệt chỉ nhận vài chục gợi ý
+    search_text = st.text_input(
+        "**Tìm môn học** (mã môn, tên môn hoặc khoa)",
+        placeholder="VD: CS101, lap trinh, Toán",
+        help="💡 Không cần gõ dấu: 'lap trinh' sẽ tìm được 'Lập trình'",
+        key="course_search_text"
+    )
+    
+    # Top-k môn khớp nhất, đã xếp hạng
+    matches = search_courses(search_text)
+    
+    if matches.empty:
+        st. warning("⚠️ Không tìm thấy môn học nào")
     else:
         # ✅ TẠO DANH SÁCH GỢI Ý
         # Format: "CS101 - Nhập môn Lập trình (3 TC)"
-        all_courses['SearchDisplay'] = all_courses. apply(
-            lambda row: f"{row['Course_Code']} - {row['Title']} ({row['Credit']} TC)", 
-            axis=1
-        )
+        labels = {
+            row.CourseID: f"{row.Course_Code} - {row.Title} ({row.Credit} TC)"
+            for row in matches.itertuples(index=False)
+        }
         
-        # ✅ SELECTBOX VỚI SEARCH (Gõ để lọc)
-        selected_course_display = st.selectbox(
-            "**Chọn môn học** (Gõ mã môn hoặc tên môn để tìm kiếm)",
-            options=["-- Chọn môn học --"] + all_courses['SearchDisplay'].tolist(),
-            help="💡 Bạn có thể gõ 'CS' hoặc 'Lập trình' để tìm nhanh",
+        selected_course_id = st.selectbox(
+            "**Chọn môn học**",
+            options=[None] + list(labels),
+            format_func=lambda course_id: "-- Chọn môn học --" if course_id is None else labels[course_id],
             key="course_search"
         )
         
         # ✅ HIỂN THỊ CHI TIẾT MÔN HỌC KHI CHỌN
-        if selected_course_display != "-- Chọn môn học --":
-            # Lấy thông tin môn học được chọn
-            selected_course = all_courses[all_courses['SearchDisplay'] == selected_course_display]. iloc[0]
+        if selected_course_id is not None:
+            # Lấy thông tin môn học được chọn (số SV đọc từ bộ đếm trong bộ nhớ)
+            selected_course = add_enrollment_counts(matches.loc[[selected_course_id]]).iloc[0]
+            course_id = int(selected_course['CourseID'])
             
             st.markdown('<div class="card">', unsafe_allow_html=True)
             
@@ -225,51 +222,86 @@ elif menu == "📚 Đăng ký môn":
             with col2:
                 st.markdown("<br>", unsafe_allow_html=True)
                 
-                # Check if already enrolled
-                already_enrolled = execute_query("""
-                    SELECT A.RequestStatus
-                    FROM Activities A
-                    WHERE A.StudentID = ? AND A. CourseID = ? AND A. ActivityType = 'Enrollment'
-                """, [st.session_state.user_id, selected_course['CourseID']])
+                # Check if already enrolled (từ trạng thái đã cache của sinh viên)
+                status = get_registration_state(st.session_state.user_id).enrollment_status(course_id)
                 
-                if not already_enrolled.empty:
-                    status = already_enrolled.iloc[0]['RequestStatus']
+                if status is not None:
                     if status == 'Approved':
                         st.success("✅ Đã đăng ký")
                     elif status == 'Pending':
                         st.warning("⏳ Chờ duyệt")
                     else:
                         st. error("❌ Bị từ chối")
+                elif course_id in cart:
+                    st.info("🛒 Đã có trong giỏ")
                 else:
-                    # Calculate new total credits
-                    new_total = credits + selected_course['Credit']
+                    # Tín chỉ nếu thêm môn này vào giỏ (tính tại chỗ, không truy vấn)
+                    total_with_course = new_total + selected_course['Credit']
+                    
+                    # Kiểm tra trước: trùng, vượt tín chỉ, môn tiên quyết
+                    violation = check_enrollment(
+                        st.session_state.user_id, course_id, selected_course['Credit'],
+                        sem_id, selected_semester['Start_Date'], planned_credits=cart_credits
+                    )
                     
-                    if new_total > 21:
-                        st.error(f"❌ Vượt quá 21 TC!")
-                        st.caption(f"Hiện tại: {credits} TC")
-                        st.caption(f"Sau khi đăng ký: {new_total} TC")
+                    if violation is not None:
+                        st.error(violation.message)
+                        st.caption(f"Đã duyệt + chờ duyệt + giỏ: {new_total} TC")
+                        st.caption(f"Sau khi thêm: {total_with_course} TC")
                     else:
-                        if st.button("📝 Đăng ký môn này", type="primary", use_container_width=True):
-                            from datetime import date
-                            from database import execute_procedure
-                            
-                            success, msg = execute_procedure(
-                                "EXEC InsertActivity @p_StudentID=?, @p_CourseID=?, @p_SubmissionDate=?, @p_SemesterID=?, @p_ActivityType=? ",
-                                (st.session_state.user_id, selected_course['CourseID'], date.today(), sem_id, 'Enrollment')
-                            )
-                            
-                            if success:
-                                st.success("✅ Đăng ký thành công!")
-                                st.balloons()
-                                st.rerun()
-                            else:
-                                st.error(msg)
+                        if st.button("🛒 Thêm vào giỏ", type="primary", use_container_width=True):
+                            cart[course_id] = {
+                                'Course_Code': selected_course['Course_Code'],
+                                'Title': selected_course['Title'],
+                                'Credit': int(selected_course['Credit'])
+                            }
+                            st.rerun()
                         
                         # Preview credits
-                        st.caption(f"Tín chỉ sau khi đăng ký: {new_total}/21")
+                        st.caption(f"Tín chỉ sau khi thêm: {total_with_course}/{CREDIT_LIMITS['max']}")
             
             st.markdown('</div>', unsafe_allow_html=True)
     
+    # ✅ GIỎ ĐĂNG KÝ
+    st.markdown("---")
+    st.subheader("🛒 Giỏ đăng ký")
+    
+    if not cart:
+        st.info("📭 Giỏ trống - tìm môn học ở trên và bấm 'Thêm vào giỏ'")
+    else:
+        for course_id, item in list(cart.items()):
+            col1, col2 = st.columns([4, 1])
+            with col1:
+                st.markdown(f"📖 **[{item['Course_Code']}] {item['Title']}** - {item['Credit']} TC")
+            with col2:
+                if st.button("🗑️ Bỏ", key=f"cart_remove_{course_id}"):
+                    del cart[course_id]
+                    st.rerun()
+        
+        st.markdown(f"**📊 Tổng sau khi đăng ký:** {new_total} TC (giới hạn {CREDIT_LIMITS['min']}-{CREDIT_LIMITS['max']} TC)")
+        
+        if new_total > CREDIT_LIMITS['max']:
+            st.error(f"❌ Vượt quá {CREDIT_LIMITS['max']} tín chỉ - hãy bỏ bớt môn")
+        elif new_total < CREDIT_LIMITS['min']:
+            st.warning(f"⚠️ Chưa đủ {CREDIT_LIMITS['min']} tín chỉ tối thiểu của học kỳ")
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button(
+                f"✅ Gửi đăng ký ({len(cart)} môn)", type="primary", use_container_width=True,
+                disabled=new_total > CREDIT_LIMITS['max']
+            ):
+                # Một transaction cho cả giỏ, kết quả từng môn
+                results = submit_enrollments(st.session_state.user_id, sem_id, list(cart))
+                for course_id in results.loc[results['Success'], 'CourseID']:
+                    cart.pop(int(course_id), None)
+                st.session_state.enrollment_cart_results = results
+                st.rerun()
+        with col2:
+            if st.button("🧹 Xóa giỏ", use_container_width=True):
+                cart.clear()
+                st.rerun()
+    
     # ✅ DANH SÁCH ĐÃ ĐĂNG KÝ (giữ nguyên như cũ)
     st.markdown("---")
     st.subheader("📋 Môn đã đăng ký")
@@ -336,6 +368,9 @@ elif menu == "🚫 Rút môn":
         
         st.info(f"📊 Tổng tín chỉ hiện tại: **{credits}**")
         
+        # Yêu cầu rút môn đã gửi trong học kỳ: một truy vấn cho cả danh sách
+        approved = add_request_statuses(approved, st.session_state.user_id, sem_id, 'Withdrawal')
+        
         for _, course in approved.iterrows():
             with st.container():
                 st.markdown('<div class="card">', unsafe_allow_html=True)
@@ -348,13 +383,8 @@ elif menu == "🚫 Rút môn":
                 
                 with col2:
                     # Check if already requested withdrawal
-                    existing = execute_query("""
-                        SELECT RequestStatus FROM Activities
-                        WHERE StudentID = ? AND CourseID = ? AND ActivityType = 'Withdrawal'
-                    """, [st.session_state.user_id, course['CourseID']])
-                    
-                    if not existing.empty:
-                        st.info(f"⏳ {existing.iloc[0]['RequestStatus']}")
+                    if course['ExistingStatus']:
+                        st.info(f"⏳ {course['ExistingStatus']}")
                     else:
                         if st.button("🚫 Rút", key=f"wd_{course['CourseID']}", type="primary"):
                             remaining = credits - course['Credit']
@@ -368,6 +398,7 @@ elif menu == "🚫 Rút môn":
                             )
                             
                             if success:
+                                record_activity(st.session_state.user_id, course['CourseID'], sem_id, 'Withdrawal')
                                 st.success("✅ Yêu cầu rút môn đã gửi!")
                                 st.rerun()
                             else:
@@ -392,19 +423,9 @@ elif menu == "📅 Hoãn thi":
     </div>
     """, unsafe_allow_html=True)
     
-    # Get semester dates
-    sem_info = execute_query("""
-        SELECT Start_Date, End_Date 
-        FROM Semesters 
-        WHERE SemesterID = ? 
-    """, [sem_id])
-    
-    if sem_info.empty:
-        st. error("❌ Không tìm thấy thông tin học kỳ")
-        st.stop()
-    
-    sem_start = sem_info.iloc[0]['Start_Date']
-    sem_end = sem_info.iloc[0]['End_Date']
+    # Semester dates (từ catalog học kỳ, không truy vấn lại)
+    sem_start = selected_semester['Start_Date']
+    sem_end = selected_semester['End_Date']
     
     # Get approved enrollments
     approved = execute_query("""
@@ -422,16 +443,14 @@ elif menu == "📅 Hoãn thi":
     if approved.empty:
         st.warning("📭 Không có môn nào để hoãn thi")
     else:
+        # Yêu cầu hoãn thi đã gửi trong học kỳ: một truy vấn cho cả danh sách
+        approved = add_request_statuses(approved, st.session_state.user_id, sem_id, 'Exam_Delay')
+        
         for _, course in approved.iterrows():
             with st.expander(f"📖 [{course['Course_Code']}] {course['Title']}"):
                 # Check if already requested
-                existing = execute_query("""
-                    SELECT RequestStatus FROM Activities
-                    WHERE StudentID = ? AND CourseID = ? AND ActivityType = 'Exam_Delay'
-                """, [st. session_state.user_id, course['CourseID']])
-                
-                if not existing.empty:
-                    st.info(f"⏳ Đã yêu cầu - {existing.iloc[0]['RequestStatus']}")
+                if course['ExistingStatus']:
+                    st.info(f"⏳ Đã yêu cầu - {course['ExistingStatus']}")
                 else:
                     with st.form(f"delay_{course['CourseID']}"):
                         reason = st.text_area("Lý do hoãn thi *", height=100)
@@ -448,37 +467,17 @@ elif menu == "📅 Hoãn thi":
                             elif old_date >= new_date:
                                 st.error("❌ Ngày mới phải sau ngày cũ")
                             else:
-                                # Insert activity
-                                success1, msg1 = execute_procedure(
-                                    "EXEC InsertActivity @p_StudentID=?, @p_CourseID=?, @p_SubmissionDate=?, @p_SemesterID=?, @p_ActivityType=?",
-                                    (st.session_state.user_id, course['CourseID'], date.today(), sem_id, 'Exam_Delay')
+                                # Activity + Exam_Delays trong một transaction
+                                success, msg, activity_id = submit_exam_delay(
+                                    st.session_state.user_id, course['CourseID'], sem_id,
+                                    reason, old_date, new_date
                                 )
                                 
-                                if success1:
-                                    # Get ActivityID
-                                    activity = execute_query("""
-                                        SELECT TOP 1 ActivityID
-                                        FROM Activities
-                                        WHERE StudentID = ? AND CourseID = ? AND ActivityType = 'Exam_Delay'
-                                        ORDER BY ActivityID DESC
-                                    """, [st.session_state.user_id, course['CourseID']])
-                                    
-                                    if not activity.empty:
-                                        activity_id = activity.iloc[0]['ActivityID']
-                                        
-                                        # Insert exam delay
-                                        success2, msg2 = execute_procedure(
-                                            "EXEC InsertExamDelay @p_ActivityID=?, @p_Reason=?, @p_Old_Exam_Date=?, @p_Requested_New_Exam_Date=?",
-                                            (activity_id, reason, old_date, new_date)
-                                        )
-                                        
-                                        if success2:
-                                            st.success("✅ Yêu cầu hoãn thi đã gửi!")
-                                            st.rerun()
-                                        else:
-                                            st.error(msg2)
+                                if success:
+                                    st.success("✅ Yêu cầu hoãn thi đã gửi!")
+                                    st.rerun()
                                 else:
-                                    st.error(msg1)
+                                    st.error(msg)
 
 # =============================================================================
 # LỊCH SỬ
@@ -486,21 +485,14 @@ elif menu == "📅 Hoãn thi":
 elif menu == "📋 Lịch sử":
     st.title("📋 Lịch sử Activities")
     
+    # ✅ MỘT TRUY VẤN cho cả 3 tab, phân trang keyset (mới nhất trước)
+    history_pages = st.session_state.get('history_pages', 1)
+    history, has_more = get_activity_history(st.session_state.user_id, history_pages)
+    
     tab1, tab2, tab3 = st.tabs(["📚 Enrollments", "🚫 Withdrawals", "📅 Exam Delays"])
     
     with tab1:
-        enrollments = execute_query("""
-            SELECT 
-                A.ActivityID,
-                C.Course_Code,
-                C.Title,
-                A.RequestStatus,
-                CONVERT(VARCHAR, A.Submission_Date, 23) as Date
-            FROM Activities A
-            JOIN Courses C ON A.CourseID = C.CourseID
-            WHERE A.StudentID = ?  AND A.ActivityType = 'Enrollment'
-            ORDER BY A.Submission_Date DESC
-        """, [st.session_state.user_id])
+        enrollments = history['Enrollment']
         
         if not enrollments.empty:
             st.dataframe(enrollments, use_container_width=True, hide_index=True)
@@ -508,18 +500,7 @@ elif menu == "📋 Lịch sử":
             st.info("📭 Chưa có enrollment")
     
     with tab2:
-        withdrawals = execute_query("""
-            SELECT 
-                A.ActivityID,
-                C.Course_Code,
-                C.Title,
-                A.RequestStatus,
-                CONVERT(VARCHAR, A.Submission_Date, 23) as Date
-            FROM Activities A
-            JOIN Courses C ON A.CourseID = C.CourseID
-            WHERE A.StudentID = ? AND A. ActivityType = 'Withdrawal'
-            ORDER BY A.Submission_Date DESC
-        """, [st.session_state.user_id])
+        withdrawals = history['Withdrawal']
         
         if not withdrawals.empty:
             st.dataframe(withdrawals, use_container_width=True, hide_index=True)
@@ -527,23 +508,18 @@ elif menu == "📋 Lịch sử":
             st.info("📭 Chưa có withdrawal")
     
     with tab3:
-        delays = execute_query("""
-            SELECT 
-                A.ActivityID,
-                C.Course_Code,
-                C.Title,
-                ED.Reason,
-                CONVERT(VARCHAR, ED.Old_Exam_Date, 23) as OldDate,
-                CONVERT(VARCHAR, ED.Requested_New_Exam_Date, 23) as NewDate,
-                A.RequestStatus
-            FROM Activities A
-            JOIN Courses C ON A.CourseID = C.CourseID
-            JOIN Exam_Delays ED ON A.ActivityID = ED.ActivityID
-            WHERE A.StudentID = ? AND A.ActivityType = 'Exam_Delay'
-            ORDER BY A.Submission_Date DESC
-        """, [st.session_state.user_id])
+        delays = history['Exam_Delay']
         
         if not delays.empty:
             st.dataframe(delays, use_container_width=True, hide_index=True)
         else:
-            st.info("📭 Chưa có exam delay")
\ No newline at end of file
+            st.info("📭 Chưa có exam delay")
+    
+    # ✅ TẢI THÊM: chỉ truy vấn trang kế tiếp, các trang trước lấy từ cache
+    loaded = sum(len(frame) for frame in history.values())
+    st.caption(f"📄 Đang hiển thị {loaded} hoạt động gần nhất")
+    
+    if has_more:
+        if st.button("⬇️ Tải thêm", key="history_load_more"):
+            st.session_state.history_pages = history_pages + 1
+            st.rerun()
\ No newline at end of file
@@ -1,6 +1,10 @@
 import streamlit as st
-import plotly.express as px
-from database import execute_query, get_current_semester
+from database import (
+    execute_query, get_professor_semesters, get_student_profile, add_section_summary,
+    count_section_students, get_semester_distributions, get_semester_status_mix,
+    begin_rerun, begin_fragment_rerun, within_budget
+)
+from directory import render_person_picker
 from styles import get_common_styles
 
 st.set_page_config(page_title="Professor Dashboard", page_icon="👨‍🏫", layout="wide")
@@ -12,6 +16,9 @@ if 'logged_in' not in st.session_state or not st.session_state.logged_in or st.s
         st.switch_page("pages/1_Login.py")
     st.stop()
 
+# Huỷ truy vấn còn chạy từ lần rerun trước và bắt đầu ngân sách thời gian
+begin_rerun()
+
 # Apply styles
 st.markdown(get_common_styles(), unsafe_allow_html=True)
 
@@ -38,25 +45,8 @@ with st.sidebar:
 # Thay đoạn selectbox học kỳ:
 
 # ✅ LẤY TẤT CẢ HỌC KỲ + đánh dấu có teaching assignment
-all_semesters_with_teaching = execute_query("""
-    SELECT 
-        S.SemesterID,
-        S. Semester_Name,
-        S. Start_Date,
-        COUNT(DISTINCT PC.CourseID) as CourseCount,
-        COUNT(DISTINCT A.StudentID) as StudentCount
-    FROM Semesters S
-    LEFT JOIN Professor_Course PC 
-        ON S.SemesterID = PC.SemesterID 
-        AND PC.ProfessorID = ?
-    LEFT JOIN Activities A 
-        ON PC.CourseID = A.CourseID 
-        AND PC.SemesterID = A. SemesterID
-        AND A.ActivityType = 'Enrollment'
-        AND A.RequestStatus = 'Approved'
-    GROUP BY S.SemesterID, S.Semester_Name, S.Start_Date
-    ORDER BY S.Start_Date DESC
-""", [st.session_state. user_id])
+# (giữ trong session, chỉ tải lại khi phân công / đăng ký thay đổi)
+all_semesters_with_teaching = get_professor_semesters(st.session_state.user_id)
 
 if not all_semesters_with_teaching.empty:
     # ✅ Tạo display với indicator
@@ -97,44 +87,32 @@ if menu == "🏠 Dashboard":
     </div>
     """, unsafe_allow_html=True)
     
-    # ✅ QUERY ĐÃ SỬA - Dùng INNER JOIN rõ ràng
-    courses_teaching = execute_query("""
-        SELECT COUNT(*) as cnt
-        FROM Professor_Course
-        WHERE ProfessorID = ? AND SemesterID = ?
+    # ✅ Một truy vấn danh sách môn; số sinh viên / yêu cầu lấy từ bảng tổng hợp theo lớp
+    overview = execute_query("""
+        SELECT 
+            C.CourseID,
+            C.Course_Code,
+            C.Title,
+            C.Credit
+        FROM Professor_Course PC
+        JOIN Courses C ON PC.CourseID = C. CourseID
+        WHERE PC. ProfessorID = ? AND PC.SemesterID = ? 
+        ORDER BY C.Course_Code
     """, [st.session_state.user_id, sem_id])
     
-    # ✅ SỬA: INNER JOIN + điều kiện rõ ràng
-    total_students = execute_query("""
-        SELECT COUNT(DISTINCT A.StudentID) as cnt
-        FROM Activities A
-        INNER JOIN Professor_Course PC 
-            ON A.CourseID = PC.CourseID 
-            AND A.SemesterID = PC. SemesterID
-        WHERE PC.ProfessorID = ?  
-        AND PC.SemesterID = ? 
-        AND A.ActivityType = 'Enrollment' 
-        AND A.RequestStatus = 'Approved'
-    """, [st.session_state.user_id, sem_id])
+    overview = add_section_summary(overview, sem_id) if not overview.empty else overview
+    sections = [(course_id, sem_id) for course_id in overview.get('CourseID', [])]
     
-    pending_activities = execute_query("""
-        SELECT COUNT(*) as cnt
-        FROM Activities A
-        INNER JOIN Professor_Course PC 
-            ON A.CourseID = PC.CourseID 
-            AND A.SemesterID = PC.SemesterID
-        WHERE PC.ProfessorID = ?   
-        AND PC.SemesterID = ?
-        AND A.ActivityType = 'Enrollment'  -- ✅ CHỈ ĐẾM ENROLLMENT
-        AND A.RequestStatus = 'Pending'
-    """, [st.session_state.user_id, sem_id])
+    courses_teaching = len(overview)
+    total_students = count_section_students(sections, 'Approved') if sections else 0
+    pending_activities = int(overview['Pending'].sum()) if sections else 0
     
     col1, col2, col3 = st.columns(3)
     
     with col1:
         st.markdown(f"""
         <div class="stat-box">
-            <h2>{courses_teaching.iloc[0]['cnt'] if not courses_teaching.empty else 0}</h2>
+            <h2>{courses_teaching}</h2>
             <p>📚 Môn đang dạy</p>
         </div>
         """, unsafe_allow_html=True)
@@ -142,7 +120,7 @@ if menu == "🏠 Dashboard":
     with col2:
         st.markdown(f"""
         <div class="stat-box">
-            <h2>{total_students.iloc[0]['cnt'] if not total_students.empty else 0}</h2>
+            <h2>{total_students}</h2>
             <p>👥 Tổng sinh viên</p>
         </div>
         """, unsafe_allow_html=True)
@@ -150,7 +128,7 @@ if menu == "🏠 Dashboard":
     with col3:
         st.markdown(f"""
         <div class="stat-box">
-            <h2>{pending_activities.iloc[0]['cnt'] if not pending_activities.empty else 0}</h2>
+            <h2>{pending_activities}</h2>
             <p>⏳ Yêu cầu chờ duyệt</p>
         </div>
         """, unsafe_allow_html=True)
@@ -158,25 +136,12 @@ if menu == "🏠 Dashboard":
     # Overview
     st.markdown("## 📋 Tổng quan môn học")
     
-    overview = execute_query("""
-        SELECT 
-            C.Course_Code,
-            C.Title,
-            C.Credit,
-            (SELECT COUNT(DISTINCT StudentID) 
-             FROM Activities 
-             WHERE CourseID = C.CourseID 
-             AND SemesterID = ?  
-             AND ActivityType = 'Enrollment' 
-             AND RequestStatus = 'Approved') as EnrolledStudents
-        FROM Professor_Course PC
-        JOIN Courses C ON PC.CourseID = C. CourseID
-        WHERE PC. ProfessorID = ? AND PC.SemesterID = ? 
-        ORDER BY C.Course_Code
-    """, [sem_id, st.session_state.user_id, sem_id])
-    
     if not overview.empty:
-        st.dataframe(overview, use_container_width=True, hide_index=True)
+        overview = overview.rename(columns={'Approved': 'EnrolledStudents'})
+        st.dataframe(
+            overview[['Course_Code', 'Title', 'Credit', 'EnrolledStudents', 'Pending', 'Withdrawn']],
+            use_container_width=True, hide_index=True
+        )
     else:
         st.info("📭 Chưa được phân công môn học nào")
 
@@ -186,24 +151,51 @@ if menu == "🏠 Dashboard":
 elif menu == "📚 Môn học của tôi":
     st.title("📚 Môn học đang giảng dạy")
     
+    # ✅ Danh sách môn; số sinh viên và phân bố trạng thái lấy từ bảng tổng hợp theo lớp
     my_courses = execute_query("""
         SELECT 
             C.CourseID,
             C.Course_Code,
             C.Title,
             C.Credit,
-            C.Passing_Score,
-            (SELECT COUNT(DISTINCT StudentID) 
-             FROM Activities 
-             WHERE CourseID = C.CourseID 
-             AND SemesterID = ? 
-             AND ActivityType = 'Enrollment' 
-             AND RequestStatus = 'Approved') as EnrolledStudents
+            C.Passing_Score
         FROM Professor_Course PC
         JOIN Courses C ON PC.CourseID = C. CourseID
         WHERE PC. ProfessorID = ? AND PC.SemesterID = ? 
         ORDER BY C.Course_Code
-    """, [sem_id, st.session_state. user_id, sem_id])
+    """, [st.session_state. user_id, sem_id])
+    
+    if not my_courses.empty:
+        my_courses = add_section_summary(my_courses, sem_id)
+        my_courses['EnrolledStudents'] = my_courses['Approved']
+    
+    @st.fragment
+    def render_course_students(course_id):
+        """Danh sách sinh viên của một môn: chỉ truy vấn khi được mở, rerun riêng phần này"""
+        
+        begin_fragment_rerun()
+        
+        if not st.toggle("👥 Xem danh sách sinh viên", key=f"prof_roster_{sem_id}_{course_id}"):
+            return
+        
+        students = execute_query("""
+            SELECT 
+                A.StudentID,
+                dbo.GetFullName(A.StudentID) as StudentName,
+                U.Email_Address,
+                A.RequestStatus,
+                CONVERT(VARCHAR, A. Submission_Date, 23) as EnrollDate
+            FROM Activities A
+            JOIN Students S ON A.StudentID = S. UserID
+            JOIN Users U ON S.UserID = U.UserID
+            WHERE A.CourseID = ? AND A.SemesterID = ? AND A. ActivityType = 'Enrollment'
+            ORDER BY A.RequestStatus, StudentName
+        """, [course_id, sem_id])
+        
+        if not students. empty:
+            st.dataframe(students, use_container_width=True, hide_index=True)
+        else:
+            st.info("Chưa có sinh viên đăng ký")
     
     if my_courses.empty:
         st.info("📭 Chưa được phân công môn học nào")
@@ -222,45 +214,24 @@ elif menu == "📚 Môn học của tôi":
                     """)
                 
                 with col2:
-                    status_breakdown = execute_query("""
-                        SELECT 
-                            RequestStatus,
-                            COUNT(*) as Count
-                        FROM Activities
-                        WHERE CourseID = ?  AND SemesterID = ?  AND ActivityType = 'Enrollment'
-                        GROUP BY RequestStatus
-                    """, [course['CourseID'], sem_id])
+                    status_breakdown = [
+                        (status, course[status]) for status in ('Approved', 'Pending', 'Rejected', 'Withdrawn')
+                        if course[status]
+                    ]
                     
-                    if not status_breakdown.empty:
+                    if status_breakdown:
                         st.markdown("**Phân bố trạng thái:**")
-                        for _, status in status_breakdown.iterrows():
-                            if status['RequestStatus'] == 'Approved':
-                                st.markdown(f'<span class="status-approved">{status["RequestStatus"]}: {status["Count"]}</span>', unsafe_allow_html=True)
-                            elif status['RequestStatus'] == 'Pending':
-                                st.markdown(f'<span class="status-pending">{status["RequestStatus"]}: {status["Count"]}</span>', unsafe_allow_html=True)
+                        for status, count in status_breakdown:
+                            if status == 'Approved':
+                                st.markdown(f'<span class="status-approved">{status}: {count}</span>', unsafe_allow_html=True)
+                            elif status == 'Pending':
+                                st.markdown(f'<span class="status-pending">{status}: {count}</span>', unsafe_allow_html=True)
                             else:
-                                st. markdown(f'<span class="status-rejected">{status["RequestStatus"]}: {status["Count"]}</span>', unsafe_allow_html=True)
+                                st. markdown(f'<span class="status-rejected">{status}: {count}</span>', unsafe_allow_html=True)
                 
                 st.markdown("### 👥 Danh sách sinh viên")
                 
-                students = execute_query("""
-                    SELECT 
-                        A.StudentID,
-                        dbo.GetFullName(A.StudentID) as StudentName,
-                        U.Email_Address,
-                        A.RequestStatus,
-                        CONVERT(VARCHAR, A. Submission_Date, 23) as EnrollDate
-                    FROM Activities A
-                    JOIN Students S ON A.StudentID = S. UserID
-                    JOIN Users U ON S.UserID = U.UserID
-                    WHERE A.CourseID = ? AND A.SemesterID = ? AND A. ActivityType = 'Enrollment'
-                    ORDER BY A.RequestStatus, StudentName
-                """, [course['CourseID'], sem_id])
-                
-                if not students. empty:
-                    st.dataframe(students, use_container_width=True, hide_index=True)
-                else:
-                    st.info("Chưa có sinh viên đăng ký")
+                render_course_students(int(course['CourseID']))
 
 # =============================================================================
 # SINH VIÊN
@@ -268,226 +239,119 @@ elif menu == "📚 Môn học của tôi":
 elif menu == "👥 Sinh viên":
     st.title("👥 Tra cứu sinh viên")
     
-    # ✅ LẤY DANH SÁCH SINH VIÊN
-    all_students = execute_query("""
-        SELECT 
-            S. UserID,
-            dbo. GetFullName(S.UserID) as FullName,
-            U.Email_Address,
-            U.Phone_Number,
-            CONVERT(VARCHAR, S.Birthday, 23) as Birthday
-        FROM Students S
-        JOIN Users U ON S.UserID = U.UserID
-        ORDER BY S.UserID
-    """)
+    # ✅ TÌM TRÊN SERVER (ID, tên, email), MỖI LẦN CHỈ TẢI MỘT TRANG SINH VIÊN
+    st.markdown("### 🔍 Tìm kiếm sinh viên")
     
-    if all_students.empty:
-        st.warning("⚠️ Không có sinh viên nào trong hệ thống")
-    else:
-        # ✅ TẠO DISPLAY STRING
-        all_students['SearchDisplay'] = all_students.apply(
-            lambda row: f"ID: {row['UserID']} - {row['FullName']} ({row['Email_Address']})", 
-            axis=1
-        )
+    selected_student = render_person_picker('Student', 'student_search', "**Chọn sinh viên**")
+    
+    # ✅ HIỂN THỊ CHI TIẾT KHI CHỌN
+    if selected_student is not None:
+        search_id = selected_student['UserID']
         
-        # ✅ SELECTBOX VỚI SEARCH
-        st.markdown("### 🔍 Tìm kiếm sinh viên")
+        # Student info card
+        st.markdown('<div class="card">', unsafe_allow_html=True)
         
-        selected_student_display = st.selectbox(
-            "**Chọn sinh viên** (Gõ ID, tên hoặc email để tìm kiếm)",
-            options=["-- Chọn sinh viên --"] + all_students['SearchDisplay'].tolist(),
-            help="💡 Bạn có thể gõ ID (VD: 11), tên (VD: Mai) hoặc email để tìm nhanh",
-            key="student_search"
-        )
+        col1, col2 = st.columns(2)
         
-        # ✅ HIỂN THỊ CHI TIẾT KHI CHỌN
-        if selected_student_display != "-- Chọn sinh viên --":
-            # Lấy thông tin sinh viên được chọn
-            selected_student = all_students[all_students['SearchDisplay'] == selected_student_display]. iloc[0]
-            search_id = selected_student['UserID']
-            
-            # Student info card
-            st.markdown('<div class="card">', unsafe_allow_html=True)
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                st.markdown(f"""
-                ### 👨‍🎓 Thông tin sinh viên
-                **Student ID:** {selected_student['UserID']}  
-                **Họ tên:** {selected_student['FullName']}  
-                **Email:** {selected_student['Email_Address']}
-                """)
-            
-            with col2:
-                st.markdown(f"""
-                ### 📞 Liên hệ
-                **Điện thoại:** {selected_student['Phone_Number']}  
-                **Ngày sinh:** {selected_student['Birthday']}
-                """)
-            
-            st.markdown('</div>', unsafe_allow_html=True)
-            
-            # ✅ THÔNG TIN HỌC TẬP
-            st.markdown("---")
-            
-            # Tổng credits
-            total_credits = execute_query(
-                "SELECT dbo.GetTotalCredits(?, ?) as Total",
-                [search_id, sem_id]
+        with col1:
+            st.markdown(f"""
+            ### 👨‍🎓 Thông tin sinh viên
+            **Student ID:** {selected_student['UserID']}  
+            **Họ tên:** {selected_student['FullName']}  
+            **Email:** {selected_student['Email_Address']}
+            """)
+        
+        with col2:
+            st.markdown(f"""
+            ### 📞 Liên hệ
+            **Điện thoại:** {selected_student['Phone_Number']}  
+            **Ngày sinh:** {selected_student['Birthday']}
+            """)
+        
+        st.markdown('</div>', unsafe_allow_html=True)
+        
+        # ✅ THÔNG TIN HỌC TẬP
+        st.markdown("---")
+        
+        # ✅ Hồ sơ sinh viên: một round trip, cache theo (sinh viên, học kỳ)
+        profile = get_student_profile(search_id, sem_id)
+        if profile is None:
+            st.stop()
+        
+        all_courses = profile['courses']
+        current_courses = profile['current']
+        status_dist = profile['status']
+        program_info = profile['programs']
+        activities_summary = profile['activities']
+        
+        col1, col2, col3 = st.columns(3)
+        
+        with col1:
+            st.metric(
+                f"📊 Tổng tín chỉ HK {sem_name}",
+                f"{profile['total_credits']} tín chỉ"
             )
+        
+        with col2:
+            st.metric("📚 Môn đã đăng ký", profile['enrolled'])
+        
+        with col3:
+            st.metric("⏳ Yêu cầu chờ duyệt", profile['pending'])
+        
+        # ✅ DANH SÁCH MÔN HỌC ĐÃ ĐĂNG KÝ
+        st.markdown("### 📚 Lịch sử đăng ký môn học")
+        
+        # Tabs: All semesters vs Current semester
+        tab1, tab2 = st.tabs(["📅 Tất cả học kỳ", f"📆 Học kỳ {sem_name}"])
+        
+        with tab1:
+            if not all_courses. empty:
+                st.dataframe(all_courses, use_container_width=True, hide_index=True)
+            else:
+                st.info("📭 Chưa đăng ký môn nào")
+        
+        with tab2:
+            if not current_courses.empty:
+                st.dataframe(current_courses, use_container_width=True, hide_index=True)
+            else:
+                st.info(f"📭 Chưa đăng ký môn nào trong học kỳ {sem_name}")
+        
+        # ✅ BIỂU ĐỒ PHÂN BỐ TRẠNG THÁI
+        st. markdown("### 📊 Phân bố trạng thái đăng ký")
+        
+        if not status_dist.empty and within_budget("Biểu đồ trạng thái"):
+            import plotly.express as px
             
-            if not total_credits.empty:
-                col1, col2, col3 = st.columns(3)
-                
-                with col1:
-                    st.metric(
-                        f"📊 Tổng tín chỉ HK {sem_name}",
-                        f"{total_credits. iloc[0]['Total']} tín chỉ"
-                    )
-                
-                with col2:
-                    # Đếm môn đã đăng ký
-                    enrolled_count = execute_query("""
-                        SELECT COUNT(*) as cnt
-                        FROM Activities
-                        WHERE StudentID = ? AND SemesterID = ? 
-                        AND ActivityType = 'Enrollment' AND RequestStatus = 'Approved'
-                    """, [search_id, sem_id])
-                    
-                    st.metric(
-                        "📚 Môn đã đăng ký",
-                        enrolled_count.iloc[0]['cnt'] if not enrolled_count.empty else 0
-                    )
-                
-                with col3:
-                    # Pending requests
-                    pending_count = execute_query("""
-                        SELECT COUNT(*) as cnt
-                        FROM Activities
-                        WHERE StudentID = ? AND RequestStatus = 'Pending'
-                    """, [search_id])
-                    
-                    st.metric(
-                        "⏳ Yêu cầu chờ duyệt",
-                        pending_count.iloc[0]['cnt'] if not pending_count. empty else 0
-                    )
-            
-            # ✅ DANH SÁCH MÔN HỌC ĐÃ ĐĂNG KÝ
-            st.markdown("### 📚 Lịch sử đăng ký môn học")
-            
-            # Tabs: All semesters vs Current semester
-            tab1, tab2 = st.tabs(["📅 Tất cả học kỳ", f"📆 Học kỳ {sem_name}"])
-            
-            with tab1:
-                all_courses = execute_query("""
-                    SELECT 
-                        C.Course_Code,
-                        C. Title,
-                        C.Credit,
-                        S. Semester_Name,
-                        A.RequestStatus,
-                        CONVERT(VARCHAR, A.Submission_Date, 23) as EnrollDate
-                    FROM Activities A
-                    JOIN Courses C ON A.CourseID = C.CourseID
-                    JOIN Semesters S ON A.SemesterID = S. SemesterID
-                    WHERE A.StudentID = ? AND A.ActivityType = 'Enrollment'
-                    ORDER BY S.Start_Date DESC, C.Course_Code
-                """, [search_id])
-                
-                if not all_courses. empty:
-                    st.dataframe(all_courses, use_container_width=True, hide_index=True)
-                else:
-                    st.info("📭 Chưa đăng ký môn nào")
-            
-            with tab2:
-                current_courses = execute_query("""
-                    SELECT 
-                        C. Course_Code,
-                        C.Title,
-                        C. Credit,
-                        A.RequestStatus,
-                        CONVERT(VARCHAR, A.Submission_Date, 23) as EnrollDate
-                    FROM Activities A
-                    JOIN Courses C ON A.CourseID = C. CourseID
-                    WHERE A.StudentID = ? 
-                    AND A.SemesterID = ?  
-                    AND A.ActivityType = 'Enrollment'
-                    ORDER BY A.Submission_Date DESC
-                """, [search_id, sem_id])
-                
-                if not current_courses.empty:
-                    st.dataframe(current_courses, use_container_width=True, hide_index=True)
-                else:
-                    st.info(f"📭 Chưa đăng ký môn nào trong học kỳ {sem_name}")
-            
-            # ✅ BIỂU ĐỒ PHÂN BỐ TRẠNG THÁI
-            st. markdown("### 📊 Phân bố trạng thái đăng ký")
-            
-            status_dist = execute_query("""
-                SELECT 
-                    RequestStatus,
-                    COUNT(*) as Count
-                FROM Activities
-                WHERE StudentID = ? AND ActivityType = 'Enrollment'
-                GROUP BY RequestStatus
-            """, [search_id])
+            fig = px.pie(
+                status_dist,
+                values='Count',
+                names='RequestStatus',
+                title='Trạng thái các yêu cầu đăng ký',
+                color='RequestStatus',
+                color_discrete_map={
+                    'Approved': '#28a745',
+                    'Pending': '#ffc107',
+                    'Rejected': '#dc3545'
+                }
+            )
+            st.plotly_chart(fig, use_container_width=True)
+        
+        # ✅ THÔNG TIN THÊM
+        with st.expander("📋 Thông tin chi tiết"):
+            if not program_info.empty:
+                st.markdown("**🎓 Chương trình đào tạo:**")
+                for _, prog in program_info.iterrows():
+                    st.markdown(f"- [{prog['ProgramCode']}] {prog['ProgramName']} (Từ {prog['EnrollmentDate']})")
+            else:
+                st.info("Chưa đăng ký chương trình đào tạo")
             
-            if not status_dist.empty:
-                import plotly.express as px
-                
-                fig = px.pie(
-                    status_dist,
-                    values='Count',
-                    names='RequestStatus',
-                    title='Trạng thái các yêu cầu đăng ký',
-                    color='RequestStatus',
-                    color_discrete_map={
-                        'Approved': '#28a745',
-                        'Pending': '#ffc107',
-                        'Rejected': '#dc3545'
-                    }
-                )
-                st.plotly_chart(fig, use_container_width=True)
+            # Activities summary
+            st.markdown("---")
+            st.markdown("**📈 Tổng quan hoạt động:**")
             
-            # ✅ THÔNG TIN THÊM
-            with st.expander("📋 Thông tin chi tiết"):
-                # Chương trình đào tạo
-                program_info = execute_query("""
-                    SELECT 
-                        DP.Name as ProgramName,
-                        DP.Code as ProgramCode,
-                        CONVERT(VARCHAR, SP. Enrollment_Date, 23) as EnrollmentDate
-                    FROM Student_Program SP
-                    JOIN Degree_Programs DP ON SP.ProgramID = DP.ProgramID
-                    WHERE SP.StudentID = ? 
-                """, [search_id])
-                
-                if not program_info.empty:
-                    st.markdown("**🎓 Chương trình đào tạo:**")
-                    for _, prog in program_info.iterrows():
-                        st.markdown(f"- [{prog['ProgramCode']}] {prog['ProgramName']} (Từ {prog['EnrollmentDate']})")
-                else:
-                    st.info("Chưa đăng ký chương trình đào tạo")
-                
-                # Activities summary
-                st.markdown("---")
-                st.markdown("**📈 Tổng quan hoạt động:**")
-                
-                activities_summary = execute_query("""
-                    SELECT 
-                        ActivityType,
-                        RequestStatus,
-                        COUNT(*) as Count
-                    FROM Activities
-                    WHERE StudentID = ? 
-                    GROUP BY ActivityType, RequestStatus
-                    ORDER BY ActivityType, RequestStatus
-                """, [search_id])
+            if not activities_summary.empty:
+                st.dataframe(activities_summary, use_container_width=True, hide_index=True)
                 
-                if not activities_summary.empty:
-                    st.dataframe(activities_summary, use_container_width=True, hide_index=True)
-                    
 # =============================================================================
 # THỐNG KÊ
 # =============================================================================
@@ -500,26 +364,59 @@ elif menu == "📊 Thống kê":
         st.subheader("📚 Báo cáo tín chỉ sinh viên")
         
         if st.button("📊 Tạo báo cáo", type="primary", key="credits"):
-            credits_report = execute_query(
-                "EXEC GetStudentsCreditsBySemester @p_SemesterID=? ",
-                [sem_id]
-            )
+            # ✅ Phân bố đã chia nhóm sẵn trên server, cache theo học kỳ
+            distributions = get_semester_distributions(sem_id)
             
-            if credits_report.empty:
+            if not distributions or distributions['credit_stats']['Students'] == 0:
                 st.warning("⚠️ Không có dữ liệu")
             else:
-                st. success(f"✅ Tìm thấy {len(credits_report)} sinh viên")
-                st.dataframe(credits_report, use_container_width=True, hide_index=True)
+                stats = distributions['credit_stats']
+                st. success(f"✅ Tìm thấy {stats['Students']} sinh viên")
                 
-                fig = px.histogram(
-                    credits_report,
-                    x='TotalCredits',
-                    title=f'Phân bố tín chỉ sinh viên - {sem_name}',
-                    labels={'TotalCredits': 'Tổng tín chỉ', 'count': 'Số sinh viên'},
-                    nbins=20,
-                    color_discrete_sequence=['#667eea']
-                )
-                st.plotly_chart(fig, use_container_width=True)
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric("📊 Trung bình", f"{stats['Mean']:.1f} tín chỉ")
+                with col2:
+                    st.metric("⬇️ Thấp nhất", f"{stats['Min']} tín chỉ")
+                with col3:
+                    st.metric("⬆️ Cao nhất", f"{stats['Max']} tín chỉ")
+                
+                credits_bins = distributions['credits']
+                credits_bins['Tổng tín chỉ'] = credits_bins.apply(lambda b: f"{b['From']:.1f}–{b['To']:.1f}", axis=1)
+                
+                if within_budget("Biểu đồ phân bố tín chỉ"):
+                    import plotly.express as px
+                
+                    fig = px.bar(
+                        credits_bins,
+                        x='Tổng tín chỉ',
+                        y='Count',
+                        title=f'Phân bố tín chỉ sinh viên - {sem_name}',
+                        labels={'Count': 'Số sinh viên'},
+                        color_discrete_sequence=['#667eea']
+                    )
+                    fig.update_layout(bargap=0)
+                    st.plotly_chart(fig, use_container_width=True)
+                
+                # Trạng thái yêu cầu trong học kỳ (từ bảng tổng hợp theo lớp)
+                status_mix = get_semester_status_mix(sem_id)
+                if status_mix['Count'].sum() > 0 and within_budget("Biểu đồ trạng thái"):
+                    import plotly.express as px
+                    
+                    fig = px.pie(
+                        status_mix,
+                        values='Count',
+                        names='Status',
+                        title=f'Trạng thái yêu cầu - {sem_name}',
+                        color='Status',
+                        color_discrete_map={
+                            'Approved': '#28a745',
+                            'Pending': '#ffc107',
+                            'Rejected': '#dc3545',
+                            'Withdrawn': '#6c757d'
+                        }
+                    )
+                    st.plotly_chart(fig, use_container_width=True)
     
     with tab2:
         st.subheader("📈 Thống kê môn học")
@@ -543,15 +440,37 @@ elif menu == "📊 Thống kê":
                         st.markdown("### 📚 Môn học của bạn")
                         st. dataframe(my_stats, use_container_width=True, hide_index=True)
                         
-                        fig = px.bar(
-                            my_stats,
-                            x='Title',
-                            y='StudentCount',
-                            title='Số lượng sinh viên đăng ký môn của bạn',
-                            color='StudentCount',
-                            color_continuous_scale='Blues'
-                        )
-                        st.plotly_chart(fig, use_container_width=True)
+                        if within_budget("Biểu đồ số sinh viên"):
+                            import plotly.express as px
+                        
+                            fig = px.bar(
+                                my_stats,
+                                x='Title',
+                                y='StudentCount',
+                                title='Số lượng sinh viên đăng ký môn của bạn',
+                                color='StudentCount',
+                                color_continuous_scale='Blues'
+                            )
+                            st.plotly_chart(fig, use_container_width=True)
+                
+                # Phân bố số sinh viên mỗi môn trong học kỳ (đã chia nhóm trên server)
+                distributions = get_semester_distributions(sem_id)
+                if distributions is not None and not distributions['course_sizes'].empty and within_budget("Biểu đồ sĩ số môn"):
+                    import plotly.express as px
+                    
+                    course_sizes = distributions['course_sizes']
+                    course_sizes['Số sinh viên'] = course_sizes.apply(lambda b: f"{b['From']:.0f}–{b['To']:.0f}", axis=1)
+                    
+                    fig = px.bar(
+                        course_sizes,
+                        x='Số sinh viên',
+                        y='Count',
+                        title=f'Phân bố sĩ số các môn - {sem_name}',
+                        labels={'Count': 'Số môn'},
+                        color_discrete_sequence=['#764ba2']
+                    )
+                    fig.update_layout(bargap=0)
+                    st.plotly_chart(fig, use_container_width=True)
                 
                 st.markdown("---")
                 st.markdown("### 🌐 Tất cả môn học")
@@ -1,6 +1,6 @@
 import streamlit as st
 from datetime import date
-from database import execute_query, execute_procedure
+from database import execute_query, update_activity_status, submit_query, submit_batch, gather, begin_rerun, within_budget
 from styles import get_common_styles
 
 st.set_page_config(page_title="Staff Dashboard", page_icon="👔", layout="wide")
@@ -12,6 +12,9 @@ if 'logged_in' not in st.session_state or not st.session_state.logged_in or st.s
         st.switch_page("pages/1_Login.py")
     st.stop()
 
+# Huỷ truy vấn còn chạy từ lần rerun trước và bắt đầu ngân sách thời gian
+begin_rerun()
+
 # Apply styles
 st.markdown(get_common_styles(), unsafe_allow_html=True)
 
@@ -49,7 +52,8 @@ with st.sidebar:
                 "📚 Courses",
                 "🗓️ Semesters",
                 "🏢 Organizations",
-                "🎓 Programs"
+                "🎓 Programs",
+                "📈 Performance"
             ]
         )
     else:
@@ -74,11 +78,37 @@ if main_menu == "🏠 Dashboard":
     </div>
     """, unsafe_allow_html=True)
     
-    # Statistics
-    pending_enroll = execute_query("SELECT COUNT(*) as cnt FROM Activities WHERE ActivityType='Enrollment' AND RequestStatus='Pending'")
-    pending_withdraw = execute_query("SELECT COUNT(*) as cnt FROM Activities WHERE ActivityType='Withdrawal' AND RequestStatus='Pending'")
-    pending_delay = execute_query("SELECT COUNT(*) as cnt FROM Activities WHERE ActivityType='Exam_Delay' AND RequestStatus='Pending'")
-    total_pending = execute_query("SELECT COUNT(*) as cnt FROM Activities WHERE RequestStatus='Pending'")
+    # Statistics (một round trip cho cả 4 bộ đếm, song song với hoạt động gần đây)
+    stats_future = submit_batch([
+        "SELECT COUNT(*) as cnt FROM Activities WHERE ActivityType='Enrollment' AND RequestStatus='Pending'",
+        "SELECT COUNT(*) as cnt FROM Activities WHERE ActivityType='Withdrawal' AND RequestStatus='Pending'",
+        "SELECT COUNT(*) as cnt FROM Activities WHERE ActivityType='Exam_Delay' AND RequestStatus='Pending'",
+        "SELECT COUNT(*) as cnt FROM Activities WHERE RequestStatus='Pending'"
+    ])
+    recent_future = submit_query("""
+        SELECT TOP 20
+            A.ActivityID,
+            A.ActivityType,
+            A.StudentID,
+            dbo.GetFullName(A.StudentID) as StudentName,
+            C.Course_Code,
+            C.Title,
+            A.RequestStatus,
+            CONVERT(VARCHAR, A. Submission_Date, 23) as SubmitDate
+        FROM Activities A
+        JOIN Courses C ON A.CourseID = C.CourseID
+        ORDER BY A.Submission_Date DESC
+    """)
+    
+    pending_enroll, pending_withdraw, pending_delay, total_pending = gather(stats_future)[0]
+    
+    # Hoạt động gần đây là panel phụ: chỉ chờ nó khi các bộ đếm xong mà vẫn còn ngân sách thời gian
+    # (nếu chưa chạy thì hủy; câu lệnh đang chạy bị hủy ở lần rerun sau hoặc khi hết timeout)
+    if recent_future.done() or within_budget():
+        recent = gather(recent_future)[0]
+    else:
+        recent_future.cancel()
+        recent = None
     
     col1, col2, col3, col4 = st.columns(4)
     
@@ -117,22 +147,9 @@ if main_menu == "🏠 Dashboard":
     # Recent activities
     st.markdown("## 📋 Hoạt động gần đây")
     
-    recent = execute_query("""
-        SELECT TOP 20
-            A.ActivityID,
-            A.ActivityType,
-            A.StudentID,
-            dbo.GetFullName(A.StudentID) as StudentName,
-            C.Course_Code,
-            C.Title,
-            A.RequestStatus,
-            CONVERT(VARCHAR, A. Submission_Date, 23) as SubmitDate
-        FROM Activities A
-        JOIN Courses C ON A.CourseID = C.CourseID
-        ORDER BY A.Submission_Date DESC
-    """)
-    
-    if not recent.empty:
+    if recent is None:
+        within_budget("Hoạt động gần đây")
+    elif not recent.empty:
         st. dataframe(recent, use_container_width=True, hide_index=True)
     else:
         st.info("📭 Chưa có hoạt động")
@@ -156,6 +173,8 @@ elif main_menu == "📋 Duyệt yêu cầu":
         query = f"""
             SELECT 
                 A.ActivityID,
+                A.CourseID,
+                A.SemesterID,
                 A. StudentID,
                 dbo.GetFullName(A.StudentID) as StudentName,
                 C. Course_Code,
@@ -210,9 +229,9 @@ elif main_menu == "📋 Duyệt yêu cầu":
                             
                             with col_a:
                                 if st.button("✅", key=f"app_e_{activity['ActivityID']}", help="Duyệt"):
-                                    success, msg = execute_procedure(
-                                        "EXEC UpdateActivityStatus @p_ActivityID=?, @p_NewStatus=?, @p_StaffID=?",
-                                        (activity['ActivityID'], 'Approved', st.session_state.user_id)
+                                    success, msg = update_activity_status(
+                                        activity['ActivityID'], 'Approved', st.session_state.user_id,
+                                        activity['StudentID'], activity['CourseID'], activity['SemesterID'], 'Enrollment'
                                     )
                                     if success:
                                         st. success("✅ Đã duyệt!")
@@ -222,9 +241,9 @@ elif main_menu == "📋 Duyệt yêu cầu":
                             
                             with col_b:
                                 if st. button("❌", key=f"rej_e_{activity['ActivityID']}", help="Từ chối"):
-                                    success, msg = execute_procedure(
-                                        "EXEC UpdateActivityStatus @p_ActivityID=?, @p_NewStatus=?, @p_StaffID=? ",
-                                        (activity['ActivityID'], 'Rejected', st.session_state.user_id)
+                                    success, msg = update_activity_status(
+                                        activity['ActivityID'], 'Rejected', st.session_state.user_id,
+                                        activity['StudentID'], activity['CourseID'], activity['SemesterID'], 'Enrollment'
                                     )
                                     if success:
                                         st.success("✅ Đã từ chối!")
@@ -246,6 +265,8 @@ elif main_menu == "📋 Duyệt yêu cầu":
         query = f"""
             SELECT 
                 A.ActivityID,
+                A.CourseID,
+                A.SemesterID,
                 A.StudentID,
                 dbo.GetFullName(A. StudentID) as StudentName,
                 C.Course_Code,
@@ -297,9 +318,9 @@ elif main_menu == "📋 Duyệt yêu cầu":
                             
                             with col_a:
                                 if st. button("✅", key=f"app_w_{activity['ActivityID']}", help="Duyệt"):
-                                    success, msg = execute_procedure(
-                                        "EXEC UpdateActivityStatus @p_ActivityID=?, @p_NewStatus=?, @p_StaffID=?",
-                                        (activity['ActivityID'], 'Approved', st.session_state.user_id)
+                                    success, msg = update_activity_status(
+                                        activity['ActivityID'], 'Approved', st.session_state.user_id,
+                                        activity['StudentID'], activity['CourseID'], activity['SemesterID'], 'Withdrawal'
                                     )
                                     if success:
                                         st.success("✅ Đã duyệt!")
@@ -309,9 +330,9 @@ elif main_menu == "📋 Duyệt yêu cầu":
                             
                             with col_b:
                                 if st.button("❌", key=f"rej_w_{activity['ActivityID']}", help="Từ chối"):
-                                    success, msg = execute_procedure(
-                                        "EXEC UpdateActivityStatus @p_ActivityID=?, @p_NewStatus=?, @p_StaffID=?",
-                                        (activity['ActivityID'], 'Rejected', st.session_state. user_id)
+                                    success, msg = update_activity_status(
+                                        activity['ActivityID'], 'Rejected', st.session_state.user_id,
+                                        activity['StudentID'], activity['CourseID'], activity['SemesterID'], 'Withdrawal'
                                     )
                                     if success:
                                         st.success("✅ Đã từ chối!")
@@ -333,6 +354,8 @@ elif main_menu == "📋 Duyệt yêu cầu":
         query = f"""
             SELECT 
                 A.ActivityID,
+                A.CourseID,
+                A.SemesterID,
                 A. StudentID,
                 dbo. GetFullName(A.StudentID) as StudentName,
                 C.Course_Code,
@@ -391,9 +414,9 @@ elif main_menu == "📋 Duyệt yêu cầu":
                             
                             with col_a:
                                 if st. button("✅", key=f"app_d_{activity['ActivityID']}", help="Duyệt"):
-                                    success, msg = execute_procedure(
-                                        "EXEC UpdateActivityStatus @p_ActivityID=?, @p_NewStatus=?, @p_StaffID=?",
-                                        (activity['ActivityID'], 'Approved', st.session_state.user_id)
+                                    success, msg = update_activity_status(
+                                        activity['ActivityID'], 'Approved', st.session_state.user_id,
+                                        activity['StudentID'], activity['CourseID'], activity['SemesterID'], 'Exam_Delay'
                                     )
                                     if success:
                                         st.success("✅ Đã duyệt!")
@@ -403,9 +426,9 @@ elif main_menu == "📋 Duyệt yêu cầu":
                             
                             with col_b:
                                 if st.button("❌", key=f"rej_d_{activity['ActivityID']}", help="Từ chối"):
-                                    success, msg = execute_procedure(
-                                        "EXEC UpdateActivityStatus @p_ActivityID=?, @p_NewStatus=?, @p_StaffID=?",
-                                        (activity['ActivityID'], 'Rejected', st.session_state. user_id)
+                                    success, msg = update_activity_status(
+                                        activity['ActivityID'], 'Rejected', st.session_state.user_id,
+                                        activity['StudentID'], activity['CourseID'], activity['SemesterID'], 'Exam_Delay'
                                     )
                                     if success:
                                         st.success("✅ Đã từ chối!")
@@ -446,4 +469,8 @@ elif main_menu == "⚙️ Quản trị Hệ thống":
     elif sub_menu == "🎓 Programs":         
         from staff_modules. programs import render_programs_management
         render_programs_management()
+    
+    elif sub_menu == "📈 Performance":
+        from staff_modules.performance import render_performance_dashboard
+        render_performance_dashboard()
         
\ No newline at end of file
@@ -0,0 +1,168 @@
+"""
+Course prerequisite graph with a precomputed transitive closure
+
+CoursePrerequisites rows (Source requires Target) form a DAG. Each course
+keeps two bitsets (Python ints, one bit per course):
+  - requires: every course it needs, directly or transitively
+  - unlocks:  every course that needs it, directly or transitively
+so "what does X require / unlock" and "would Source -> Target close a
+cycle" are single lookups. Inserts update the closure incrementally;
+deletes recompute only the courses that depended on the removed edge.
+database.get_prerequisite_graph() keeps one graph per process.
+"""
+
+import logging
+import threading
+
+
+class PrerequisiteCycleError(ValueError):
+    """Adding the edge would make a course (transitively) require itself"""
+
+
+def _bits(mask):
+    """Positions of the set bits of mask"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class PrerequisiteGraph:
+    """Thread-safe prerequisite DAG; reads never take the lock"""
+
+    def __init__(self, pairs=()):
+        self._position = {}           # course -> bit position
+        self._courses = []            # bit position -> course
+        self._direct = {}             # course -> set of direct prerequisites
+        self._requires = {}           # course -> bitset of transitive prerequisites
+        self._unlocks = {}            # course -> bitset of transitive dependents
+        self._lock = threading.Lock()
+        self._logger = logging.getLogger("lms.prerequisites")
+
+        for source, target in pairs:
+            try:
+                self.add(source, target)
+            except PrerequisiteCycleError:
+                self._logger.warning("ignoring prerequisite %s -> %s: it closes a cycle", source, target)
+
+    # -------------------------------------------------------------------------
+    # Queries
+    # -------------------------------------------------------------------------
+    def requires(self, course_id):
+        """Every course needed before course_id, transitively"""
+        return self._courses_of(self._requires.get(int(course_id), 0))
+
+    def unlocks(self, course_id):
+        """Every course that needs course_id, transitively"""
+        return self._courses_of(self._unlocks.get(int(course_id), 0))
+
+    def direct(self, course_id):
+        """Direct prerequisites of course_id"""
+        return set(self._direct.get(int(course_id), ()))
+
+    def direct_map(self):
+        """{course: set of direct prerequisites}, a copy"""
+        return {course: set(required) for course, required in self._direct.items() if required}
+
+    def has_edge(self, source, target):
+        return int(target) in self._direct.get(int(source), ())
+
+    def creates_cycle(self, source, target):
+        """True if 'source requires target' would make a course require itself"""
+        source, target = int(source), int(target)
+        if source == target:
+            return True
+        source_bit = self._position.get(source)
+        return source_bit is not None and bool(self._requires.get(target, 0) >> source_bit & 1)
+
+    def __len__(self):
+        return sum(len(required) for required in self._direct.values())
+
+    # -------------------------------------------------------------------------
+    # Updates
+    # -------------------------------------------------------------------------
+    def add(self, source, target):
+        """Record 'source requires target', updating the closure in place"""
+        source, target = int(source), int(target)
+        with self._lock:
+            if self.creates_cycle(source, target):
+                raise PrerequisiteCycleError(f"{source} -> {target}")
+            if target in self._direct.get(source, ()):
+                return
+
+            self._direct.setdefault(source, set()).add(target)
+            source_bit, target_bit = self._bit(source), self._bit(target)
+
+            # source and everything that needs it now need target and its closure
+            gained = 1 << target_bit | self._requires.get(target, 0)
+            dependents = 1 << source_bit | self._unlocks.get(source, 0)
+            for position in _bits(dependents):
+                course = self._courses[position]
+                self._requires[course] = self._requires.get(course, 0) | gained
+            for position in _bits(gained):
+                course = self._courses[position]
+                self._unlocks[course] = self._unlocks.get(course, 0) | dependents
+
+    def remove(self, source, target):
+        """Drop 'source requires target' and recompute what depended on it"""
+        source, target = int(source), int(target)
+        with self._lock:
+            required = self._direct.get(source)
+            if not required or target not in required:
+                return
+            required.discard(target)
+            self._recompute(1 << self._bit(source) | self._unlocks.get(source, 0))
+
+    def remove_course(self, course_id):
+        """Drop a deleted course and every edge touching it"""
+        course_id = int(course_id)
+        with self._lock:
+            if course_id not in self._position:
+                return
+            affected = self._unlocks.get(course_id, 0)
+            self._direct.pop(course_id, None)
+            for required in self._direct.values():
+                required.discard(course_id)
+            self._requires[course_id] = 0
+            self._unlocks[course_id] = 0
+            self._recompute(affected)
+
+    # -------------------------------------------------------------------------
+    # Internals
+    # -------------------------------------------------------------------------
+    def _bit(self, course_id):
+        position = self._position.get(course_id)
+        if position is None:
+            position = self._position[course_id] = len(self._courses)
+            self._courses.append(course_id)
+        return position
+
+    def _courses_of(self, mask):
+        return {self._courses[position] for position in _bits(mask)}
+
+    def _recompute(self, affected):
+        """Rebuild requires for the affected courses, then every unlocks set"""
+        done = {}
+
+        def closure(course):
+            if course in done:
+                return done[course]
+            mask = 0
+            for required in self._direct.get(course, ()):
+                position = self._position[required]
+                mask |= 1 << position
+                mask |= closure(required) if affected >> position & 1 else self._requires.get(required, 0)
+            done[course] = mask
+            return mask
+
+        for position in _bits(affected):
+            course = self._courses[position]
+            self._requires[course] = closure(course)
+
+        unlocks = {}
+        for course, mask in self._requires.items():
+            bit = 1 << self._position[course]
+            for position in _bits(mask):
+                required = self._courses[position]
+                unlocks[required] = unlocks.get(required, 0) | bit
+        self._unlocks = unlocks
@@ -0,0 +1,104 @@
+"""
+Registration pre-checks run before InsertActivity (🛒 Giỏ đăng ký)
+
+Mirrors the procedure's rules so that most requests it would reject never
+cost a round trip, a rollback and a rerun:
+  - one request per (course, semester, activity type)    -> duplicate key
+  - approved + pending enrollment credits <= the maximum -> 50019
+  - every prerequisite approved in an earlier semester   -> 50003
+The checks run on cached state (database.get_registration_state and
+get_registration_rules); the procedure stays authoritative.
+"""
+
+from collections import namedtuple
+
+# code is the database error the procedure would have raised
+Violation = namedtuple('Violation', ['code', 'message'])
+
+DUPLICATE = 'unique_student_course_activity'
+CREDIT_CAP = '50019'
+PREREQUISITE = '50003'
+
+
+class StudentState:
+    """A student's activities, reduced to what the rules read"""
+
+    def __init__(self, activities):
+        self._requests = set()          # (course, semester, type)
+        self._credits = {}              # semester -> approved + pending enrollment credits
+        self._passed = {}               # course -> earliest start of an approved enrollment
+        self._status = {}               # course -> (start, status) of the latest enrollment
+
+        for row in activities:
+            course_id, semester_id = int(row.CourseID), int(row.SemesterID)
+            self._requests.add((course_id, semester_id, row.ActivityType))
+
+            if row.ActivityType != 'Enrollment':
+                continue
+
+            if row.RequestStatus in ('Approved', 'Pending'):
+                self._credits[semester_id] = self._credits.get(semester_id, 0) + int(row.Credit)
+            if row.RequestStatus == 'Approved':
+                passed = self._passed.get(course_id)
+                self._passed[course_id] = row.Start_Date if passed is None else min(passed, row.Start_Date)
+
+            latest = self._status.get(course_id)
+            if latest is None or row.Start_Date >= latest[0]:
+                self._status[course_id] = (row.Start_Date, row.RequestStatus)
+
+    def has_request(self, course_id, semester_id, activity_type):
+        return (int(course_id), int(semester_id), activity_type) in self._requests
+
+    def requested_credits(self, semester_id):
+        """Approved + pending enrollment credits, as InsertActivity counts them"""
+        return self._credits.get(int(semester_id), 0)
+
+    def passed_before(self, course_id, start_date):
+        """True when the course was approved in a semester starting before start_date"""
+        passed = self._passed.get(int(course_id))
+        return passed is not None and passed < start_date
+
+    def enrollment_status(self, course_id):
+        """RequestStatus of the most recent enrollment in the course, or None"""
+        latest = self._status.get(int(course_id))
+        return latest[1] if latest else None
+
+
+class RegistrationRules:
+    """Enrollment checks over a prerequisite table and a credit cap"""
+
+    def __init__(self, prerequisites, max_credits):
+        self.prerequisites = prerequisites      # course -> set of required courses
+        self.max_credits = max_credits
+
+    @classmethod
+    def from_pairs(cls, pairs, max_credits):
+        """Build from (SourceCourseID, TargetCourseID) rows: Source requires Target"""
+        prerequisites = {}
+        for source, target in pairs:
+            prerequisites.setdefault(int(source), set()).add(int(target))
+        return cls(prerequisites, max_credits)
+
+    def missing_prerequisites(self, state, course_id, semester_start):
+        return sorted(
+            required for required in self.prerequisites.get(int(course_id), ())
+            if not state.passed_before(required, semester_start)
+        )
+
+    def check_enrollment(self, state, course_id, credit, semester_id, semester_start, planned_credits=0):
+        """First rule an enrollment would break, as a Violation, or None
+
+        planned_credits counts courses already queued for the semester
+        (e.g. the cart) but not yet sent.
+        """
+        if state.has_request(course_id, semester_id, 'Enrollment'):
+            return Violation(DUPLICATE, "⚠️ Đã đăng ký môn này trong học kỳ")
+
+        total = state.requested_credits(semester_id) + planned_credits + int(credit)
+        if total > self.max_credits:
+            return Violation(CREDIT_CAP, f"❌ Vượt quá {self.max_credits} tín chỉ (sau khi thêm: {total} TC)")
+
+        if self.missing_prerequisites(state, course_id, semester_start):
+            return Violation(PREREQUISITE, "❌ Chưa hoàn thành môn tiên quyết")
+
+        return None
@@ -0,0 +1,1093 @@
+"""
+SQLite stand-in for UniversityDB (local benchmarks and regression runs)
+
+Exposes the small part of the pyodbc interface database.py uses
+(connect, Error, cursor/execute/fetchmany/nextset/cancel, autocommit,
+timeout) and translates the T-SQL the pages send: dbo. prefixes, TOP n,
+CONVERT(VARCHAR, x, 23), ISNULL, the scalar UDFs and EXEC of the stored
+procedures, which are implemented in Python with the same error numbers.
+
+Select it with LMS_DB_BACKEND=sqlite (see DB_CONFIG in database.py).
+Create and seed a database file with:  python sqlite_backend.py --init
+"""
+
+import argparse
+import datetime
+import os
+import random
+import re
+import sqlite3
+import threading
+import time
+
+# =============================================================================
+# SCHEMA
+# =============================================================================
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS Users (
+    UserID INTEGER PRIMARY KEY AUTOINCREMENT,
+    FName TEXT NOT NULL,
+    LName TEXT NOT NULL,
+    Email_Address TEXT NOT NULL UNIQUE,
+    Phone_Number TEXT
+);
+
+CREATE TABLE IF NOT EXISTS Education_Centers (
+    CenterID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Name TEXT NOT NULL,
+    Phone_Number TEXT
+);
+
+CREATE TABLE IF NOT EXISTS Departments (
+    DepartmentID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Name TEXT NOT NULL,
+    Office_Location TEXT,
+    Phone_Number TEXT,
+    CenterID INTEGER REFERENCES Education_Centers(CenterID)
+);
+
+CREATE TABLE IF NOT EXISTS Students (
+    UserID INTEGER PRIMARY KEY REFERENCES Users(UserID),
+    Birthday DATE
+);
+
+CREATE TABLE IF NOT EXISTS Professors (
+    UserID INTEGER PRIMARY KEY REFERENCES Users(UserID),
+    Office_Location TEXT,
+    DepartmentID INTEGER REFERENCES Departments(DepartmentID)
+);
+
+CREATE TABLE IF NOT EXISTS Staff (
+    UserID INTEGER PRIMARY KEY REFERENCES Users(UserID),
+    Role TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS Courses (
+    CourseID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Course_Code TEXT NOT NULL UNIQUE,
+    Title TEXT NOT NULL,
+    Description TEXT,
+    Credit INTEGER NOT NULL,
+    Passing_Score INTEGER NOT NULL DEFAULT 50,
+    DepartmentID INTEGER REFERENCES Departments(DepartmentID)
+);
+
+CREATE TABLE IF NOT EXISTS CoursePrerequisites (
+    SourceCourseID INTEGER NOT NULL REFERENCES Courses(CourseID),
+    TargetCourseID INTEGER NOT NULL REFERENCES Courses(CourseID),
+    PRIMARY KEY (SourceCourseID, TargetCourseID)
+);
+
+CREATE TABLE IF NOT EXISTS Semesters (
+    SemesterID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Semester_Name TEXT NOT NULL,
+    Start_Date DATE NOT NULL,
+    End_Date DATE NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS Professor_Course (
+    ProfessorID INTEGER NOT NULL REFERENCES Professors(UserID),
+    CourseID INTEGER NOT NULL REFERENCES Courses(CourseID),
+    SemesterID INTEGER NOT NULL REFERENCES Semesters(SemesterID),
+    PRIMARY KEY (ProfessorID, CourseID, SemesterID)
+);
+
+CREATE TABLE IF NOT EXISTS Degree_Programs (
+    ProgramID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Code TEXT NOT NULL UNIQUE,
+    Name TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS Specializations (
+    SpecializationID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Proj_ID TEXT NOT NULL UNIQUE,
+    Name TEXT NOT NULL,
+    Start_Date DATE,
+    ProgramID INTEGER NOT NULL REFERENCES Degree_Programs(ProgramID)
+);
+
+CREATE TABLE IF NOT EXISTS Student_Program (
+    StudentID INTEGER NOT NULL REFERENCES Students(UserID),
+    ProgramID INTEGER NOT NULL REFERENCES Degree_Programs(ProgramID),
+    Enrollment_Date DATE,
+    PRIMARY KEY (StudentID, ProgramID)
+);
+
+CREATE TABLE IF NOT EXISTS Activities (
+    ActivityID INTEGER PRIMARY KEY AUTOINCREMENT,
+    StudentID INTEGER NOT NULL REFERENCES Students(UserID),
+    CourseID INTEGER NOT NULL REFERENCES Courses(CourseID),
+    SemesterID INTEGER NOT NULL REFERENCES Semesters(SemesterID),
+    ActivityType TEXT NOT NULL CHECK (ActivityType IN ('Enrollment', 'Withdrawal', 'Exam_Delay')),
+    RequestStatus TEXT NOT NULL DEFAULT 'Pending' CHECK (RequestStatus IN ('Pending', 'Approved', 'Rejected')),
+    Submission_Date DATE NOT NULL,
+    Credit INTEGER,
+    StaffID INTEGER REFERENCES Staff(UserID)
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS unique_student_course_activity
+    ON Activities (StudentID, CourseID, SemesterID, ActivityType);
+CREATE INDEX IF NOT EXISTS IX_Activities_Student ON Activities (StudentID, SemesterID, ActivityType, RequestStatus);
+CREATE INDEX IF NOT EXISTS IX_Activities_Course ON Activities (CourseID, SemesterID, ActivityType, RequestStatus);
+CREATE INDEX IF NOT EXISTS IX_Activities_Status ON Activities (RequestStatus, ActivityType, Submission_Date);
+CREATE INDEX IF NOT EXISTS IX_Activities_History ON Activities (StudentID, Submission_Date, ActivityID);
+
+CREATE TABLE IF NOT EXISTS Exam_Delays (
+    ActivityID INTEGER PRIMARY KEY REFERENCES Activities(ActivityID),
+    Reason TEXT NOT NULL,
+    Old_Exam_Date DATE NOT NULL,
+    Requested_New_Exam_Date DATE NOT NULL
+);
+"""
+
+# Credit limits enforced by the procedures (same as the SQL Server version)
+MIN_CREDITS = 14
+MAX_CREDITS = 21
+
+sqlite3.register_adapter(datetime.date, lambda d: d.isoformat())
+sqlite3.register_adapter(datetime.datetime, lambda d: d.isoformat(sep=' '))
+sqlite3.register_converter("DATE", lambda b: datetime.date.fromisoformat(b.decode()[:10]))
+
+_init_lock = threading.Lock()
+
+# =============================================================================
+# ERRORS
+# =============================================================================
+class Error(Exception):
+    """Driver error; args[0] is an ODBC-style SQLSTATE like pyodbc.Error"""
+
+
+class ProcedureError(Exception):
+    """RAISERROR inside a stored procedure"""
+
+    def __init__(self, number, message):
+        super().__init__(number, message)
+        self.number = number
+        self.message = message
+
+
+def _driver_error(e, timed_out=False):
+    if isinstance(e, ProcedureError):
+        return Error('42000', f"[42000] [SQLite]{e.message} ({e.number})")
+
+    text = str(e)
+    if isinstance(e, sqlite3.OperationalError) and 'interrupted' in text:
+        state = 'HYT00' if timed_out else 'HY008'
+        text = 'Query timeout expired' if timed_out else 'Operation canceled'
+    elif isinstance(e, sqlite3.IntegrityError):
+        state = '23000'
+    elif isinstance(e, sqlite3.ProgrammingError) and 'closed' in text:
+        state = '08003'
+    elif isinstance(e, sqlite3.OperationalError) and 'locked' in text:
+        state = 'HYT00'
+    else:
+        state = '42000'
+    return Error(state, f"[{state}] [SQLite]{text}")
+
+# =============================================================================
+# T-SQL TRANSLATION
+# =============================================================================
+# Bodies of the scalar UDFs, inlined as correlated subqueries
+FUNCTIONS = {
+    'GetFullName': (
+        "(SELECT _fn.FName || ' ' || _fn.LName FROM Users _fn WHERE _fn.UserID = {0})"
+    ),
+    'GetStudentCountByCourse': (
+        "(SELECT COUNT(DISTINCT _sc.StudentID) FROM Activities _sc"
+        " WHERE _sc.CourseID = {0} AND _sc.ActivityType = 'Enrollment' AND _sc.RequestStatus = 'Approved')"
+    ),
+    'GetTotalCredits': (
+        "(SELECT IFNULL(SUM(CASE _tc.ActivityType WHEN 'Enrollment' THEN _tc.Credit ELSE -_tc.Credit END), 0)"
+        " FROM Activities _tc WHERE _tc.StudentID = {0} AND _tc.SemesterID = {1}"
+        " AND _tc.RequestStatus = 'Approved' AND _tc.ActivityType IN ('Enrollment', 'Withdrawal'))"
+    )
+}
+
+_TOKEN_PATTERN = re.compile(r"'(?:[^']|'')*'|--[^\n]*|/\*.*?\*/|\?|;", re.S)
+_DBO_PATTERN = re.compile(r'\bdbo\s*\.\s*', re.I)
+_FUNCTION_CALL_PATTERN = re.compile(r'\b(' + '|'.join(FUNCTIONS) + r')\s*\(([^()]*)\)', re.I)
+_BARE_NAME_PATTERN = re.compile(r'^(?!NULL$)[A-Za-z_]\w*$', re.I)
+_CONVERT_DATE_PATTERN = re.compile(
+    r'\bCONVERT\s*\(\s*N?VARCHAR(?:\s*\(\s*\d+\s*\))?\s*,\s*([^,()]+?)\s*,\s*23\s*\)', re.I
+)
+_CAST_DATE_PATTERN = re.compile(r'\bCAST\s*\(\s*([^()]+?)\s+AS\s+DATE\s*\)', re.I)
+_TOP_PATTERN = re.compile(r'\bSELECT(\s+DISTINCT)?\s+TOP\s*(?:\(\s*(\d+|\?)\s*\)|(\d+|\?))', re.I)
+_OFFSET_PATTERN = re.compile(
+    r'\bOFFSET\s+(\d+|\?)\s+ROWS?\s+FETCH\s+(?:NEXT|FIRST)\s+(\d+|\?)\s+ROWS?\s+ONLY', re.I
+)
+_NOCOUNT_PATTERN = re.compile(r'^\s*SET\s+NOCOUNT\s+(ON|OFF)\s*$', re.I)
+_EXEC_PATTERN = re.compile(r'^\s*EXEC(?:UTE)?\s+(?:dbo\s*\.\s*)?(\w+)\s*(.*)$', re.I | re.S)
+_EXEC_ARG_PATTERN = re.compile(r"\s*(?:@(\w+)\s*=\s*)?(\?|'(?:[^']|'')*'|-?\d+(?:\.\d+)?|NULL)\s*(?:,|$)", re.I)
+_REPLACEMENTS = [
+    (re.compile(r'\bISNULL\s*\(', re.I), 'IFNULL('),
+    (re.compile(r'\bLEN\s*\(', re.I), 'LENGTH('),
+    (re.compile(r'\bGETDATE\s*\(\s*\)', re.I), "datetime('now', 'localtime')"),
+    (re.compile(r'\bSCOPE_IDENTITY\s*\(\s*\)|@@IDENTITY', re.I), 'last_insert_rowid()'),
+    (re.compile(r"\bN'"), "'")
+]
+
+def split_statements(sql, params):
+    """Split a batch on ';' and hand each statement its share of the parameters"""
+    statements = []
+    start = 0
+    count = 0
+    offset = 0
+
+    for match in _TOKEN_PATTERN.finditer(sql):
+        token = match.group()
+        if token == '?':
+            count += 1
+        elif token == ';':
+            statements.append((sql[start:match.start()], params[offset:offset + count]))
+            offset += count
+            start, count = match.end(), 0
+    statements.append((sql[start:], params[offset:offset + count]))
+
+    return [(text, p) for text, p in statements if _strip_comments(text).strip()]
+
+def _strip_comments(sql):
+    return _TOKEN_PATTERN.sub(lambda m: '' if m.group().startswith(('--', '/*')) else m.group(), sql)
+
+def _placeholder_index(sql, position):
+    """Number of '?' placeholders before position (outside literals)"""
+    return sum(
+        1 for m in _TOKEN_PATTERN.finditer(sql)
+        if m.group() == '?' and m.start() < position
+    )
+
+def translate(sql, params):
+    """Rewrite one T-SQL statement (and its parameter order) for SQLite"""
+    params = list(params)
+    sql = _strip_comments(sql).strip()
+    sql = _DBO_PATTERN.sub('', sql)
+
+    def inline_function(match):
+        args = [a.strip() for a in match.group(2).split(',')] if match.group(2).strip() else []
+        # A bare column name would bind to the subquery's own table: call the
+        # registered function instead (see _register_functions)
+        if any(_BARE_NAME_PATTERN.match(a) for a in args):
+            return match.group()
+        body = FUNCTIONS[next(name for name in FUNCTIONS if name.lower() == match.group(1).lower())]
+        return body.format(*args)
+
+    sql = _FUNCTION_CALL_PATTERN.sub(inline_function, sql)
+    sql = _CONVERT_DATE_PATTERN.sub(r'date(\1)', sql)
+    sql = _CAST_DATE_PATTERN.sub(r'date(\1)', sql)
+    for pattern, replacement in _REPLACEMENTS:
+        sql = pattern.sub(replacement, sql)
+
+    # OFFSET n ROWS FETCH NEXT m ROWS ONLY -> LIMIT m OFFSET n (parameters swap places)
+    match = _OFFSET_PATTERN.search(sql)
+    if match:
+        if match.group(1) == '?' and match.group(2) == '?':
+            i = _placeholder_index(sql, match.start())
+            params[i], params[i + 1] = params[i + 1], params[i]
+        sql = sql[:match.start()] + f"LIMIT {match.group(2)} OFFSET {match.group(1)}" + sql[match.end():]
+
+    # SELECT TOP n ... -> SELECT ... LIMIT n (a TOP placeholder moves to the end)
+    match = _TOP_PATTERN.search(sql)
+    if match:
+        limit = match.group(2) or match.group(3)
+        if limit == '?':
+            params.append(params.pop(_placeholder_index(sql, match.start())))
+        sql = sql[:match.start()] + 'SELECT' + (match.group(1) or '') + sql[match.end():]
+        sql = f"{sql.rstrip()} LIMIT {limit}"
+
+    return sql, params
+
+def parse_exec(sql, params):
+    """(procedure name, {param name: value} or [values]) for an EXEC statement, else None"""
+    match = _EXEC_PATTERN.match(_strip_comments(sql).strip())
+    if not match:
+        return None
+
+    name, rest = match.group(1), match.group(2).strip()
+    named, positional = {}, []
+    values = iter(params)
+    pos = 0
+
+    while pos < len(rest):
+        arg = _EXEC_ARG_PATTERN.match(rest, pos)
+        if not arg or arg.end() == pos:
+            raise Error('42000', f"[42000] [SQLite]Cannot parse EXEC arguments: {rest}")
+        pos = arg.end()
+
+        raw = arg.group(2)
+        if raw == '?':
+            value = next(values)
+        elif raw.upper() == 'NULL':
+            value = None
+        elif raw.startswith("'"):
+            value = raw[1:-1].replace("''", "'")
+        else:
+            value = float(raw) if '.' in raw else int(raw)
+
+        if arg.group(1):
+            named[arg.group(1)] = value
+        else:
+            positional.append(value)
+
+    return name, named, positional
+
+# =============================================================================
+# STORED PROCEDURES
+# =============================================================================
+PROCEDURES = {}
+
+def procedure(func):
+    """Register a Python implementation under the T-SQL procedure name"""
+    PROCEDURES[func.__name__] = func
+    return func
+
+def _value(db, sql, *params):
+    row = db.execute(sql, params).fetchone()
+    return row[0] if row else None
+
+def _exists(db, sql, *params):
+    return db.execute(sql, params).fetchone() is not None
+
+def _as_date(value):
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.date.fromisoformat(str(value)[:10])
+
+def _approved_credits(db, student_id, semester_id):
+    return _value(
+        db, f"SELECT {FUNCTIONS['GetTotalCredits'].format('?', '?')}", student_id, semester_id
+    )
+
+
+@procedure
+def InsertActivity(db, p_StudentID, p_CourseID, p_SubmissionDate, p_SemesterID, p_ActivityType):
+    if not _exists(db, "SELECT 1 FROM Students WHERE UserID = ?", p_StudentID):
+        raise ProcedureError(50007, "Student does not exist")
+    credit = _value(db, "SELECT Credit FROM Courses WHERE CourseID = ?", p_CourseID)
+    if credit is None:
+        raise ProcedureError(50011, "Course does not exist")
+    semester_start = _value(db, "SELECT Start_Date FROM Semesters WHERE SemesterID = ?", p_SemesterID)
+    if semester_start is None:
+        raise ProcedureError(50012, "Semester does not exist")
+
+    if _exists(db, """
+        SELECT 1 FROM Activities
+        WHERE StudentID = ? AND CourseID = ? AND SemesterID = ? AND ActivityType = ?
+    """, p_StudentID, p_CourseID, p_SemesterID, p_ActivityType):
+        raise ProcedureError(2627, "Violation of UNIQUE KEY constraint 'unique_student_course_activity'")
+
+    if p_ActivityType == 'Enrollment':
+        # Every prerequisite needs an approved enrollment in an earlier semester
+        missing = _value(db, """
+            SELECT COUNT(*) FROM CoursePrerequisites CP
+            WHERE CP.SourceCourseID = ?
+            AND NOT EXISTS (
+                SELECT 1 FROM Activities A
+                JOIN Semesters S ON A.SemesterID = S.SemesterID
+                WHERE A.StudentID = ? AND A.CourseID = CP.TargetCourseID
+                AND A.ActivityType = 'Enrollment' AND A.RequestStatus = 'Approved'
+                AND S.Start_Date < ?
+            )
+        """, p_CourseID, p_StudentID, semester_start)
+        if missing:
+            raise ProcedureError(50003, "Prerequisite not completed")
+
+        requested = _value(db, """
+            SELECT IFNULL(SUM(Credit), 0) FROM Activities
+            WHERE StudentID = ? AND SemesterID = ? AND ActivityType = 'Enrollment'
+            AND RequestStatus IN ('Approved', 'Pending')
+        """, p_StudentID, p_SemesterID)
+        if requested + credit > MAX_CREDITS:
+            raise ProcedureError(50019, "Total credits exceed the maximum")
+
+    elif p_ActivityType in ('Withdrawal', 'Exam_Delay'):
+        if not _exists(db, """
+            SELECT 1 FROM Activities
+            WHERE StudentID = ? AND CourseID = ? AND SemesterID = ?
+            AND ActivityType = 'Enrollment' AND RequestStatus = 'Approved'
+        """, p_StudentID, p_CourseID, p_SemesterID):
+            raise ProcedureError(50020, "No approved enrollment for this course")
+
+        if p_ActivityType == 'Withdrawal' and 0 < _approved_credits(db, p_StudentID, p_SemesterID) - credit < MIN_CREDITS:
+            raise ProcedureError(50001, "Total credits would fall below the minimum")
+
+    db.execute("""
+        INSERT INTO Activities (StudentID, CourseID, SemesterID, ActivityType, RequestStatus, Submission_Date, Credit)
+        VALUES (?, ?, ?, ?, 'Pending', ?, ?)
+    """, (p_StudentID, p_CourseID, p_SemesterID, p_ActivityType, _as_date(p_SubmissionDate), credit))
+
+@procedure
+def UpdateActivityStatus(db, p_ActivityID, p_NewStatus, p_StaffID=None):
+    row = db.execute("""
+        SELECT StudentID, SemesterID, ActivityType, Credit FROM Activities WHERE ActivityID = ?
+    """, (p_ActivityID,)).fetchone()
+    if row is None:
+        raise ProcedureError(50020, "Activity does not exist")
+
+    student_id, semester_id, activity_type, credit = row
+    if p_NewStatus == 'Approved':
+        total = _approved_credits(db, student_id, semester_id)
+        if activity_type == 'Enrollment' and total + credit > MAX_CREDITS:
+            raise ProcedureError(50002, "Total credits would exceed the maximum")
+        if activity_type == 'Withdrawal' and 0 < total - credit < MIN_CREDITS:
+            raise ProcedureError(50001, "Total credits would fall below the minimum")
+
+    db.execute(
+        "UPDATE Activities SET RequestStatus = ?, StaffID = ? WHERE ActivityID = ?",
+        (p_NewStatus, p_StaffID, p_ActivityID)
+    )
+
+@procedure
+def InsertExamDelay(db, p_ActivityID, p_Reason, p_Old_Exam_Date, p_Requested_New_Exam_Date):
+    row = db.execute("""
+        SELECT S.Start_Date, S.End_Date FROM Activities A
+        JOIN Semesters S ON A.SemesterID = S.SemesterID
+        WHERE A.ActivityID = ?
+    """, (p_ActivityID,)).fetchone()
+    if row is None:
+        raise ProcedureError(50020, "Activity does not exist")
+
+    start, end = row
+    old_date, new_date = _as_date(p_Old_Exam_Date), _as_date(p_Requested_New_Exam_Date)
+    if not (start <= old_date <= end and start <= new_date <= end):
+        raise ProcedureError(50004, "Exam date outside the semester")
+
+    db.execute(
+        "INSERT INTO Exam_Delays (ActivityID, Reason, Old_Exam_Date, Requested_New_Exam_Date) VALUES (?, ?, ?, ?)",
+        (p_ActivityID, p_Reason, old_date, new_date)
+    )
+
+@procedure
+def GetCoursesWithStudentCount(db):
+    return db.execute(f"""
+        SELECT C.CourseID, C.Course_Code, C.Title, C.Credit,
+               {FUNCTIONS['GetStudentCountByCourse'].format('C.CourseID')} as StudentCount
+        FROM Courses C
+        ORDER BY C.Course_Code
+    """)
+
+@procedure
+def GetStudentsCreditsBySemester(db, p_SemesterID):
+    if not _exists(db, "SELECT 1 FROM Semesters WHERE SemesterID = ?", p_SemesterID):
+        raise ProcedureError(50012, "Semester does not exist")
+    return db.execute(f"""
+        SELECT S.UserID as StudentID,
+               {FUNCTIONS['GetFullName'].format('S.UserID')} as FullName,
+               COUNT(A.ActivityID) as CourseCount,
+               SUM(A.Credit) as TotalCredits
+        FROM Students S
+        JOIN Activities A ON A.StudentID = S.UserID
+        WHERE A.SemesterID = ? AND A.ActivityType = 'Enrollment' AND A.RequestStatus = 'Approved'
+        GROUP BY S.UserID
+        ORDER BY TotalCredits DESC, S.UserID
+    """, (p_SemesterID,))
+
+# --- Courses -----------------------------------------------------------------
+@procedure
+def InsertCourse(db, p_Passing_Score, p_Course_Code, p_Description, p_Title, p_Credit, p_DepartmentID):
+    db.execute("""
+        INSERT INTO Courses (Passing_Score, Course_Code, Description, Title, Credit, DepartmentID)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, (p_Passing_Score, p_Course_Code, p_Description, p_Title, p_Credit, p_DepartmentID))
+
+@procedure
+def UpdateCourse(db, p_CourseID, p_NewPassingScore=None, p_NewDescription=None, p_NewTitle=None, p_NewCredit=None):
+    if not _exists(db, "SELECT 1 FROM Courses WHERE CourseID = ?", p_CourseID):
+        raise ProcedureError(50011, "Course does not exist")
+    db.execute("""
+        UPDATE Courses SET
+            Passing_Score = COALESCE(?, Passing_Score),
+            Description = COALESCE(?, Description),
+            Title = COALESCE(?, Title),
+            Credit = COALESCE(?, Credit)
+        WHERE CourseID = ?
+    """, (p_NewPassingScore, p_NewDescription, p_NewTitle, p_NewCredit, p_CourseID))
+
+@procedure
+def DeleteCourse(db, p_CourseID):
+    if not _exists(db, "SELECT 1 FROM Courses WHERE CourseID = ?", p_CourseID):
+        raise ProcedureError(50011, "Course does not exist")
+    db.execute(
+        "DELETE FROM CoursePrerequisites WHERE SourceCourseID = ? OR TargetCourseID = ?",
+        (p_CourseID, p_CourseID)
+    )
+    db.execute("DELETE FROM Courses WHERE CourseID = ?", (p_CourseID,))
+
+@procedure
+def InsertCoursePrerequisite(db, p_SourceCourseID, p_TargetCourseID):
+    for course_id in (p_SourceCourseID, p_TargetCourseID):
+        if not _exists(db, "SELECT 1 FROM Courses WHERE CourseID = ?", course_id):
+            raise ProcedureError(50011, "Course does not exist")
+    db.execute(
+        "INSERT INTO CoursePrerequisites (SourceCourseID, TargetCourseID) VALUES (?, ?)",
+        (p_SourceCourseID, p_TargetCourseID)
+    )
+
+@procedure
+def DeleteCoursePrerequisite(db, p_SourceCourseID, p_TargetCourseID):
+    db.execute(
+        "DELETE FROM CoursePrerequisites WHERE SourceCourseID = ? AND TargetCourseID = ?",
+        (p_SourceCourseID, p_TargetCourseID)
+    )
+
+@procedure
+def AssignProfessorToCourse(db, p_ProfessorID, p_CourseID, p_SemesterID):
+    if not _exists(db, "SELECT 1 FROM Courses WHERE CourseID = ?", p_CourseID):
+        raise ProcedureError(50011, "Course does not exist")
+    if not _exists(db, "SELECT 1 FROM Semesters WHERE SemesterID = ?", p_SemesterID):
+        raise ProcedureError(50012, "Semester does not exist")
+    db.execute(
+        "INSERT INTO Professor_Course (ProfessorID, CourseID, SemesterID) VALUES (?, ?, ?)",
+        (p_ProfessorID, p_CourseID, p_SemesterID)
+    )
+
+# --- Semesters ---------------------------------------------------------------
+def semester_name(start_date):
+    """'yyN' naming used by the Semesters page: N = 1 from September, else 2"""
+    start = _as_date(start_date)
+    return f"{start.year % 100}{1 if start.month >= 9 else 2}"
+
+@procedure
+def InsertSemester(db, p_Start_Date, p_End_Date):
+    db.execute(
+        "INSERT INTO Semesters (Semester_Name, Start_Date, End_Date) VALUES (?, ?, ?)",
+        (semester_name(p_Start_Date), _as_date(p_Start_Date), _as_date(p_End_Date))
+    )
+
+@procedure
+def DeleteSemester(db, p_SemesterID):
+    if not _exists(db, "SELECT 1 FROM Semesters WHERE SemesterID = ?", p_SemesterID):
+        raise ProcedureError(50012, "Semester does not exist")
+    db.execute("DELETE FROM Semesters WHERE SemesterID = ?", (p_SemesterID,))
+
+# --- Users -------------------------------------------------------------------
+@procedure
+def InsertUser(db, p_LName, p_FName, p_Email_Address, p_Phone_Number=None):
+    db.execute(
+        "INSERT INTO Users (LName, FName, Email_Address, Phone_Number) VALUES (?, ?, ?, ?)",
+        (p_LName, p_FName, p_Email_Address, p_Phone_Number)
+    )
+
+@procedure
+def UpdateUser(db, p_UserID, p_NewLName=None, p_NewFName=None, p_NewEmail=None, p_NewPhone=None):
+    db.execute("""
+        UPDATE Users SET
+            LName = COALESCE(?, LName),
+            FName = COALESCE(?, FName),
+            Email_Address = COALESCE(?, Email_Address),
+            Phone_Number = COALESCE(?, Phone_Number)
+        WHERE UserID = ?
+    """, (p_NewLName, p_NewFName, p_NewEmail, p_NewPhone, p_UserID))
+
+@procedure
+def DeleteUser(db, p_UserID):
+    db.execute("DELETE FROM Users WHERE UserID = ?", (p_UserID,))
+
+@procedure
+def InsertStudent(db, p_UserID, p_Birthday=None):
+    db.execute(
+        "INSERT INTO Students (UserID, Birthday) VALUES (?, ?)",
+        (p_UserID, _as_date(p_Birthday) if p_Birthday else None)
+    )
+
+@procedure
+def UpdateStudent(db, p_UserID, p_NewBirthday=None):
+    if not _exists(db, "SELECT 1 FROM Students WHERE UserID = ?", p_UserID):
+        raise ProcedureError(50007, "Student does not exist")
+    if p_NewBirthday:
+        db.execute("UPDATE Students SET Birthday = ? WHERE UserID = ?", (_as_date(p_NewBirthday), p_UserID))
+
+@procedure
+def DeleteStudent(db, p_UserID):
+    if not _exists(db, "SELECT 1 FROM Students WHERE UserID = ?", p_UserID):
+        raise ProcedureError(50007, "Student does not exist")
+    db.execute("DELETE FROM Student_Program WHERE StudentID = ?", (p_UserID,))
+    db.execute("DELETE FROM Students WHERE UserID = ?", (p_UserID,))
+
+@procedure
+def InsertProfessor(db, p_UserID, p_Office_Location=None, p_DepartmentID=None):
+    db.execute(
+        "INSERT INTO Professors (UserID, Office_Location, DepartmentID) VALUES (?, ?, ?)",
+        (p_UserID, p_Office_Location, p_DepartmentID)
+    )
+
+@procedure
+def UpdateProfessor(db, p_UserID, p_NewOfficeLocation=None, p_NewDepartmentID=None):
+    db.execute("""
+        UPDATE Professors SET
+            Office_Location = COALESCE(?, Office_Location),
+            DepartmentID = COALESCE(?, DepartmentID)
+        WHERE UserID = ?
+    """, (p_NewOfficeLocation, p_NewDepartmentID, p_UserID))
+
+@procedure
+def DeleteProfessor(db, p_UserID):
+    db.execute("DELETE FROM Professor_Course WHERE ProfessorID = ?", (p_UserID,))
+    db.execute("DELETE FROM Professors WHERE UserID = ?", (p_UserID,))
+
+@procedure
+def InsertStaff(db, p_UserID, p_Role):
+    db.execute("INSERT INTO Staff (UserID, Role) VALUES (?, ?)", (p_UserID, p_Role))
+
+@procedure
+def UpdateStaff(db, p_UserID, p_NewRole):
+    db.execute("UPDATE Staff SET Role = ? WHERE UserID = ?", (p_NewRole, p_UserID))
+
+@procedure
+def DeleteStaff(db, p_UserID):
+    db.execute("DELETE FROM Staff WHERE UserID = ?", (p_UserID,))
+
+# --- Organizations and programs ----------------------------------------------
+@procedure
+def InsertEducationCenter(db, p_Name, p_Phone_Number=None):
+    db.execute("INSERT INTO Education_Centers (Name, Phone_Number) VALUES (?, ?)", (p_Name, p_Phone_Number))
+
+@procedure
+def DeleteEducationCenter(db, p_CenterID):
+    db.execute("DELETE FROM Education_Centers WHERE CenterID = ?", (p_CenterID,))
+
+@procedure
+def InsertDepartment(db, p_Name, p_Office_Location=None, p_Phone_Number=None, p_CenterID=None):
+    db.execute(
+        "INSERT INTO Departments (Name, Office_Location, Phone_Number, CenterID) VALUES (?, ?, ?, ?)",
+        (p_Name, p_Office_Location, p_Phone_Number, p_CenterID)
+    )
+
+@procedure
+def DeleteDepartment(db, p_DepartmentID):
+    db.execute("DELETE FROM Departments WHERE DepartmentID = ?", (p_DepartmentID,))
+
+@procedure
+def InsertDegreeProgram(db, p_Code, p_Name):
+    db.execute("INSERT INTO Degree_Programs (Code, Name) VALUES (?, ?)", (p_Code, p_Name))
+
+@procedure
+def DeleteDegreeProgram(db, p_ProgramID):
+    db.execute("DELETE FROM Student_Program WHERE ProgramID = ?", (p_ProgramID,))
+    db.execute("DELETE FROM Specializations WHERE ProgramID = ?", (p_ProgramID,))
+    db.execute("DELETE FROM Degree_Programs WHERE ProgramID = ?", (p_ProgramID,))
+
+@procedure
+def InsertSpecialization(db, p_Proj_ID, p_Start_Date, p_Name, p_ProgramID):
+    db.execute(
+        "INSERT INTO Specializations (Proj_ID, Start_Date, Name, ProgramID) VALUES (?, ?, ?, ?)",
+        (p_Proj_ID, _as_date(p_Start_Date) if p_Start_Date else None, p_Name, p_ProgramID)
+    )
+
+@procedure
+def DeleteSpecialization(db, p_SpecializationID):
+    db.execute("DELETE FROM Specializations WHERE SpecializationID = ?", (p_SpecializationID,))
+
+@procedure
+def EnrollStudentInProgram(db, p_StudentID, p_ProgramID, p_Enrollment_Date=None):
+    if not _exists(db, "SELECT 1 FROM Students WHERE UserID = ?", p_StudentID):
+        raise ProcedureError(50007, "Student does not exist")
+    db.execute(
+        "INSERT INTO Student_Program (StudentID, ProgramID, Enrollment_Date) VALUES (?, ?, ?)",
+        (p_StudentID, p_ProgramID, _as_date(p_Enrollment_Date or datetime.date.today()))
+    )
+
+# =============================================================================
+# DB-API WRAPPER
+# =============================================================================
+def _type_code(values):
+    """pyodbc-style Python type for a column, inferred from its values"""
+    kinds = {type(v) for v in values if v is not None}
+    if not kinds:
+        return str
+    if kinds == {int}:
+        return int
+    if kinds <= {int, float}:
+        return float
+    if len(kinds) == 1:
+        return kinds.pop()
+    return str
+
+
+class Cursor:
+    """Buffered cursor: every result set of a batch is read at execute()"""
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.description = None
+        self.rowcount = -1
+        self._sets = []
+        self._rows = []
+        self._pos = 0
+
+    def execute(self, sql, *params):
+        if len(params) == 1 and isinstance(params[0], (list, tuple)):
+            params = params[0]
+        self._sets = self.connection._run(sql, list(params))
+        self._load(0)
+        return self
+
+    def fetchone(self):
+        if self._pos >= len(self._rows):
+            return None
+        self._pos += 1
+        return self._rows[self._pos - 1]
+
+    def fetchmany(self, size=1):
+        rows = self._rows[self._pos:self._pos + size]
+        self._pos += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._rows[self._pos:]
+        self._pos = len(self._rows)
+        return rows
+
+    def nextset(self):
+        if not self._sets:
+            return False
+        self._load(1)
+        return bool(self._sets) or None
+
+    def cancel(self):
+        self.connection._cancel()
+
+    def close(self):
+        self._sets, self._rows = [], []
+
+    def _load(self, drop):
+        self._sets = self._sets[drop:]
+        if self._sets:
+            self.description, self._rows, self.rowcount = self._sets[0]
+        else:
+            self.description, self._rows, self.rowcount = None, [], -1
+        self._pos = 0
+
+
+class Connection:
+    """pyodbc-like connection over sqlite3 with explicit transactions"""
+
+    def __init__(self, raw, autocommit=True):
+        self._raw = raw
+        self.autocommit = autocommit
+        self.timeout = 0
+        self._deadline = None
+        self._cancelled = False
+        self._raw.set_progress_handler(self._progress, 1000)
+
+    def cursor(self):
+        return Cursor(self)
+
+    def commit(self):
+        if self._raw.in_transaction:
+            self._raw.execute("COMMIT")
+
+    def rollback(self):
+        if self._raw.in_transaction:
+            self._raw.execute("ROLLBACK")
+
+    def close(self):
+        self._raw.close()
+
+    def _progress(self):
+        if self._cancelled:
+            return 1
+        return 1 if self._deadline is not None and time.monotonic() > self._deadline else 0
+
+    def _cancel(self):
+        self._cancelled = True
+        try:
+            self._raw.interrupt()
+        except sqlite3.ProgrammingError:
+            pass
+
+    def _run(self, sql, params):
+        self._cancelled = False
+        self._deadline = time.monotonic() + self.timeout if self.timeout else None
+        try:
+            if not self.autocommit and not self._raw.in_transaction:
+                self._raw.execute("BEGIN")
+            return [
+                result for text, stmt_params in split_statements(sql, params)
+                for result in self._statement(text, stmt_params)
+            ]
+        except (sqlite3.Error, ProcedureError) as e:
+            timed_out = self._deadline is not None and time.monotonic() > self._deadline
+            raise _driver_error(e, timed_out) from e
+        finally:
+            self._deadline = None
+
+    def _statement(self, text, params):
+        if _NOCOUNT_PATTERN.match(_strip_comments(text)):
+            return []
+
+        call = parse_exec(text, params)
+        if call is not None:
+            return self._call(*call)
+
+        sql, params = translate(text, params)
+        return [self._result(self._raw.execute(sql, params))]
+
+    def _call(self, name, named, positional):
+        proc = PROCEDURES.get(name)
+        if proc is None:
+            raise Error('42000', f"[42000] [SQLite]Could not find stored procedure '{name}'")
+
+        # Procedures are atomic on their own, like a T-SQL body with XACT_ABORT
+        savepoint = f"proc_{name}"
+        self._raw.execute(f"SAVEPOINT {savepoint}")
+        try:
+            cursor = proc(self._raw, *positional, **named)
+            results = [self._result(cursor)] if cursor is not None else []
+        except BaseException:
+            self._raw.execute(f"ROLLBACK TO {savepoint}")
+            self._raw.execute(f"RELEASE {savepoint}")
+            raise
+        self._raw.execute(f"RELEASE {savepoint}")
+        return results
+
+    @staticmethod
+    def _result(cursor):
+        if cursor.description is None:
+            return None, [], cursor.rowcount
+
+        rows = cursor.fetchall()
+        columns = list(zip(*rows)) if rows else [()] * len(cursor.description)
+        description = [
+            (d[0], _type_code(values), None, None, None, None, True)
+            for d, values in zip(cursor.description, columns)
+        ]
+        return description, rows, len(rows)
+
+# =============================================================================
+# CONNECT / INITIALIZE
+# =============================================================================
+def _register_functions(raw):
+    """The UDFs as SQLite functions, for calls that cannot be inlined"""
+    for name, body in FUNCTIONS.items():
+        arity = body.count('{')
+        query = f"SELECT {body.format(*['?'] * arity)}"
+        raw.create_function(name, arity, lambda *args, query=query: raw.execute(query, args).fetchone()[0])
+
+def _open_raw(path):
+    raw = sqlite3.connect(
+        path,
+        uri=path.startswith('file:'),
+        timeout=10,
+        isolation_level=None,
+        check_same_thread=False,
+        detect_types=sqlite3.PARSE_DECLTYPES
+    )
+    raw.execute("PRAGMA foreign_keys = ON")
+    _register_functions(raw)
+    if not path.startswith('file:') and path != ':memory:':
+        raw.execute("PRAGMA journal_mode = WAL")
+        raw.execute("PRAGMA synchronous = NORMAL")
+    return raw
+
+def connect(path, autocommit=True, seed_if_empty=True):
+    """Open a connection, creating the schema (and sample data) on first use"""
+    try:
+        raw = _open_raw(path)
+        with _init_lock:
+            raw.executescript(SCHEMA)
+            if seed_if_empty and _value(raw, "SELECT COUNT(*) FROM Users") == 0:
+                seed(raw)
+    except sqlite3.Error as e:
+        raise _driver_error(e) from e
+    return Connection(raw, autocommit=autocommit)
+
+# =============================================================================
+# SAMPLE DATA
+# =============================================================================
+SEED_DEFAULTS = {
+    'students': 300,
+    'professors': 20,
+    'staff': 5,
+    'courses': 60,
+    'semesters': 4,
+    'seed': 42
+}
+
+_FIRST_NAMES = ['An', 'Bình', 'Chi', 'Dũng', 'Giang', 'Hà', 'Hải', 'Hương', 'Khang', 'Lan',
+                'Linh', 'Minh', 'Nam', 'Ngọc', 'Phúc', 'Quân', 'Sơn', 'Thảo', 'Trang', 'Tuấn', 'Vy']
+_LAST_NAMES = ['Nguyễn', 'Trần', 'Lê', 'Phạm', 'Hoàng', 'Huỳnh', 'Phan', 'Vũ', 'Võ', 'Đặng', 'Bùi', 'Đỗ']
+_SUBJECTS = [
+    ('CS', 'Lập trình'), ('CS', 'Cấu trúc dữ liệu'), ('CS', 'Cơ sở dữ liệu'), ('CS', 'Mạng máy tính'),
+    ('CS', 'Hệ điều hành'), ('CS', 'Trí tuệ nhân tạo'), ('MA', 'Giải tích'), ('MA', 'Đại số tuyến tính'),
+    ('MA', 'Xác suất thống kê'), ('MA', 'Toán rời rạc'), ('PH', 'Vật lý đại cương'), ('EN', 'Tiếng Anh'),
+    ('EC', 'Kinh tế vi mô'), ('EC', 'Kinh tế vĩ mô'), ('BA', 'Quản trị học')
+]
+_STAFF_ROLES = ['Admin', 'Registrar', 'Academic Advisor', 'HR Manager', 'IT Support']
+
+def seed(db, students=None, professors=None, staff=None, courses=None, semesters=None, seed=None):
+    """Fill an empty database with a deterministic, realistic-looking dataset
+
+    User IDs are assigned staff first, then professors, then students, so
+    staff can log in as 1..staff and students start after the professors.
+    """
+    opts = dict(SEED_DEFAULTS)
+    opts.update({k: v for k, v in dict(
+        students=students, professors=professors, staff=staff,
+        courses=courses, semesters=semesters, seed=seed
+    ).items() if v is not None})
+    rng = random.Random(opts['seed'])
+    today = datetime.date.today()
+
+    own_transaction = not db.in_transaction
+    if own_transaction:
+        db.execute("BEGIN")
+
+    def add_user(kind, i):
+        fname, lname = rng.choice(_FIRST_NAMES), rng.choice(_LAST_NAMES)
+        cursor = db.execute(
+            "INSERT INTO Users (FName, LName, Email_Address, Phone_Number) VALUES (?, ?, ?, ?)",
+            (fname, lname, f"{kind}{i}@lms.local", f"09{rng.randint(10000000, 99999999)}")
+        )
+        return cursor.lastrowid
+
+    centers = [
+        db.execute("INSERT INTO Education_Centers (Name, Phone_Number) VALUES (?, ?)", (name, phone)).lastrowid
+        for name, phone in [('Trung tâm Khoa học Tự nhiên', '0281111111'), ('Trung tâm Kinh tế', '0282222222')]
+    ]
+    departments = {}
+    for prefix, name, center in [('CS', 'Khoa Công nghệ Thông tin', 0), ('MA', 'Khoa Toán', 0),
+                                 ('PH', 'Khoa Vật lý', 0), ('EN', 'Khoa Ngoại ngữ', 1),
+                                 ('EC', 'Khoa Kinh tế', 1), ('BA', 'Khoa Quản trị', 1)]:
+        departments[prefix] = db.execute(
+            "INSERT INTO Departments (Name, Office_Location, Phone_Number, CenterID) VALUES (?, ?, ?, ?)",
+            (name, f"Tòa {prefix}", f"028{rng.randint(1000000, 9999999)}", centers[center])
+        ).lastrowid
+
+    for i in range(opts['staff']):
+        user_id = add_user('staff', i + 1)
+        db.execute("INSERT INTO Staff (UserID, Role) VALUES (?, ?)", (user_id, _STAFF_ROLES[i % len(_STAFF_ROLES)]))
+    staff_ids = [row[0] for row in db.execute("SELECT UserID FROM Staff")]
+
+    professor_ids = []
+    for i in range(opts['professors']):
+        user_id = add_user('prof', i + 1)
+        db.execute(
+            "INSERT INTO Professors (UserID, Office_Location, DepartmentID) VALUES (?, ?, ?)",
+            (user_id, f"P.{rng.randint(100, 599)}", rng.choice(list(departments.values())))
+        )
+        professor_ids.append(user_id)
+
+    student_ids = []
+    for i in range(opts['students']):
+        user_id = add_user('sv', i + 1)
+        birthday = datetime.date(rng.randint(1998, 2006), rng.randint(1, 12), rng.randint(1, 28))
+        db.execute("INSERT INTO Students (UserID, Birthday) VALUES (?, ?)", (user_id, birthday))
+        student_ids.append(user_id)
+
+    programs = [
+        db.execute("INSERT INTO Degree_Programs (Code, Name) VALUES (?, ?)", (code, name)).lastrowid
+        for code, name in [('SE', 'Kỹ thuật Phần mềm'), ('DS', 'Khoa học Dữ liệu'), ('BA', 'Quản trị Kinh doanh')]
+    ]
+    for n, program_id in enumerate(programs):
+        db.execute(
+            "INSERT INTO Specializations (Proj_ID, Name, Start_Date, ProgramID) VALUES (?, ?, ?, ?)",
+            (f"PRJ{n + 1:03d}", f"Chuyên ngành {n + 1}", today.replace(month=1, day=1), program_id)
+        )
+    for student_id in student_ids:
+        db.execute(
+            "INSERT INTO Student_Program (StudentID, ProgramID, Enrollment_Date) VALUES (?, ?, ?)",
+            (student_id, rng.choice(programs), today.replace(year=today.year - rng.randint(0, 3), month=9, day=1))
+        )
+
+    course_rows = []
+    for i in range(opts['courses']):
+        prefix, subject = _SUBJECTS[i % len(_SUBJECTS)]
+        level = i // len(_SUBJECTS) + 1
+        code = f"{prefix}{level}{i % len(_SUBJECTS):02d}"
+        credit = rng.choice([2, 3, 3, 3, 4])
+        course_id = db.execute("""
+            INSERT INTO Courses (Course_Code, Title, Description, Credit, Passing_Score, DepartmentID)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (code, f"{subject} {level}", f"Học phần {subject.lower()} cấp độ {level}",
+              credit, rng.choice([50, 50, 55, 60]), departments[prefix])).lastrowid
+        course_rows.append((course_id, credit, level))
+
+    # Level n+1 of a subject requires level n
+    by_subject = len(_SUBJECTS)
+    for index, (course_id, _, level) in enumerate(course_rows):
+        if level > 1:
+            db.execute(
+                "INSERT INTO CoursePrerequisites (SourceCourseID, TargetCourseID) VALUES (?, ?)",
+                (course_id, course_rows[index - by_subject][0])
+            )
+
+    # Semesters roughly every 4.5 months, the newest one running now
+    semester_ids = []
+    for k in reversed(range(opts['semesters'])):
+        start = today - datetime.timedelta(days=30 + 140 * k)
+        semester_ids.append(db.execute(
+            "INSERT INTO Semesters (Semester_Name, Start_Date, End_Date) VALUES (?, ?, ?)",
+            (semester_name(start), start, start + datetime.timedelta(days=120))
+        ).lastrowid)
+
+    level_one = [row for row in course_rows if row[2] == 1]
+    for semester_id in semester_ids:
+        for course_id, _, _ in rng.sample(course_rows, min(len(course_rows), max(1, len(course_rows) * 2 // 3))):
+            db.execute(
+                "INSERT INTO Professor_Course (ProfessorID, CourseID, SemesterID) VALUES (?, ?, ?)",
+                (rng.choice(professor_ids), course_id, semester_id)
+            )
+
+    # Approved history in past semesters, a mix of statuses in the current one
+    current = semester_ids[-1]
+    for student_id in student_ids:
+        for semester_id in semester_ids:
+            picked, total = [], 0
+            for course_id, credit, _ in rng.sample(level_one, len(level_one)):
+                if total + credit > 18:
+                    break
+                picked.append((course_id, credit))
+                total += credit
+
+            for course_id, credit in picked:
+                if semester_id == current:
+                    status = rng.choices(['Approved', 'Pending', 'Rejected'], [6, 3, 1])[0]
+                else:
+                    status = 'Approved'
+                start = _value(db, "SELECT Start_Date FROM Semesters WHERE SemesterID = ?", semester_id)
+                db.execute("""
+                    INSERT OR IGNORE INTO Activities
+                        (StudentID, CourseID, SemesterID, ActivityType, RequestStatus, Submission_Date, Credit, StaffID)
+                    VALUES (?, ?, ?, 'Enrollment', ?, ?, ?, ?)
+                """, (student_id, course_id, semester_id, status,
+                      start + datetime.timedelta(days=rng.randint(0, 14)), credit,
+                      rng.choice(staff_ids) if status != 'Pending' and staff_ids else None))
+
+    if own_transaction:
+        db.execute("COMMIT")
+    db.execute("ANALYZE")
+
+    return {'staff': staff_ids, 'professors': professor_ids, 'students': student_ids, 'semesters': semester_ids}
+
+def init_database(path, **seed_options):
+    """Create a fresh database file at path and seed it"""
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+    raw = _open_raw(path)
+    try:
+        raw.executescript(SCHEMA)
+        return seed(raw, **seed_options)
+    finally:
+        raw.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Create the local SQLite UniversityDB")
+    parser.add_argument("--init", action="store_true", help="(re)create and seed the database file")
+    parser.add_argument("--path", default=os.environ.get(
+        "LMS_SQLITE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "lms_local.db")
+    ))
+    for option, default in SEED_DEFAULTS.items():
+        parser.add_argument(f"--{option}", type=int, default=default)
+    args = parser.parse_args()
+
+    if args.init:
+        ids = init_database(args.path, **{k: getattr(args, k) for k in SEED_DEFAULTS})
+        print(f"✅ {args.path}")
+        print(f"   Staff IDs: {ids['staff'][0]}..{ids['staff'][-1]}" if ids['staff'] else "   Staff: 0")
+        print(f"   Professor IDs: {ids['professors'][0]}..{ids['professors'][-1]}" if ids['professors'] else "   Professors: 0")
+        print(f"   Student IDs: {ids['students'][0]}..{ids['students'][-1]}" if ids['students'] else "   Students: 0")
+    else:
+        parser.print_help()
@@ -10,5 +10,6 @@ __all__ = [
     'semesters',
     'organizations',
     'programs',
-    'staff_management'    
+    'staff_management',
+    'performance'
 ]
\ No newline at end of file
@@ -1,5 +1,8 @@
 import streamlit as st
-from database import execute_query, execute_procedure
+from database import (
+    execute_query, execute_procedure, add_enrollment_counts, get_prerequisite_graph,
+    add_course_prerequisite, delete_course_prerequisite, refresh_prerequisite_graph
+)
 
 def render_courses_management():
     """Quản lý Courses - Module chính"""
@@ -164,7 +167,7 @@ def render_courses_list():
     col1, col2 = st. columns([2, 1])
     
     with col1:
-        departments = execute_query("SELECT DepartmentID, Name FROM Departments ORDER BY Name")
+        departments = execute_query("SELECT DepartmentID, Name FROM Departments ORDER BY Name", cache=True)
         
         if not departments.empty:
             dept_filter_options = ["Tất cả"] + departments['Name'].tolist()
@@ -184,8 +187,7 @@ def render_courses_list():
                 C. Title,
                 C.Credit,
                 C.Passing_Score,
-                D.Name as Department,
-                dbo.GetStudentCountByCourse(C.CourseID) as StudentCount
+                D.Name as Department
             FROM Courses C
             LEFT JOIN Departments D ON C.DepartmentID = D. DepartmentID
             ORDER BY C.Course_Code
@@ -199,8 +201,7 @@ def render_courses_list():
                 C.Title,
                 C.Credit,
                 C.Passing_Score,
-                D.Name as Department,
-                dbo.GetStudentCountByCourse(C.CourseID) as StudentCount
+                D.Name as Department
             FROM Courses C
             LEFT JOIN Departments D ON C.DepartmentID = D.DepartmentID
             WHERE C.DepartmentID = ? 
@@ -211,6 +212,7 @@ def render_courses_list():
     if courses.empty:
         st.info("📭 Chưa có course nào")
     else:
+        courses = add_enrollment_counts(courses)
         st.success(f"✅ Tìm thấy {len(courses)} courses")
         
         st.dataframe(
@@ -241,7 +243,7 @@ def render_prerequisites():
     - VD: CS102 (Source) requires CS101 (Target)
     """)
     
-    tab1, tab2 = st. tabs(["➕ Thêm Prerequisite", "📋 Danh sách"])
+    tab1, tab2, tab3 = st. tabs(["➕ Thêm Prerequisite", "📋 Danh sách", "🕸️ Phụ thuộc"])
     
     with tab1:
         all_courses = execute_query("""
@@ -287,26 +289,14 @@ def render_prerequisites():
                 if source_id == target_id:
                     st.error("❌ Không thể thêm chính nó làm prerequisite!")
                 else:
-                    # Check existing
-                    existing = execute_query("""
-                        SELECT COUNT(*) as cnt
-                        FROM CoursePrerequisites
-                        WHERE SourceCourseID = ? AND TargetCourseID = ?
-                    """, [source_id, target_id])
+                    # Trùng và vòng lặp được kiểm tra trên đồ thị trong bộ nhớ
+                    success, msg = add_course_prerequisite(source_id, target_id)
                     
-                    if not existing.empty and existing.iloc[0]['cnt'] > 0:
-                        st.error("❌ Prerequisite này đã tồn tại!")
+                    if success:
+                        st.success("✅ Đã thêm prerequisite!")
+                        st. rerun()
                     else:
-                        success, msg = execute_procedure(
-                            "EXEC InsertCoursePrerequisite @p_SourceCourseID=?, @p_TargetCourseID=?",
-                            (source_id, target_id)
-                        )
-                        
-                        if success:
-                            st.success("✅ Đã thêm prerequisite!")
-                            st. rerun()
-                        else:
-                            st.error(f"❌ Lỗi: {msg}")
+                        st.error(msg if msg.startswith("❌") else f"❌ Lỗi: {msg}")
     
     with tab2:
         prerequisites = execute_query("""
@@ -339,9 +329,8 @@ def render_prerequisites():
                 
                 with col2:
                     if st.button("🗑️ Xóa", key=f"del_prereq_{prereq['SourceCourseID']}_{prereq['TargetCourseID']}"):
-                        success, msg = execute_procedure(
-                            "EXEC DeleteCoursePrerequisite @p_SourceCourseID=?, @p_TargetCourseID=?",
-                            (prereq['SourceCourseID'], prereq['TargetCourseID'])
+                        success, msg = delete_course_prerequisite(
+                            prereq['SourceCourseID'], prereq['TargetCourseID']
                         )
                         
                         if success:
@@ -351,6 +340,60 @@ def render_prerequisites():
                             st.error(msg)
                 
                 st.markdown("---")
+    
+    with tab3:
+        render_prerequisite_closure()
+
+
+def render_prerequisite_closure():
+    """Môn tiên quyết bắc cầu và các môn được mở khóa của một course"""
+    
+    all_courses = execute_query("""
+        SELECT CourseID, Course_Code, Title
+        FROM Courses
+        ORDER BY Course_Code
+    """, cache=True)
+    
+    if all_courses.empty:
+        st.warning("⚠️ Chưa có course nào!")
+        return
+    
+    labels = {
+        row.CourseID: f"[{row.Course_Code}] {row.Title}"
+        for row in all_courses.itertuples(index=False)
+    }
+    
+    course_id = st.selectbox(
+        "Chọn course:",
+        list(labels),
+        format_func=lambda cid: labels[cid],
+        key="prereq_closure_course"
+    )
+    
+    try:
+        graph = get_prerequisite_graph()
+    except Exception as e:
+        st.error(f"❌ Query error: {e}")
+        return
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        required = graph.requires(course_id)
+        st.markdown(f"### ⬅️ Cần học trước ({len(required)})")
+        direct = graph.direct(course_id)
+        for label, cid in sorted((labels.get(cid, f"#{cid}"), cid) for cid in required):
+            st.markdown(f"- {label}" + ("" if cid in direct else " *(gián tiếp)*"))
+        if not required:
+            st.info("📭 Không cần môn tiên quyết")
+    
+    with col2:
+        unlocked = graph.unlocks(course_id)
+        st.markdown(f"### ➡️ Mở khóa ({len(unlocked)})")
+        for label in sorted(labels.get(cid, f"#{cid}") for cid in unlocked):
+            st.markdown(f"- {label}")
+        if not unlocked:
+            st.info("📭 Không có môn nào cần môn này")
 
 
 def render_edit_delete_course():
@@ -511,6 +554,7 @@ def render_edit_delete_course():
                 
                 if success:
                     st.success("✅ Đã xóa course!")
+                    refresh_prerequisite_graph()
                     del st.session_state.selected_course_edit
                     st.rerun()
                 else:
@@ -0,0 +1,122 @@
+import streamlit as st
+import pandas as pd
+from database import (
+    get_query_summary, get_recent_queries, read_slow_log, reset_query_metrics,
+    get_cache_stats, get_pool_stats, get_section_summary, check_section_summary,
+    rebuild_section_summary, METRICS_CONFIG, SUMMARY_CONFIG
+)
+
+SUMMARY_COLUMNS = [
+    'fingerprint', 'kind', 'calls', 'total_ms', 'avg_ms', 'p95_ms', 'max_ms',
+    'rows', 'bytes', 'cache_hit_rate', 'errors', 'sources', 'sql'
+]
+
+def render_performance_dashboard():
+    """Hiệu năng truy vấn - Module chính"""
+
+    st.title("📈 Hiệu năng truy vấn")
+
+    st.info(f"""
+    ℹ️ Số liệu lấy từ {METRICS_CONFIG['buffer_size']} lần gọi database gần nhất của tiến trình này.
+    Truy vấn chậm hơn **{METRICS_CONFIG['slow_threshold']:.0f} ms** được ghi vào slow log.
+    """)
+
+    render_overview()
+
+    tab1, tab2, tab3, tab4, tab5 = st.tabs([
+        "⏱️ Tổng thời gian", "🔁 Số lần gọi", "🐢 p95", "📜 Slow log", "🧮 Tổng hợp lớp"
+    ])
+
+    summary = get_query_summary()
+
+    with tab1:
+        render_top_fingerprints(summary, 'total_ms')
+
+    with tab2:
+        render_top_fingerprints(summary, 'calls')
+
+    with tab3:
+        render_top_fingerprints(summary, 'p95_ms')
+
+    with tab4:
+        render_slow_log()
+
+    with tab5:
+        render_section_summary()
+
+
+def render_overview():
+    """Các chỉ số tổng quan: truy vấn, cache, connection pool"""
+
+    recent = get_recent_queries(limit=METRICS_CONFIG['buffer_size'])
+    cache = get_cache_stats()
+    pool = get_pool_stats()
+
+    total_ms = sum(r['duration_ms'] for r in recent)
+
+    col1, col2, col3, col4 = st.columns(4)
+
+    with col1:
+        st.metric("🔢 Lần gọi", len(recent))
+    with col2:
+        st.metric("⏱️ Tổng thời gian", f"{total_ms / 1000:.1f} s")
+    with col3:
+        st.metric("🎯 Cache hit", f"{cache['hit_rate']:.0%}")
+    with col4:
+        st.metric("🔌 Connections", f"{pool['in_use']}/{pool['size']} đang dùng")
+
+    if st.button("🔄 Xóa số liệu", key="reset_query_metrics"):
+        reset_query_metrics()
+        st.rerun()
+
+
+def render_top_fingerprints(summary, sort_by, limit=20):
+    """Bảng các câu truy vấn tốn kém nhất theo một tiêu chí"""
+
+    if summary.empty:
+        st.info("📭 Chưa có truy vấn nào được ghi nhận")
+        return
+
+    top = summary.sort_values(sort_by, ascending=False).head(limit)
+    st.dataframe(top[SUMMARY_COLUMNS], use_container_width=True, hide_index=True)
+
+
+def render_slow_log():
+    """Các truy vấn chậm gần nhất trong file JSONL"""
+
+    st.caption(f"📁 {METRICS_CONFIG['slow_log_path']}")
+
+    entries = read_slow_log()
+
+    if not entries:
+        st.info("📭 Chưa có truy vấn chậm nào")
+    else:
+        st.dataframe(pd.DataFrame(entries), use_container_width=True, hide_index=True)
+
+
+def render_section_summary():
+    """Bảng tổng hợp theo lớp (môn, học kỳ): kiểm tra và dựng lại"""
+
+    st.caption(
+        f"Số đăng ký Approved / Pending / Rejected và số rút môn của mỗi lớp được giữ trong bộ nhớ, "
+        f"cập nhật khi duyệt yêu cầu và đối soát lại mỗi {SUMMARY_CONFIG['reconcile_interval']} giây."
+    )
+
+    summary = get_section_summary()
+    st.metric("📚 Số lớp", len(summary))
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        if st.button("🩺 Kiểm tra", key="check_section_summary", use_container_width=True):
+            mismatches = check_section_summary()
+            if mismatches.empty:
+                st.success("✅ Khớp với Activities")
+            else:
+                st.error(f"❌ {len(mismatches)} số liệu lệch")
+                st.dataframe(mismatches, use_container_width=True, hide_index=True)
+
+    with col2:
+        if st.button("🔁 Dựng lại", key="rebuild_section_summary", use_container_width=True):
+            drift = rebuild_section_summary()
+            st.success(f"✅ Đã dựng lại ({drift} lớp bị lệch)")
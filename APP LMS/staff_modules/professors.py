@@ -1,5 +1,6 @@
 import streamlit as st
 from database import execute_query, execute_procedure
+from directory import SORT_OPTIONS, render_directory, render_person_picker
 
 def render_professors_management():
     """Quản lý Professors - Module chính"""
@@ -187,7 +188,7 @@ def render_professors_list():
     col1, col2 = st. columns([2, 1])
     
     with col1:
-        departments = execute_query("SELECT DepartmentID, Name FROM Departments ORDER BY Name")
+        departments = execute_query("SELECT DepartmentID, Name FROM Departments ORDER BY Name", cache=True)
         
         if not departments.empty:
             dept_filter_options = ["Tất cả"] + departments['Name'].tolist()
@@ -196,66 +197,31 @@ def render_professors_list():
             selected_dept_filter = "Tất cả"
     
     with col2:
-        sort_order = st.selectbox("Sắp xếp:", ["Mới nhất", "Cũ nhất", "Tên A-Z"])
+        sort_order = st.selectbox("Sắp xếp:", list(SORT_OPTIONS))
     
-    # Query
+    # Lọc trên server, mỗi lần chỉ tải một trang
     if selected_dept_filter == "Tất cả":
-        professors = execute_query("""
-            SELECT 
-                P.UserID,
-                dbo.GetFullName(P. UserID) as FullName,
-                U.Email_Address,
-                U.Phone_Number,
-                D.Name as Department,
-                P.Office_Location,
-                (SELECT COUNT(DISTINCT CourseID) 
-                 FROM Professor_Course 
-                 WHERE ProfessorID = P.UserID) as CourseCount
-            FROM Professors P
-            JOIN Users U ON P.UserID = U.UserID
-            LEFT JOIN Departments D ON P.DepartmentID = D.DepartmentID
-            ORDER BY P.UserID DESC
-        """)
+        where, params = None, ()
     else:
         dept_id = departments[departments['Name'] == selected_dept_filter]['DepartmentID'].values[0]
-        professors = execute_query("""
-            SELECT 
-                P.UserID,
-                dbo.GetFullName(P.UserID) as FullName,
-                U.Email_Address,
-                U.Phone_Number,
-                D.Name as Department,
-                P.Office_Location,
-                (SELECT COUNT(DISTINCT CourseID) 
-                 FROM Professor_Course 
-                 WHERE ProfessorID = P.UserID) as CourseCount
-            FROM Professors P
-            JOIN Users U ON P. UserID = U.UserID
-            LEFT JOIN Departments D ON P.DepartmentID = D. DepartmentID
-            WHERE P.DepartmentID = ? 
-            ORDER BY P.UserID DESC
-        """, [dept_id])
+        where, params = "R.DepartmentID = ?", (int(dept_id),)
     
-    # Display
-    if professors.empty:
-        st. info("📭 Chưa có professor nào")
-    else:
-        st. success(f"✅ Tìm thấy {len(professors)} professors")
-        
-        st.dataframe(
-            professors,
-            column_config={
-                "UserID": st.column_config.NumberColumn("Professor ID", width="small"),
-                "FullName": st.column_config.TextColumn("Họ tên", width="large"),
-                "Email_Address": st.column_config. TextColumn("Email", width="large"),
-                "Phone_Number": st.column_config.TextColumn("SĐT", width="medium"),
-                "Department": st. column_config.TextColumn("Khoa", width="medium"),
-                "Office_Location": st. column_config.TextColumn("Văn phòng", width="medium"),
-                "CourseCount": st.column_config.NumberColumn("Số môn", width="small")
-            },
-            use_container_width=True,
-            hide_index=True
-        )
+    render_directory(
+        'Professor', 'professors_list',
+        where=where,
+        params=params,
+        columns=["(SELECT COUNT(DISTINCT CourseID) FROM Professor_Course WHERE ProfessorID = R.UserID) as CourseCount"],
+        order=sort_order,
+        column_config={
+            "UserID": st.column_config.NumberColumn("Professor ID", width="small"),
+            "FullName": st.column_config.TextColumn("Họ tên", width="large"),
+            "Email_Address": st.column_config. TextColumn("Email", width="large"),
+            "Phone_Number": st.column_config.TextColumn("SĐT", width="medium"),
+            "Department": st. column_config.TextColumn("Khoa", width="medium"),
+            "Office_Location": st. column_config.TextColumn("Văn phòng", width="medium"),
+            "CourseCount": st.column_config.NumberColumn("Số môn", width="small")
+        }
+    )
 
 
 def render_assign_teaching():
@@ -275,35 +241,16 @@ def render_assign_teaching():
     with col1:
         st.markdown("### 🔍 Chọn Professor")
         
-        all_professors = execute_query("""
-            SELECT 
-                P. UserID,
-                dbo. GetFullName(P.UserID) as FullName,
-                D.Name as Department
-            FROM Professors P
-            LEFT JOIN Departments D ON P.DepartmentID = D.DepartmentID
-            ORDER BY P. UserID DESC
-        """)
-        
-        if all_professors.empty:
-            st.warning("⚠️ Chưa có professor nào!")
-            return
-        
-        prof_options = all_professors. apply(
-            lambda row: f"ID: {row['UserID']} - {row['FullName']} ({row['Department']})", 
-            axis=1
-        ).tolist()
-        
-        selected_prof = st.selectbox("Chọn Professor:", prof_options)
+        selected_prof = render_person_picker(
+            'Professor', 'teaching_prof', "Chọn Professor:",
+            describe=lambda row: f"ID: {row['UserID']} - {row['FullName']} ({row['Department']})"
+        )
         
-        if st.button("✅ Chọn", type="primary", key="select_prof"):
-            selected_index = prof_options.index(selected_prof)
-            prof_id = int(all_professors.iloc[selected_index]['UserID'])
-            
+        if st.button("✅ Chọn", type="primary", key="select_prof", disabled=selected_prof is None):
             st.session_state.selected_prof_for_teaching = {
-                'UserID': prof_id,
-                'FullName': all_professors.iloc[selected_index]['FullName'],
-                'Department': all_professors.iloc[selected_index]['Department']
+                'UserID': int(selected_prof['UserID']),
+                'FullName': selected_prof['FullName'],
+                'Department': selected_prof['Department']
             }
             st.rerun()
     
@@ -512,7 +459,7 @@ def render_edit_delete_professor():
         st.markdown("---")
         st.markdown("### ✏️ Sửa thông tin")
         
-        departments = execute_query("SELECT DepartmentID, Name FROM Departments ORDER BY Name")
+        departments = execute_query("SELECT DepartmentID, Name FROM Departments ORDER BY Name", cache=True)
         
         if departments.empty:
             st.warning("⚠️ Không có department nào!")
@@ -1,6 +1,6 @@
 import streamlit as st
 from datetime import date, timedelta
-from database import execute_query, execute_procedure
+from database import execute_query, execute_procedure, count_section_students
 
 def render_semesters_management():
     """Quản lý Semesters - Module chính"""
@@ -27,16 +27,21 @@ def render_semesters_list():
             S. Semester_Name,
             CONVERT(VARCHAR, S.Start_Date, 23) as Start_Date,
             CONVERT(VARCHAR, S.End_Date, 23) as End_Date,
-            COUNT(DISTINCT A.StudentID) as TotalStudents,
             COUNT(DISTINCT PC.ProfessorID) as TotalProfessors,
             COUNT(DISTINCT PC.CourseID) as TotalCourses
         FROM Semesters S
-        LEFT JOIN Activities A ON S.SemesterID = A.SemesterID
         LEFT JOIN Professor_Course PC ON S.SemesterID = PC.SemesterID
         GROUP BY S.SemesterID, S.Semester_Name, S.Start_Date, S.End_Date
         ORDER BY S. Start_Date DESC
     """)
     
+    # Sinh viên có yêu cầu (bất kỳ loại nào) trong học kỳ, lấy từ bảng tổng hợp theo lớp thay vì JOIN Activities;
+    # như trước, không lọc theo Professor_Course (học kỳ còn yêu cầu thì không được xóa)
+    if not all_semesters.empty:
+        all_semesters['TotalStudents'] = [
+            count_section_students(semester_id=int(semester_id)) for semester_id in all_semesters['SemesterID']
+        ]
+    
     if all_semesters.empty:
         st.info("📭 Chưa có học kỳ nào")
     else:
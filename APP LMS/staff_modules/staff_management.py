@@ -1,5 +1,6 @@
 import streamlit as st
 from database import execute_query, execute_procedure
+from directory import SORT_OPTIONS, render_directory
 
 def render_staff_management():
     """Quản lý Staff - Module chính"""
@@ -186,53 +187,27 @@ def render_staff_list():
             selected_role_filter = "Tất cả"
     
     with col2:
-        sort_order = st.selectbox("Sắp xếp:", ["Mới nhất", "Cũ nhất", "Tên A-Z"])
+        sort_order = st.selectbox("Sắp xếp:", list(SORT_OPTIONS))
     
-    # Query
+    # Lọc trên server, mỗi lần chỉ tải một trang
     if selected_role_filter == "Tất cả":
-        staff_list = execute_query("""
-            SELECT 
-                S.UserID,
-                dbo.GetFullName(S.UserID) as FullName,
-                U.Email_Address,
-                U.Phone_Number,
-                S.Role
-            FROM Staff S
-            JOIN Users U ON S.UserID = U.UserID
-            ORDER BY S.UserID DESC
-        """)
+        where, params = None, ()
     else:
-        staff_list = execute_query("""
-            SELECT 
-                S.UserID,
-                dbo.GetFullName(S.UserID) as FullName,
-                U.Email_Address,
-                U.Phone_Number,
-                S.Role
-            FROM Staff S
-            JOIN Users U ON S.UserID = U. UserID
-            WHERE S.Role = ?
-            ORDER BY S. UserID DESC
-        """, [selected_role_filter])
+        where, params = "R.Role = ?", (selected_role_filter,)
     
-    # Display
-    if staff_list.empty:
-        st.info("📭 Chưa có staff nào")
-    else:
-        st.success(f"✅ Tìm thấy {len(staff_list)} staff members")
-        
-        st.dataframe(
-            staff_list,
-            column_config={
-                "UserID": st.column_config.NumberColumn("Staff ID", width="small"),
-                "FullName": st.column_config. TextColumn("Họ tên", width="large"),
-                "Email_Address": st.column_config. TextColumn("Email", width="large"),
-                "Phone_Number": st.column_config.TextColumn("SĐT", width="medium"),
-                "Role": st. column_config.TextColumn("Vai trò", width="medium")
-            },
-            use_container_width=True,
-            hide_index=True
-        )
+    render_directory(
+        'Staff', 'staff_list',
+        where=where,
+        params=params,
+        order=sort_order,
+        column_config={
+            "UserID": st.column_config.NumberColumn("Staff ID", width="small"),
+            "FullName": st.column_config. TextColumn("Họ tên", width="large"),
+            "Email_Address": st.column_config. TextColumn("Email", width="large"),
+            "Phone_Number": st.column_config.TextColumn("SĐT", width="medium"),
+            "Role": st. column_config.TextColumn("Vai trò", width="medium")
+        }
+    )
 
 
 def render_edit_delete_staff():
@@ -1,6 +1,7 @@
 import streamlit as st
 from datetime import date
 from database import execute_query, execute_procedure
+from directory import SORT_OPTIONS, render_directory, render_person_picker
 
 def render_students_management():
     """Quản lý Students - Module chính"""
@@ -197,76 +198,29 @@ def render_students_list():
         )
     
     with col2:
-        sort_order = st.selectbox("Sắp xếp:", ["Mới nhất", "Cũ nhất", "Tên A-Z"])
+        sort_order = st.selectbox("Sắp xếp:", list(SORT_OPTIONS))
     
-    # Query
-    if filter_program == "Tất cả":
-        students = execute_query("""
-            SELECT 
-                S.UserID,
-                dbo.GetFullName(S.UserID) as FullName,
-                U.Email_Address,
-                U.Phone_Number,
-                CONVERT(VARCHAR, S. Birthday, 23) as Birthday,
-                (SELECT COUNT(*) 
-                 FROM Student_Program SP 
-                 WHERE SP.StudentID = S.UserID) as ProgramCount
-            FROM Students S
-            JOIN Users U ON S.UserID = U.UserID
-            ORDER BY S.UserID DESC
-        """)
-    
-    elif filter_program == "Có Program":
-        students = execute_query("""
-            SELECT DISTINCT
-                S.UserID,
-                dbo.GetFullName(S.UserID) as FullName,
-                U.Email_Address,
-                U.Phone_Number,
-                CONVERT(VARCHAR, S.Birthday, 23) as Birthday,
-                (SELECT COUNT(*) 
-                 FROM Student_Program SP 
-                 WHERE SP.StudentID = S.UserID) as ProgramCount
-            FROM Students S
-            JOIN Users U ON S.UserID = U.UserID
-            WHERE EXISTS(SELECT 1 FROM Student_Program WHERE StudentID = S.UserID)
-            ORDER BY S.UserID DESC
-        """)
+    # Lọc trên server, mỗi lần chỉ tải một trang
+    program_filters = {
+        "Tất cả": None,
+        "Có Program": "EXISTS(SELECT 1 FROM Student_Program WHERE StudentID = R.UserID)",
+        "Chưa có Program": "NOT EXISTS(SELECT 1 FROM Student_Program WHERE StudentID = R.UserID)"
+    }
     
-    else:  # Chưa có Program
-        students = execute_query("""
-            SELECT 
-                S.UserID,
-                dbo.GetFullName(S. UserID) as FullName,
-                U.Email_Address,
-                U.Phone_Number,
-                CONVERT(VARCHAR, S.Birthday, 23) as Birthday,
-                0 as ProgramCount
-            FROM Students S
-            JOIN Users U ON S.UserID = U.UserID
-            WHERE NOT EXISTS(SELECT 1 FROM Student_Program WHERE StudentID = S. UserID)
-            ORDER BY S.UserID DESC
-        """)
-    
-    # Display
-    if students.empty:
-        st.info("📭 Chưa có student nào")
-    else:
-        st.success(f"✅ Tìm thấy {len(students)} students")
-        
-        st.dataframe(
-            students,
-            column_config={
-                "UserID": st.column_config. NumberColumn("Student ID", width="small"),
-                "FullName": st.column_config. TextColumn("Họ tên", width="large"),
-                "Email_Address": st.column_config. TextColumn("Email", width="large"),
-                "Phone_Number": st.column_config.TextColumn("SĐT", width="medium"),
-                "Birthday": st. column_config.TextColumn("Ngày sinh", width="medium"),
-                "ProgramCount": st.column_config. NumberColumn("Số Program", width="small")
-            },
-            use_container_width=True,
-            hide_index=True
-        )
+    render_directory(
+        'Student', 'students_list',
+        where=program_filters[filter_program],
+        columns=["(SELECT COUNT(*) FROM Student_Program SP WHERE SP.StudentID = R.UserID) as ProgramCount"],
+        order=sort_order,
+        column_config={
+            "UserID": st.column_config. NumberColumn("Student ID", width="small"),
+            "FullName": st.column_config. TextColumn("Họ tên", width="large"),
+            "Email_Address": st.column_config. TextColumn("Email", width="large"),
+            "Phone_Number": st.column_config.TextColumn("SĐT", width="medium"),
+            "Birthday": st. column_config.TextColumn("Ngày sinh", width="medium"),
+            "ProgramCount": st.column_config. NumberColumn("Số Program", width="small")
+        }
+    )
 
 
 def render_assign_program():
@@ -311,39 +265,16 @@ def render_assign_program():
                     st. rerun()
         
         else:  # Tìm theo tên
-            all_students = execute_query("""
-                SELECT 
-                    S.UserID,
-                    dbo.GetFullName(S. UserID) as FullName
-                FROM Students S
-                ORDER BY S.UserID DESC
-            """)
+            selected = render_person_picker('Student', 'program_student', "Chọn Student:")
             
-            if not all_students.empty:
-                student_options = all_students.apply(
-                    lambda row: f"ID: {row['UserID']} - {row['FullName']}", 
-                    axis=1
-                ).tolist()
-                
-                selected = st.selectbox("Chọn Student:", student_options)
-                
-                if st.button("✅ Chọn", type="primary", key="select_student"):
-                    selected_index = student_options.index(selected)
-                    student_id = int(all_students.iloc[selected_index]['UserID'])
-                    
-                    student_info = execute_query("""
-                        SELECT 
-                            S.UserID,
-                            dbo.GetFullName(S.UserID) as FullName,
-                            U.Email_Address,
-                            CONVERT(VARCHAR, S.Birthday, 23) as Birthday
-                        FROM Students S
-                        JOIN Users U ON S.UserID = U.UserID
-                        WHERE S.UserID = ?
-                    """, [student_id])
-                    
-                    st.session_state.selected_student_for_program = student_info.iloc[0].to_dict()
-                    st.rerun()
+            if st.button("✅ Chọn", type="primary", key="select_student", disabled=selected is None):
+                st.session_state.selected_student_for_program = {
+                    'UserID': int(selected['UserID']),
+                    'FullName': selected['FullName'],
+                    'Email_Address': selected['Email_Address'],
+                    'Birthday': selected['Birthday']
+                }
+                st.rerun()
     
     with col2:
         if 'selected_student_for_program' in st.session_state:
@@ -0,0 +1,45 @@
+"""
+Shared fixtures: every test module runs against a fresh SQLite database
+(LMS_DB_BACKEND=sqlite) under pytest's tmp_path, never the local dev copy.
+"""
+
+import os
+import sys
+import datetime
+
+import pytest
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, APP_DIR)
+
+
+@pytest.fixture(scope="session")
+def lms_db(tmp_path_factory):
+    """Path of an empty LMS schema; database.py is imported against it"""
+    path = str(tmp_path_factory.mktemp("lms") / "lms.db")
+    os.environ.update(LMS_DB_BACKEND="sqlite", LMS_SQLITE_PATH=path, LMS_SKIP_DEP_CHECK="1")
+
+    import sqlite_backend
+    sqlite_backend.connect(path, seed_if_empty=False).close()
+    return path
+
+
+@pytest.fixture(scope="session")
+def db(lms_db):
+    import database
+    return database
+
+
+@pytest.fixture
+def captured_queries(db):
+    """Fingerprints of the statements run while the test body executes"""
+    captured = []
+    listener = lambda entry: captured.append((entry['kind'], entry['fingerprint']))
+    db.add_query_listener(listener)
+    db.clear_query_cache()
+    yield captured
+    db.remove_query_listener(listener)
+
+
+def today(offset=0):
+    return (datetime.date.today() + datetime.timedelta(days=offset)).isoformat()
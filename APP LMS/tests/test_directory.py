@@ -0,0 +1,51 @@
+"""
+Keyset paging of the people directory: walking every page in each sort
+order must return each person exactly once, in order, including people
+who share a name.
+"""
+
+import sqlite3
+
+import pytest
+
+LAST_NAMES = ["Nguyễn", "Trần", "Lê"]
+FIRST_NAMES = ["An", "Bình", "An", "Chi"]
+STAFF = [
+    (300 + i, FIRST_NAMES[i % len(FIRST_NAMES)], LAST_NAMES[i % len(LAST_NAMES)])
+    for i in range(23)
+]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def staff(db, lms_db):
+    with sqlite3.connect(lms_db) as raw:
+        raw.executemany(
+            "INSERT INTO Users VALUES (?, ?, ?, ?, NULL)",
+            [(user_id, fname, lname, f"staff{user_id}@lms.test") for user_id, fname, lname in STAFF]
+        )
+        raw.executemany("INSERT INTO Staff VALUES (?, 'Registrar')", [(user_id,) for user_id, _, _ in STAFF])
+
+
+def walk(db, **options):
+    seen, after = [], None
+    while True:
+        page, after = db.get_directory_page('Staff', after=after, limit=4, **options)
+        seen += page['UserID'].tolist()
+        if after is None:
+            return seen
+
+
+@pytest.mark.parametrize("sort, descending, key", [
+    ('id', True, lambda row: -row[0]),
+    ('id', False, lambda row: row[0]),
+    ('name', False, lambda row: (row[2], row[1], row[0])),
+])
+def test_pages_cover_everyone_in_order(db, sort, descending, key):
+    expected = [user_id for user_id, _, _ in sorted(STAFF, key=key)]
+    assert walk(db, sort=sort, descending=descending) == expected
+
+
+def test_name_pages_with_search(db):
+    expected = sorted((lname, fname, user_id) for user_id, fname, lname in STAFF if fname == "An")
+    assert walk(db, sort='name', search="an") == [user_id for _, _, user_id in expected]
+    assert "SortKey0" not in db.get_directory_page('Staff', sort='name')[0].columns
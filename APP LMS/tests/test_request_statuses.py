@@ -0,0 +1,112 @@
+"""
+Regression test for the per-course status lookups on the Rút môn and
+Hoãn thi tabs: the statements run must not depend on how many approved
+courses the student has (one status query for the whole list).
+"""
+
+import os
+import sqlite3
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from conftest import APP_DIR, today
+
+FEW, MANY = 101, 102          # students with 1 and with COURSES approved courses
+COURSES = 6
+SEMESTER = 1
+
+APPROVED_QUERY = """
+    SELECT A.CourseID, C.Course_Code, C.Title, C.Credit
+    FROM Activities A
+    JOIN Courses C ON A.CourseID = C.CourseID
+    WHERE A.StudentID = ? AND A.SemesterID = ?
+    AND A.ActivityType = 'Enrollment' AND A.RequestStatus = 'Approved'
+"""
+
+
+@pytest.fixture(scope="module", autouse=True)
+def enrollments(db, lms_db):
+    with sqlite3.connect(lms_db) as raw:
+        raw.executemany("INSERT INTO Users VALUES (?, ?, ?, ?, ?)", [
+            (FEW, "An", "Nguyễn", "an@lms.test", None),
+            (MANY, "Bình", "Trần", "binh@lms.test", None),
+        ])
+        raw.executemany("INSERT INTO Students VALUES (?, ?)", [(FEW, "2004-01-01"), (MANY, "2004-02-02")])
+        raw.execute("INSERT INTO Semesters VALUES (?, ?, ?, ?)", (SEMESTER, "HK Test", today(-30), today(60)))
+        raw.executemany(
+            "INSERT INTO Courses (CourseID, Course_Code, Title, Credit) VALUES (?, ?, ?, ?)",
+            [(course_id, f"T{course_id:03}", f"Môn {course_id}", 3) for course_id in range(1, COURSES + 1)]
+        )
+
+        activities = [(FEW, 1, 'Enrollment', 'Approved')]
+        activities += [(MANY, course_id, 'Enrollment', 'Approved') for course_id in range(1, COURSES + 1)]
+        activities += [
+            (FEW, 1, 'Withdrawal', 'Pending'),
+            (MANY, 2, 'Withdrawal', 'Pending'),
+            (MANY, 3, 'Exam_Delay', 'Approved'),
+        ]
+        raw.executemany(
+            "INSERT INTO Activities (StudentID, CourseID, SemesterID, ActivityType, RequestStatus, Submission_Date)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            [(student, course, SEMESTER, kind, status, today(-10)) for student, course, kind, status in activities]
+        )
+
+
+def statuses_for(db, captured, student_id, activity_type):
+    approved = db.execute_query(APPROVED_QUERY, [student_id, SEMESTER])
+    del captured[:]
+    courses = db.add_request_statuses(approved, student_id, SEMESTER, activity_type)
+    return courses, list(captured)
+
+
+@pytest.mark.parametrize("activity_type", ['Withdrawal', 'Exam_Delay'])
+def test_add_request_statuses_runs_one_query(db, captured_queries, activity_type):
+    few, few_statements = statuses_for(db, captured_queries, FEW, activity_type)
+    many, many_statements = statuses_for(db, captured_queries, MANY, activity_type)
+
+    assert len(few) == 1 and len(many) == COURSES
+    assert len(few_statements) == 1
+    assert few_statements == many_statements
+
+
+def test_add_request_statuses_fills_status(db, captured_queries):
+    many, _ = statuses_for(db, captured_queries, MANY, 'Withdrawal')
+    assert dict(zip(many['CourseID'], many['ExistingStatus'])) == {
+        1: '', 2: 'Pending', 3: '', 4: '', 5: '', 6: ''
+    }
+
+    many, _ = statuses_for(db, captured_queries, MANY, 'Exam_Delay')
+    assert dict(zip(many['CourseID'], many['ExistingStatus']))[3] == 'Approved'
+
+
+def open_tab(db, captured, student_id, menu):
+    _, user_data = db.authenticate_user(student_id, "Student")
+    at = AppTest.from_file(os.path.join(APP_DIR, "pages", "2_Student.py"), default_timeout=60)
+    at.session_state.logged_in = True
+    at.session_state.role = "Student"
+    at.session_state.user_id = student_id
+    at.session_state.user_data = user_data
+    at.session_state.full_name = f"{user_data['FName']} {user_data['LName']}"
+    at.run()
+
+    db.clear_query_cache()
+    del captured[:]
+    at.sidebar.radio[0].set_value(menu).run()
+    assert not at.exception, [e.value for e in at.exception]
+    return at, list(captured)
+
+
+def courses_shown(at):
+    """Course cards (Rút môn) or expanders (Hoãn thi) on the page"""
+    titles = [element.value for element in at.markdown] + [block.label for block in at.expander]
+    return sum(1 for title in titles if "[T0" in title)
+
+
+@pytest.mark.parametrize("menu", ["🚫 Rút môn", "📅 Hoãn thi"])
+def test_tab_statements_do_not_grow_with_courses(db, captured_queries, menu):
+    few_page, few_statements = open_tab(db, captured_queries, FEW, menu)
+    many_page, many_statements = open_tab(db, captured_queries, MANY, menu)
+
+    assert (courses_shown(few_page), courses_shown(many_page)) == (1, COURSES)
+    assert few_statements == many_statements
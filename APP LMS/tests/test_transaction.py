@@ -0,0 +1,48 @@
+"""
+Transaction.execute must read past the first result set: pyodbc reports an
+error from a later statement of a batch only when nextset() reaches it.
+"""
+
+import pytest
+
+
+class BatchCursor:
+    """Cursor over prepared result sets; an Exception entry is raised on nextset()"""
+
+    def __init__(self, sets):
+        self._sets = list(sets)
+        self.description = None
+
+    def execute(self, query, *params):
+        self._load(self._sets.pop(0))
+
+    def nextset(self):
+        if not self._sets:
+            return False
+        self._load(self._sets.pop(0))
+        return True
+
+    def _load(self, result):
+        if isinstance(result, Exception):
+            raise result
+        self.description, self._rows = result
+
+    def fetchmany(self, size):
+        rows, self._rows = self._rows, []
+        return rows
+
+
+ACTIVITY_SET = ([('ActivityID', int, None, None, None, None, True)], [(42,)])
+
+
+def test_error_in_a_later_statement_is_raised(db):
+    cursor = BatchCursor([(None, []), ACTIVITY_SET, db.DatabaseError("50021 insert failed")])
+    with pytest.raises(db.DatabaseError):
+        db.Transaction(cursor).execute("EXEC InsertActivity ?; EXEC InsertActivity ?", [1, 2])
+
+
+def test_execute_returns_the_first_result_set(db):
+    cursor = BatchCursor([(None, []), ACTIVITY_SET, (None, [])])
+    transaction = db.Transaction(cursor)
+    assert transaction.execute("EXEC InsertActivity ?; SELECT 42", [1])['ActivityID'].tolist() == [42]
+    assert cursor.nextset() is False